@@ -34,7 +34,7 @@ import re
 
 import pyrc_shared.convenience as pyrc
 
-_RESPONSE_REGEXP = re.compile("^.?8-squall(.?) .+[?+/].*", re.I) #: This compiled regular expression object is used to quickly filter strings that this script should process.
+_RESPONSE_REGEXP = re.compile("^.?8-squall(.?) .+[?+/].*", re.I) #: This compiled regular expression object is declared as a trigger, so PyRC only passes along strings that this script should process.
 
 _RESPONSES_8SQUALL = (
  "Meh.",
@@ -111,13 +111,25 @@ def loadMe(ial, load_mode):
 	@rtype: tuple
 	@return: A tuple containing tuples identifying the 'eventname' value of
 	    each Event Dictionary type this script would like to receive, coupled
-		with a reference to the function that will be used for processing, and a
+		with a reference to the function that will be used for processing, a
 		boolean value indicating whether input should be taken from the user
-		(True) or the network/internal events (False).
+		(True) or the network/internal events (False), and, optionally, a
+		source filter that PyRC will apply before calling the function, so
+		that it only hears from the channels it cares about, and a trigger that
+		the message must match, so that it only hears requests meant for it.
 	"""
+	#Only non-action messages from _ALLOWED_SOURCES that match _RESPONSE_REGEXP
+	#will ever reach processChannelMessage().
+	source_filter = {
+	 'sources': _ALLOWED_SOURCES,
+	 'action': False
+	}
+	trigger = {
+	 'regexp': _RESPONSE_REGEXP
+	}
 	return (
-	 ("Channel Message", processChannelMessage, False),
-	 ("Channel Message Local", processChannelMessage, False)
+	 ("Channel Message", processChannelMessage, False, source_filter, trigger),
+	 ("Channel Message Local", processChannelMessage, False, source_filter, trigger)
 	)
 	
 def unloadMe(ial, unload_mode):
@@ -150,50 +162,49 @@ def unloadMe(ial, unload_mode):
 	"""
 	pass
 	
-def processChannelMessage(dictionary, ial):
+def processChannelMessage(dictionary, ial, groups):
 	"""
 	This function was specified in loadMe() as the handler for "Channel Message"
 	and "Channel Message Local" Event Dictionaries. As such, it will be called
 	each time one of these Event Dictionaries is passed through PyRC's plugin
-	chain.
+	chain, provided that its message matches _RESPONSE_REGEXP.
 	
 	@type dictionary: dict
 	@param dictionary: The Event Dictionary to be processed.
 	@type ial: function
 	@param ial: A reference to the IRC Abstraction Layer's interface.
+	@type groups: tuple
+	@param groups: The groups captured by _RESPONSE_REGEXP.
 	
 	@rtype: dict|None
 	@return: Nothing, at least in this case. A Raise Event Event Dictionary
 	    could be returned if this function needed to alter the way in which
 	    PyRC's plugin chain processed this event.
 	"""
-	handling_data = pyrc.handleChannelMessage(dictionary, _ALLOWED_SOURCES)
-	#The function above returns None if the event isn't from an allowed source.
-	#In Python, anything that can be considered a form of NoneType, such as an
-	#empty string, empty container, 0, False, and None, can be matched with the
-	#following 'if not' syntax.
-	if not handling_data:
-		return
+	#PyRC has already applied the source filter and the regular expression
+	#specified in loadMe(), so this is known to be a request for 8-Squall from
+	#a channel it serves; there's no need to screen the event again here.
+	#Local messages name the user directly, while messages from the network
+	#describe the user with a "User Data" dictionary.
+	user_name = None
+	if dictionary['eventname'] == "Channel Message Local":
+		user_name = dictionary['username']
+	else:
+		user_name = dictionary['userdata']['username']
 		
-	#This applies the regular expression specified above to the received string
-	#to find out if it is a request for 8-Squall.
-	match = _RESPONSE_REGEXP.match(dictionary['message'])
-	if match:
-		(user_name, local) = handling_data #This breaks the tuple into a string and a bool. Indexing would work, too, but this is more clear.
-		
-		message = None #This specifies a variable used to store the message
-		               #string when it is generated. It is declared here because
-					   #any variables declared in a sub-scope, like an 'if' or
-					   #anything else that gets indented, save for 'try's, is
-					   #valid only within that sub-scope, and this value is
-					   #needed later.
-		if match.group(1) != ':' and random.randint(0, 2) == 2:
-			#8-Squall mode is used only one third of the time. The user may use
-			#a colon, as in '8-Squall: x?' to force 8-Ball mode.
-			message = user_name + ", 8-Squall speaks: " + random.choice(_RESPONSES_8SQUALL)
-		else:
-			message = user_name + ", 8-Squall's 8-Ball has concluded: " + random.choice(_RESPONSES_8BALL)
-			
-		#This causes PyRC to send the response to the IRC network. Easy.
-		pyrc.respondToChannelMessage(message, dictionary)
+	message = None #This specifies a variable used to store the message
+	               #string when it is generated. It is declared here because
+	               #any variables declared in a sub-scope, like an 'if' or
+	               #anything else that gets indented, save for 'try's, is
+	               #valid only within that sub-scope, and this value is
+	               #needed later.
+	if groups[0] != ':' and random.randint(0, 2) == 2:
+		#8-Squall mode is used only one third of the time. The user may use
+		#a colon, as in '8-Squall: x?' to force 8-Ball mode.
+		message = user_name + ", 8-Squall speaks: " + random.choice(_RESPONSES_8SQUALL)
+	else:
+		message = user_name + ", 8-Squall's 8-Ball has concluded: " + random.choice(_RESPONSES_8BALL)
 		
+	#This causes PyRC to send the response to the IRC network. Easy.
+	pyrc.respondToChannelMessage(message, dictionary)
+	
@@ -116,6 +116,7 @@ if __name__ == "__main__":
 		GLOBAL.IRC_AUTO_RECONNECT = settings.getOption("irc.autoreconnect")
 		
 		GLOBAL.ENV_PSYCO = C_FUNCS.evaluateTruth(settings.getOption("pyrc.usepsyco"))
+		GLOBAL.IRC_SHARED_IO = C_FUNCS.evaluateTruth(settings.getOption("pyrc.sharedio"))
 		GLOBAL.USR_SERVER_THREADS = int(settings.getOption("pyrc.serverworkerthreads"))
 		ial_worker_threads = int(settings.getOption("pyrc.workerthreads"))
 		
@@ -57,6 +57,10 @@ IRC_DEFAULT_PORT = 6667 #: The default port to try for non-SSL connections to an
 IRC_DEFAULT_PORT_SSL = 7001 #: The default port to try for SSL connections to an IRC server.
 IRC_IDLE_WAIT_TIME = 300 #: The number of seconds to wait before attempting to PING an IRC server if no events have been received.
 IRC_PING_TIMEOUT = 120 #: The number of seconds to wait before declaring a PING failed.
+IRC_FLOOD_BURST = 10 #: The number of seconds of penalty an IRC server lets a client accumulate before it stops reading (RFC 1459, section 8.10).
+IRC_FLOOD_MESSAGE_PENALTY = 2 #: The number of seconds of penalty an IRC server assigns to every message.
+IRC_FLOOD_BYTE_PENALTY = 120 #: The number of bytes that cost one additional second of penalty.
+IRC_EVENT_QUEUE_SIZE = 1000 #: The number of events each of a server's worker threads may have waiting before some are discarded or their producers are made to wait; 0 for no limit.
 IRC_CHANNEL_PREFIX = ('#', '+', '!') #: A list of known channel prefixes.
 IRC_IGNORED_MODES = ('b', 'd', 'e', 'I') #: A list of modes not processed by PyRC; these are managed entirely by the IRC server, so PyRC does not need to track them.
 IRC_LINE_TERMINATOR = "\r\n" #: The string used to indicate the end of a line in an IRC server's stream.
@@ -115,6 +119,7 @@ ENV_VARIABLES_LOCK = threading.Lock() #: A lock used to prevent multiple simulta
 #IRC
 #######################################
 IRC_AUTO_RECONNECT = True #: True if PyRC should automatically try to reconnect to servers when it is disconnected by a non-kill.
+IRC_SHARED_IO = False #: True if every unencrypted server connection should be read by a single I/O thread, rather than by a thread apiece; each connection still sends from its own thread.
 
 #DCC
 #######################################
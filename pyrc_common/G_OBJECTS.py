@@ -19,6 +19,7 @@ import time
 import Queue
 
 import GLOBAL
+import scheduler
 
 import dictionaries.outbound as outboundDictionaries
 #Dictionaries used by this module:
@@ -26,39 +27,40 @@ import dictionaries.outbound as outboundDictionaries
 
 #Classes
 #==============================================================================
-class EventTimer(threading.Thread):
+class EventTimer(object):
 	"""
 	This class provides PyRC's central event timer, which emits signals on every
 	fifth minute of the day.
+	
+	It has no thread of its own: each signal is a single
+	pyrc_common.scheduler.Scheduler timer, set for the start of the next
+	five-minute block, so nothing runs between signals.
 	"""
-	def __init__(self):
+	_timer = None #: The pyrc_common.scheduler.Timer that will emit the next signal.
+	
+	def start(self):
 		"""
-		This function is invoked when the Event Timer object is instantiated.
-		
-		It stores the current time, reset to the start of the minute, and waits
-		to be activated.
+		This function activates the Event Timer, scheduling the first signal
+		for the start of the next five-minute block.
 		
 		@return: Nothing.
 		"""
-		threading.Thread.__init__(self)
-		self.setDaemon(True)
+		self._scheduleSignal()
 		
-		current_time = time.localtime()
-		self.last_time = (
-		 current_time[0],
-		 current_time[1],
-		 current_time[2], #Date
-		 current_time[3], #Hour
-		 current_time[4] - (current_time[4] % 5), #Minute
-		 0 #:x[6] #Second
-		)
-		self.setName("Event Timer")
+	def kill(self):
+		"""
+		This function prevents the Event Timer from emitting any more signals.
 		
-	def run(self):
+		@return: Nothing.
+		"""
+		if self._timer:
+			self._timer.cancel()
+			
+	def _emitSignal(self, block_time):
 		"""
-		This function cycles every two seconds. If, on cycling, it discovers
-		that a new five-minute block has started, and it has not yet generated a
-		signal for this block, it will notify all plugins of the current time.
+		This function is called by the scheduler at the start of each five-minute
+		block; it notifies all plugins of the current time and schedules the
+		next signal.
 		
 		The signals it may generate are as follows::
 		    0: 5, 10, 20, 25, 35, 40, 50, 55 minutes
@@ -69,37 +71,45 @@ class EventTimer(threading.Thread):
 		
 		Only one signal will be generated at any given interval.
 		
+		The signal is broadcast from the shared pyrc_common.asynch.Executor, so
+		that plugins' handlers can't hold up the scheduler's other timers.
+		
+		@type block_time: float
+		@param block_time: The UNIX timestamp of the start of the block, which
+		    is used to determine the signal's scale, so that a late timer
+		    cannot misreport it.
+		
 		@return: Nothing.
 		"""
-		while True:
-			start_time = time.time()
+		self._scheduleSignal()
+		
+		block = time.localtime(block_time)
+		scale = 0
+		if block[4] == 0:
+			if block[3] == 0:
+				scale = 4
+			else:
+				scale = 3
+		elif block[4] == 30:
+			scale = 2
+		elif block[4] % 15 == 0:
+			scale = 1
 			
-			current_time = time.localtime()
-			minimum_difference = current_time[4] - self.last_time[4]
-			if minimum_difference == 5 or minimum_difference == -55:
-				scale = 0
-				if minimum_difference == 5:
-					if current_time[4] == 30:
-						scale = 2
-					elif current_time[4] % 15 == 0:
-						scale = 1
-				elif minimum_difference == -55:
-					if current_time[2] == self.last_time[2]:
-						scale = 3
-					else:
-						scale = 4
-						
-				GLOBAL.plugin.broadcastEvent(outboundDictionaries.PyRC_Time_Signal(time.time(), scale))
-				
-				self.last_time = current_time
-			try:
-				time.sleep(2 - (time.time() - start_time))
-			except IOError:
-				#It took more than two seconds to complete this cycle, but there's
-				#really nothing that can be done, so just start the next one now.
-				pass
-				
-				
+		GLOBAL.plugin.broadcastEventAsync(outboundDictionaries.PyRC_Time_Signal(time.time(), scale))
+		
+	def _scheduleSignal(self):
+		"""
+		This function schedules the signal for the start of the next five-minute
+		block of local time.
+		
+		@return: Nothing.
+		"""
+		current_time = time.time()
+		local_time = time.localtime(current_time)
+		block_time = int(current_time) - (local_time[4] % 5) * 60 - local_time[5] + 300
+		self._timer = scheduler.getScheduler().scheduleAt(block_time, self._emitSignal, (block_time,))
+		
+		
 class WorkerThread(threading.Thread):
 	"""
 	This class provides PyRC's worker threads, which are persistent handlers
@@ -152,3 +162,4 @@ class WorkerThread(threading.Thread):
 			except Exception:
 				pass
 				
+				
\ No newline at end of file
@@ -6,6 +6,11 @@ Purpose
 =======
  Provide generic facilities to execute functions asynchronously.
  
+ All asynchronous work is run by a single, shared Executor, which holds a
+ bounded number of threads, so bursts of requests queue rather than spawning a
+ thread apiece. Work PyRC depends on, like unloading plugins, never waits
+ behind optional work, though.
+ 
 Legal
 =====
  All code, unless otherwise indicated, is original, and subject to the terms of
@@ -13,15 +18,26 @@ Legal
  
  (C) Neil Tallim, 2004-2007
 """
+import collections
 import threading
 
-class Asyncher(threading.Thread):
+_MAX_THREADS = 8 #: The largest number of threads the shared Executor may run.
+_MAX_QUEUED = 256 #: The largest number of optional tasks that may wait for a thread before further optional tasks are rejected.
+
+_executor = None #: The Executor shared by all of PyRC, created on first use.
+_executor_lock = threading.Lock() #: A lock used to prevent multiple simultaneous creations of the shared Executor.
+
+class Asyncher(object):
 	"""
 	This class can be used to run functions asynchronously.
 	
 	Any arguments passed to it will be received as a tuple.
 	If no arguments are passed, it will be called with nothing.
+	
+	The function is run by the shared Executor, and it is never rejected.
 	"""
+	_task = None #: The _Task that runs the function, once started.
+	
 	def __init__(self, function, *optArgs):
 		"""
 		This function is invoked when a new Asyncher object is created.
@@ -29,19 +45,27 @@ class Asyncher(threading.Thread):
 		It caches the function and any given arguments.
 		
 		@type function: function
-		@param function: The function to be called when this thread starts.
+		@param function: The function to be called when this object starts.
 		@type optargs: *variable
 		@param optargs: Any number of arguments that may be passed to the
 		    function.
 		"""
-		threading.Thread.__init__(self)
 		self.func = function
 		self.args = optArgs
 		
+	def isAlive(self):
+		"""
+		This function indicates whether the function has been started but has
+		not yet finished.
+		
+		@rtype: bool
+		@return: True if the function is queued or running.
+		"""
+		return bool(self._task) and not self._task.isDone()
+		
 	def run(self):
 		"""
-		This function is called when the thread is started. It invokes the set
-		function with any given arguments.
+		This function invokes the set function with any given arguments.
 		
 		@return: Nothing.
 		"""
@@ -50,8 +74,16 @@ class Asyncher(threading.Thread):
 		else:
 			self.func()
 			
-			
-class AsyncherSingleArg(threading.Thread):
+	def start(self):
+		"""
+		This function hands the function to the shared Executor.
+		
+		@return: Nothing.
+		"""
+		self._task = getExecutor().submit(self.run, required=True)
+		
+		
+class AsyncherSingleArg(Asyncher):
 	"""
 	This class can be used to run functions asynchronously, like the one above,
 	but since it only accepts one argument, it's more useful in producing clean,
@@ -64,20 +96,299 @@ class AsyncherSingleArg(threading.Thread):
 		It caches the function and given argument.
 		
 		@type function: function
-		@param function: The function to be called when this thread starts.
+		@param function: The function to be called when this object starts.
 		@type args: variable
 		@param optargs: An argument to be passed to the set function.
 		"""
-		threading.Thread.__init__(self)
 		self.func = function
 		self.arg = arg
 		
 	def run(self):
 		"""
-		This function is called when the thread is started. It invokes the set
-		function with the given argument.
+		This function invokes the set function with the given argument.
 		
 		@return: Nothing.
 		"""
 		self.func(self.arg)
+		
+		
+class Executor(object):
+	"""
+	This class runs functions on a bounded pool of threads.
+	
+	Threads are started only when every existing thread is busy, up to a fixed
+	limit; after that, optional functions wait in a queue, and they are
+	rejected once the queue is full.
+	
+	Required functions, which PyRC depends on, like unloading plugins, are
+	never rejected, and they never wait behind optional functions, which may
+	hang in plugins' handlers: they are taken before any optional function,
+	and, if no thread is idle, each is given a thread of its own, which ends
+	when the function returns.
+	
+	Counters describing the Executor's load are kept for diagnostics.
+	"""
+	_max_threads = None #: The largest number of threads this Executor may run.
+	_max_queued = None #: The largest number of optional tasks that may be queued.
+	_condition = None #: A threading.Condition used to protect the queue and counters, and to wake idle threads.
+	_queue = None #: A collections.deque of optional _Tasks waiting for a thread.
+	_required = None #: A collections.deque of required _Tasks waiting for an idle thread.
+	_threads = 0 #: The number of threads started.
+	_idle = 0 #: The number of threads waiting for a task.
+	_submitted = 0 #: The number of tasks accepted.
+	_completed = 0 #: The number of tasks that have finished, successfully or otherwise.
+	_failed = 0 #: The number of tasks that raised an exception.
+	_rejected = 0 #: The number of optional tasks turned away because the queue was full.
+	_dedicated = 0 #: The number of required tasks given threads of their own because no thread was idle.
+	_peak_queued = 0 #: The largest number of tasks that have waited at once.
+	
+	def __init__(self, max_threads, max_queued):
+		"""
+		This function is invoked when a new Executor object is created.
+		
+		@type max_threads: int
+		@param max_threads: The largest number of threads the Executor may run.
+		@type max_queued: int
+		@param max_queued: The largest number of optional tasks that may wait
+		    for a thread.
+		
+		@return: Nothing.
+		"""
+		self._max_threads = max_threads
+		self._max_queued = max_queued
+		self._condition = threading.Condition(threading.Lock())
+		self._queue = collections.deque()
+		self._required = collections.deque()
+		
+	def getMetrics(self):
+		"""
+		This function describes the Executor's load.
+		
+		@rtype: dict
+		@return: A dictionary of the following form::
+		     {
+		      'threads': <:int>,
+		      'idle': <:int>,
+		      'queued': <:int>,
+		      'peakqueued': <:int>,
+		      'submitted': <:int>,
+		      'completed': <:int>,
+		      'failed': <:int>,
+		      'rejected': <:int>,
+		      'dedicated': <:int>
+		     }
+		"""
+		self._condition.acquire()
+		try:
+			return {
+			 'threads': self._threads,
+			 'idle': self._idle,
+			 'queued': len(self._queue) + len(self._required),
+			 'peakqueued': self._peak_queued,
+			 'submitted': self._submitted,
+			 'completed': self._completed,
+			 'failed': self._failed,
+			 'rejected': self._rejected,
+			 'dedicated': self._dedicated
+			}
+		finally:
+			self._condition.release()
+			
+	def submit(self, function, arguments=(), required=False):
+		"""
+		This function arranges for a function to be run by one of the
+		Executor's threads.
+		
+		@type function: callable
+		@param function: The function to run.
+		@type arguments: tuple
+		@param arguments: The arguments to pass to the function.
+		@type required: bool
+		@param required: True if the function must be run even if the queue is
+		    full, without waiting for optional functions.
+		
+		@rtype: _Task|None
+		@return: The task that will run the function, or None if it was
+		    rejected.
+		"""
+		task = _Task(function, arguments)
+		self._condition.acquire()
+		try:
+			if required:
+				self._submitted += 1
+				if self._idle > len(self._required): #An idle thread will take it before any optional task.
+					self._required.append(task)
+					self._condition.notify()
+				else:
+					self._dedicated += 1
+					_ExecutorThread(self, self._dedicated, task).start()
+				return task
+				
+			if len(self._queue) >= self._max_queued:
+				self._rejected += 1
+				return None
+				
+			self._submitted += 1
+			self._queue.append(task)
+			self._peak_queued = max(self._peak_queued, len(self._queue))
+			if len(self._queue) > self._idle and self._threads < self._max_threads:
+				self._threads += 1
+				_ExecutorThread(self, self._threads).start()
+			self._condition.notify()
+			return task
+		finally:
+			self._condition.release()
+			
+	def getTask(self):
+		"""
+		This function blocks until a task is available, then removes it from
+		the queue.
+		
+		It is called by the Executor's threads.
+		
+		@rtype: _Task
+		@return: The next task to run.
+		"""
+		self._condition.acquire()
+		try:
+			self._idle += 1
+			while not self._queue and not self._required:
+				self._condition.wait()
+			self._idle -= 1
+			if self._required:
+				return self._required.popleft()
+			return self._queue.popleft()
+		finally:
+			self._condition.release()
+			
+	def markDone(self, failed):
+		"""
+		This function records the completion of a task.
+		
+		It is called by the Executor's threads.
+		
+		@type failed: bool
+		@param failed: True if the task raised an exception.
+		
+		@return: Nothing.
+		"""
+		self._condition.acquire()
+		self._completed += 1
+		if failed:
+			self._failed += 1
+		self._condition.release()
+		
+		
+class _Task(object):
+	"""
+	This class represents a function waiting to be run, or being run, by an
+	Executor.
+	"""
+	_function = None #: The function to run.
+	_arguments = None #: A tuple of the arguments to pass to the function.
+	_done = False #: True once the function has finished.
+	
+	def __init__(self, function, arguments):
+		"""
+		This function is invoked when a new _Task object is created.
+		
+		@type function: callable
+		@param function: The function to run.
+		@type arguments: tuple
+		@param arguments: The arguments to pass to the function.
+		
+		@return: Nothing.
+		"""
+		self._function = function
+		self._arguments = tuple(arguments)
+		
+	def isDone(self):
+		"""
+		This function indicates whether the function has finished.
+		
+		@rtype: bool
+		@return: True if the function has returned or raised an exception.
+		"""
+		return self._done
+		
+	def run(self):
+		"""
+		This function runs the function.
+		
+		@rtype: bool
+		@return: True if the function raised an exception.
+		"""
+		try:
+			self._function(*self._arguments)
+			return False
+		except Exception:
+			return True
+		finally:
+			self._done = True
+			
+			
+class _ExecutorThread(threading.Thread):
+	"""
+	This class runs the tasks queued in an Executor, or a single required
+	task that no thread was idle to take.
+	"""
+	_executor = None #: The Executor whose tasks this thread runs.
+	_task = None #: The only _Task this thread runs, or None if it serves the Executor's queue.
+	
+	def __init__(self, executor, number, task=None):
+		"""
+		This function is invoked when a new _ExecutorThread object is created.
+		
+		@type executor: Executor
+		@param executor: The Executor whose tasks this thread runs.
+		@type number: int
+		@param number: The number of this thread within the Executor, or among
+		    its dedicated threads.
+		@type task: _Task|None
+		@param task: The only task this thread should run, or None if it should
+		    serve the Executor's queue.
+		
+		@return: Nothing.
+		"""
+		threading.Thread.__init__(self)
+		self._executor = executor
+		self._task = task
+		self.setDaemon(True)
+		if task:
+			self.setName("Executor - Dedicated Thread %i" % number)
+		else:
+			self.setName("Executor - Worker Thread %i" % number)
+			
+	def run(self):
+		"""
+		This function is executed over the course of the thread's lifetime,
+		running tasks as they are queued, or running its only task.
+		
+		@return: Nothing.
+		"""
+		if self._task:
+			self._executor.markDone(self._task.run())
+			return
+			
+		while True:
+			self._executor.markDone(self._executor.getTask().run())
+			
+			
+def getExecutor():
+	"""
+	This function returns the Executor shared by all of PyRC, creating it if
+	necessary.
+	
+	@rtype: Executor
+	@return: The shared Executor.
+	"""
+	global _executor
+	try:
+		_executor_lock.acquire()
+		if not _executor:
+			_executor = Executor(_MAX_THREADS, _MAX_QUEUED)
+		return _executor
+	finally:
+		_executor_lock.release()
+		
 		
\ No newline at end of file
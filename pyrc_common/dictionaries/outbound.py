@@ -9,6 +9,10 @@ Purpose
  
  By centralizing this resource, global changes should be easier to enact.
  
+ Each type of outbound dictionary is a compact class generated from a short
+ specification, rather than a dict, since many thousands of them may be
+ created every minute; they still behave like read-only dictionaries.
+ 
 Legal
 =====
  All code, unless otherwise indicated, is original, and subject to the terms of
@@ -16,583 +20,419 @@ Legal
  
  (C) Neil Tallim, 2007
 """
-def IRC_Channel_Banlist(context_id, network_name, channel, banlist):
-	return {
-	 'eventname': "Channel Banlist",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'banlist': banlist
-	}
-	
-def IRC_Channel_Close(context_id, network_name, channel, reason, kick, kicker_data):
-	return {
-	 'eventname': "Channel Close",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'message': reason,
-	 'kick': kick,
-	 'kicker': kicker_data
-	}
-	
-def IRC_Channel_Created(context_id, network_name, channel_name, time_created):
-	return {
-	 'eventname': "Channel Created",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel_name,
-	 'timestamp': time_created
-	}
-	
-def IRC_Channel_Information(context_id, network_name, channel, message):
-	return {
-	 'eventname': "Channel Information",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'message': message
-	}
-	
-def IRC_Channel_Invite(context_id, network_name, channel, user_data):
-	return {
-	 'eventname': "Channel Invite",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'userdata': user_data
-	}
-	
-def IRC_Channel_Join(context_id, network_name, time_created, topic_setter, topic_time, channel_data):
-	return {
-	 'eventname': "Channel Join",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'timestamp': time_created,
-	 'topictime': topic_time,
-	 'topicwho': topic_setter,
-	 'channeldata': channel_data
-	}
-	
-def IRC_Channel_Message(context_id, network_name, channel, message, action, user_data):
-	return {
-	 'eventname': "Channel Message",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'message': message,
-	 'action': action,
-	 'userdata': user_data
-	}
-	
-def IRC_Channel_Message_Local(context_id, network_name, channel, message, action, local_nickname):
-	return {
-	 'eventname': "Channel Message Local",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'message': message,
-	 'action': action,
-	 'username': local_nickname
-	}
-	
-def IRC_Channel_Modes(context_id, network_name, channel_name, modestring, modestring_safe, modes):
-	return {
-	 'eventname': "Channel Modes",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel_name,
-	 'modestring': modestring,
-	 'modestringsafe': modestring_safe,
-	 'modes': modes
-	}
-	
-def IRC_Channel_Modes_Update(context_id, network_name, channel, changes, changestring, usermodes, modes, modestring, modestring_safe, user_data):
-	return {
-	 'eventname': "Channel Modes Update",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'changes': changes,
-	 'changestring': changestring,
-	 'usermodes': usermodes,
-	 'modestring': modestring,
-	 'modestringsafe': modestring_safe,
-	 'modes': modes,
-	 'userdata': user_data
-	}
-	
-def IRC_Channel_Names(context_id, network_name, channel_name, users):
-	return {
-	 'eventname': "Channel Names",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel_name,
-	 'users': users
-	}
-	
-def IRC_Channel_Topic(context_id, network_name, channel_name, topic):
-	return {
-	 'eventname': "Channel Topic",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel_name,
-	 'topic': topic
-	}
-	
-def IRC_Channel_Topic_Information(context_id, network_name, channel_name, topic_setter, topic_time):
-	return {
-	 'eventname': "Channel Topic Information",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel_name,
-	 'topictime': topic_time,
-	 'topicwho': topic_setter
-	}
-	
-def IRC_Channel_Topic_New(context_id, network_name, channel, topic, user_data):
-	return {
-	 'eventname': "Channel Topic New",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'topic': topic,
-	 'userdata': user_data
-	}
-	
-def IRC_Channel_User_Join(context_id, network_name, channel_name, user_data):
-	return {
-	 'eventname': "Channel User Join",
-	 'networkname': network_name,
-	 'irccontext': context_id,
-	 'channel': channel_name,
-	 'userdata': user_data
-	}
-	
-def IRC_Channel_User_Part(context_id, network_name, channel, reason, user_data, kick, kicker_data):
-	return {
-	 'eventname': "Channel User Part",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channel': channel,
-	 'message': reason,
-	 'userdata': user_data,
-	 'kick': kick,
-	 'kicker': kicker_data
-	}
-	
-def IRC_CTCP_Request(context_id, network_name, user_data, target, event_type, data, handled):
-	return {
-	 'eventname': "CTCP Request",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'target': target,
-	 'event': event_type,
-	 'data': data,
-	 'handled': handled,
-	 'userdata': user_data
-	}
-	
-def IRC_CTCP_Response(context_id, network_name, user_data, event_type, data):
-	return {
-	 'eventname': "CTCP Response",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'event': event_type,
-	 'data': data,
-	 'userdata': user_data
-	}
-	
-def IRC_IsOn_Response(context_id, network_name, is_on, nickname):
-	return {
-	 'eventname': "IsOn Response",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'ison': is_on,
-	 'username': nickname
-	}
-	
-def IRC_Object_Information(context_id, network_name, object, text):
-	return{
-	 'eventname': "Object Information",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'object': object,
-	 'message': text
-	}
-	
-def IRC_Ping(context_id, network_name, timestring, user_data):
-	return {
-	 'eventname': "Ping",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'data': timestring,
-	 'userdata': user_data
-	}
-	
-def IRC_Ping_Timeout(context_id, network_name, username):
-	return {
-	 'eventname': "Ping Timeout",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'username': username
-	}
-	
-def IRC_Ping_Timeout_Check(context_id, network_name):
-	return {
-	 'eventname': "Ping Timeout Check",
-	 'irccontext': context_id,
-	 'networkname': network_name
-	}
-	
-def IRC_Pong(context_id, network_name, time_elapsed, user_data):
-	return {
-	 'eventname': "Pong",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'pingtime': time_elapsed,
-	 'userdata': user_data
-	}
-	
-def IRC_Raw_Command(context_id, network_name, data):
-	return {
-	 'eventname': "Raw Command",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'data': data
-	}
-	
-def IRC_Raw_Event(context_id, network_name, data):
-	return {
-	 'eventname': "Raw Event",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'data': data
-	}
-	
-def IRC_User_Logon(context_id, network_name, type, timestamp, message, user_data):
-	return {
-	 'eventname': "User Logon",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'type': type,
-	 'timestamp': timestamp,
-	 'data': text,
-	 'userdata': user_data
-	}
-	
-def IRC_User_Modes(context_id, network_name, target, changes, changestring, modes, modestring):
-	return {
-	 'eventname': "User Modes",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'changes': changes,
-	 'changestring': changestring,
-	 'modes': modes,
-	 'modestring': modestring,
-	 'username': target
-	}
-	
-def IRC_User_Notice(context_id, network_name, text, target, user_data):
-	return {
-	 'eventname': "User Notice",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'text': text,
-	 'target': target,
-	 'userdata': user_data
-	}
-	
-def IRC_User_Nickname_Change(context_id, network_name, new_nickname, affected_channels, user_data, local_change):
-	return {
-	 'eventname': "User Nickname Change",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'nickname': new_nickname,
-	 'channels': affected_channels,
-	 'userdata': user_data,
-	 'islocal': local_change
-	}
-	
-def IRC_User_Private_Message(context_id, network_name, message, action, user_data):
-	return {
-	 'eventname': "Private Message",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'message': message,
-	 'action': action,
-	 'userdata': user_data
-	}
-	
-def IRC_User_Private_Message_Local(context_id, network_name, username, message, action, local_nickname):
-	return {
-	 'eventname': "Private Message Local",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'target': username,
-	 'message': message,
-	 'action': action,
-	 'username': local_nickname
-	}
-	
-def IRC_User_Quit(context_id, network_name, reason, channels, user_data):
-	return {
-	 'eventname': "User Quit",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'message': reason,
-	 'channels': channels,
-	 'userdata': user_data
-	}
-	
-def IRC_User_Who_Fail(context_id, network_name, username):
-	return {
-	 'eventname': "Who Fail",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'username': username
-	}
-	
-def IRC_User_Who_Response(context_id, network_name, channels, user_data):
-	return {
-	 'eventname': "Who Response",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'channels': channels,
-	 'userdata': user_data
-	}
-	
-def IRC_User_WhoIs_Response(context_id, network_name, irc_server, server_name, idle_time, channels, modes, bot, chanop, help, operator, registered, secure, data, user_data, address):
-	return {
-	 'eventname': "WhoIs Response",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'ircserver': irc_server,
-	 'servername': server_name,
-	 'address': address,
-	 'channels': channels,
-	 'timeinfo': idle_time,
-	 'modes': modes,
-	 'bot': bot,
-	 'chanop': chanop,
-	 'help': help,
-	 'operator': operator,
-	 'registered': registered,
-	 'secure': secure,
-	 'data': data,
-	 'userdata': user_data
-	}
-	
-def IRC_User_WhoWas_Fail(context_id, network_name, nickname):
-	return {
-	 'eventname': "WhoWas Fail",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'username': nickname
-	}
-	
-def IRC_User_WhoWas_Response(context_id, network_name, last_server, last_seen, user_data):
-	return {
-	 'eventname': "WhoWas Response",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'ircserver': last_server,
-	 'timestring': last_seen,
-	 'userdata': user_data
-	}
-	
-def PyRC_Implement_Me(details, raw):
-	return {
-	 'eventname': "Implement Me",
-	 'details': details,
-	 'raw': raw
-	}
-	
-def PyRC_Initialised():
-	return {
-	 'eventname': "Initialised"
-	}
-	
-def PyRC_Plugin_Crash(details, module_name, plugin_name, plugin_version, dictionary, log_file):
-	return {
-	 'eventname': "Plugin Crash",
-	 'module': module_name,
-	 'trace': details,
-	 'pluginname': plugin_name,
-	 'pluginversion': plugin_version,
-	 'event': dictionary,
-	 'logfile': log_file
-	}
-	
-def PyRC_Plugin_Disable(module_name, plugin_name, plugin_version):
-	return {
-	 'eventname': "Plugin Disable",
-	 'module': module_name,
-	 'pluginname': plugin_name,
-	 'pluginversion': plugin_version
-	}
-	
-def PyRC_Plugin_Enable(module_name, plugin_name, plugin_version):
-	return {
-	 'eventname': "Plugin Enable",
-	 'module': module_name,
-	 'pluginname': plugin_name,
-	 'pluginversion': plugin_version
-	}
-	
-def PyRC_Plugin_Load(module_name, plugin_name, plugin_version):
-	return {
-	 'eventname': "Plugin Load",
-	 'module': module_name,
-	 'pluginname': plugin_name,
-	 'pluginversion': plugin_version
-	}
-	
-def PyRC_Plugin_Load_Error(module_name, details, log_file):
-	return {
-	 'eventname': "Plugin Load Error",
-	 'module': module_name,
-	 'trace': details,
-	 'logfile': log_file
-	}
-	
-def PyRC_Plugin_Reload(module_name, plugin_name, plugin_version):
-	return {
-	 'eventname': "Plugin Reload",
-	 'module': module_name,
-	 'pluginname': plugin_name,
-	 'pluginversion': plugin_version
-	}
-	
-def PyRC_Plugin_Status(plugin_name, plugin_version, text):
-	return {
-	 'eventname': "Plugin Status",
-	 'pluginname': plugin_name,
-	 'pluginversion': plugin_version,
-	 'message': text
-	}
-	
-def PyRC_Processing_Error(details):
-	return {
-	 'eventname': "Processing Error",
-	 'trace': details
-	}
-	
-def PyRC_Status(text):
-	return {
-	 'eventname': "PyRC Status",
-	 'message': text
-	}
-	
-def PyRC_Time_Signal(timestamp, scale):
-	return{
-	 'eventname': "Time Signal",
-	 'timestamp': timestamp,
-	 'scale': scale
-	}
-	
-def Server_Connection_Error(context_id, network_name, description):
-	return {
-	 'eventname': "Server Connection Error",
-	 'irccontext': context_id,
-	 'message': description
-	}
-	
-def Server_Connection_Success(context_id, network_name, address, port, nickname, ident, real_name, password, ssl):
-	return {
-	 'eventname': "Server Connection Success",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'address': address,
-	 'port': port,
-	 'username': nickname,
-	 'ident': ident,
-	 'realname': real_name,
-	 'password': password,
-	 'ssl': ssl
-	}
-	
-def Server_Disconnection(context_id, network_name, reason, local_cause):
-	return {
-	 'eventname': "Server Disconnection",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'message': reason,
-	 'localcause': local_cause
-	}
-	
-def Server_Information(context_id, network_name, server_address, server_version, user_modes, channel_modes):
-	return {
-	 'eventname': "Server Information",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'serveraddress': server_address,
-	 'serverversion': server_version,
-	 'usermodes': user_modes,
-	 'channelmodes': channel_modes,
-	}
-	
-def Server_Kill(context_id, network_name, user_name, reason, user_data):
-	return {
-	 'eventname': "Server Kill",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'username': target,
-	 'message': reason,
-	 'userdata': user_data
-	}
-	
-def Server_Message(context_id, network_name, message):
-	return {
-	 'eventname': "Server Message",
-	 'networkname': network_name,
-	 'irccontext': context_id,
-	 'message': message
-	}
-	
-def Server_MOTD(context_id, network_name, motd):
-	return {
-	 'eventname': "Server MOTD",
-	 'networkname': network_name,
-	 'irccontext': context_id,
-	 'motd': motd
-	}
-	
-def Server_Protocol_Error(context_id, network_name, description):
-	return {
-	 'eventname': "Server Protocol Error",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'message': description
-	}
-	
-def Server_Reconnection_Error(context_id, network_name, description):
-	return {
-	 'eventname': "Server Reconnection Error",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'message': description
-	}
-	
-def Server_Reconnection_Success(context_id, network_name, address, port, nickname, ident, realname, password, ssl):
-	return {
-	 'eventname': "Server Reconnection Success",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'address': address,
-	 'port': port,
-	 'nickname': nickname,
-	 'realname': realname,
-	 'ident': ident,
-	 'password': password,
-	 'ssl': ssl
-	}
-	
-def Server_Welcome(context_id, network_name, message):
-	return {
-	 'eventname': "Server Welcome",
-	 'irccontext': context_id,
-	 'networkname': network_name,
-	 'message': message
-	}
-	
\ No newline at end of file
+class EventDictionary(object):
+	"""
+	This class serves as the base from which all outbound Event Dictionaries
+	are derived.
+	
+	Event Dictionaries are shared by every plugin that receives them, so they
+	cannot be modified; any attempt to do so raises a TypeError. Plugins that
+	need a modified version, such as one to return in a "replace" Raise Event
+	Dictionary, should call copy(), which returns an ordinary dict.
+	
+	Only the top level is protected; nested structures, like 'userdata', must
+	be treated as read-only by convention.
+	
+	Subclasses are built by _buildEventClass(); each stores its values in
+	__slots__ named after its keys, and its 'eventname' in a class attribute.
+	Values may therefore also be read as attributes, like dictionary.channel,
+	which is several times faster than indexing.
+	"""
+	__slots__ = ()
+	eventname = None #: The IAL-recognized name of this type of event.
+	_arguments = () #: The keys this type of event accepts, in the order in which its constructor accepts them; None marks arguments that are discarded.
+	_keys = () #: The keys of this type of event, including 'eventname'.
+	_key_set = frozenset() #: The keys of this type of event, used for fast membership tests.
+	
+	def __getitem__(self, key):
+		"""
+		This function returns the value associated with a key.
+		
+		@type key: basestring
+		@param key: The key to look up.
+		
+		@rtype: variable
+		@return: The associated value.
+		
+		@raise KeyError: If this type of event has no such key.
+		"""
+		if key in self._key_set:
+			return getattr(self, key)
+		raise KeyError(key)
+		
+	def get(self, key, default=None):
+		"""
+		This function returns the value associated with a key, if there is one.
+		
+		@type key: basestring
+		@param key: The key to look up.
+		@type default: variable
+		@param default: The value to return if this type of event has no such
+		    key.
+		
+		@rtype: variable
+		@return: The associated value, or the default value.
+		"""
+		if key in self._key_set:
+			return getattr(self, key)
+		return default
+		
+	def __contains__(self, key):
+		"""
+		This function indicates whether this type of event has a key.
+		
+		@type key: basestring
+		@param key: The key to look up.
+		
+		@rtype: bool
+		@return: True if the key is present.
+		"""
+		return key in self._key_set
+	has_key = __contains__
+	
+	def __len__(self):
+		"""
+		This function returns the number of keys in this dictionary.
+		
+		@rtype: int
+		@return: The number of keys.
+		"""
+		return len(self._keys)
+		
+	def __iter__(self):
+		"""
+		This function iterates over the keys of this dictionary.
+		
+		@rtype: iterator
+		@return: An iterator over the keys.
+		"""
+		return iter(self._keys)
+	iterkeys = __iter__
+	
+	def keys(self):
+		"""
+		This function returns the keys of this dictionary.
+		
+		@rtype: list
+		@return: A list of keys.
+		"""
+		return list(self._keys)
+		
+	def itervalues(self):
+		"""
+		This function iterates over the values of this dictionary.
+		
+		@rtype: generator
+		@return: A generator that yields each value, in the order of keys().
+		"""
+		for i in self._keys:
+			yield getattr(self, i)
+			
+	def values(self):
+		"""
+		This function returns the values of this dictionary.
+		
+		@rtype: list
+		@return: A list of values, in the order of keys().
+		"""
+		return [getattr(self, i) for i in self._keys]
+		
+	def iteritems(self):
+		"""
+		This function iterates over the items of this dictionary.
+		
+		@rtype: generator
+		@return: A generator that yields (key, value) tuples.
+		"""
+		for i in self._keys:
+			yield (i, getattr(self, i))
+			
+	def items(self):
+		"""
+		This function returns the items of this dictionary.
+		
+		@rtype: list
+		@return: A list of (key, value) tuples.
+		"""
+		return [(i, getattr(self, i)) for i in self._keys]
+		
+	def copy(self):
+		"""
+		This function returns a modifiable copy of this dictionary.
+		
+		@rtype: dict
+		@return: An ordinary dict with the same items.
+		"""
+		return dict(self.items())
+		
+	def __eq__(self, other):
+		"""
+		This function compares this dictionary with another mapping.
+		
+		@type other: variable
+		@param other: The object to compare against.
+		
+		@rtype: bool
+		@return: True if the other object is a dict or EventDictionary with the
+		    same items.
+		"""
+		if isinstance(other, EventDictionary):
+			other = other.copy()
+		elif not isinstance(other, dict):
+			return False
+		return self.copy() == other
+		
+	def __ne__(self, other):
+		"""
+		This function compares this dictionary with another mapping.
+		
+		@type other: variable
+		@param other: The object to compare against.
+		
+		@rtype: bool
+		@return: False if the other object is a dict or EventDictionary with the
+		    same items.
+		"""
+		return not self == other
+	__hash__ = None
+	
+	def __repr__(self):
+		"""
+		This function returns a representation of this dictionary, identical to
+		that of an equivalent dict, so that logs are unaffected.
+		
+		@rtype: str
+		@return: The representation of this dictionary.
+		"""
+		return repr(self.copy())
+		
+	def __reduce__(self):
+		"""
+		This function allows EventDictionaries to be copied and pickled without
+		modifying them after their creation.
+		
+		@rtype: tuple
+		@return: The information needed to rebuild this dictionary.
+		"""
+		return (self.__class__, tuple([i and getattr(self, i) for i in self._arguments]))
+		
+	def _readOnly(self, *args, **kwargs):
+		"""
+		This function replaces every dict function that would modify this
+		dictionary.
+		
+		@raise TypeError: Always.
+		"""
+		raise TypeError("Event Dictionaries are read-only; use copy() to obtain a modifiable dictionary.")
+	__setitem__ = _readOnly
+	__delitem__ = _readOnly
+	clear = _readOnly
+	pop = _readOnly
+	popitem = _readOnly
+	setdefault = _readOnly
+	update = _readOnly
+	
+class _FrozenDictionary(dict, EventDictionary):
+	"""
+	This class represents an Event Dictionary that was built outside of this
+	module, such as by a plugin, and made read-only by freezeDictionary().
+	
+	Its keys are not known in advance, so it is a dict, rather than a slotted
+	class.
+	"""
+	__slots__ = ()
+	
+	def __reduce__(self):
+		"""
+		This function allows _FrozenDictionaries to be copied and pickled
+		without modifying them after their creation.
+		
+		@rtype: tuple
+		@return: The information needed to rebuild this dictionary.
+		"""
+		return (_FrozenDictionary, (dict(self),))
+		
+	__setitem__ = EventDictionary._readOnly.im_func
+	__delitem__ = EventDictionary._readOnly.im_func
+	clear = EventDictionary._readOnly.im_func
+	pop = EventDictionary._readOnly.im_func
+	popitem = EventDictionary._readOnly.im_func
+	setdefault = EventDictionary._readOnly.im_func
+	update = EventDictionary._readOnly.im_func
+	
+def freezeDictionary(dictionary):
+	"""
+	This function makes an Event Dictionary built outside of this module, such
+	as one provided by a plugin, safe to share.
+	
+	@type dictionary: dict|EventDictionary
+	@param dictionary: The Event Dictionary to be shared.
+	
+	@rtype: EventDictionary
+	@return: The given dictionary, if it is already read-only, or a read-only
+	    copy.
+	"""
+	if isinstance(dictionary, EventDictionary):
+		return dictionary
+	return _FrozenDictionary(dictionary)
+	
+def _buildEventClass(name, eventname, arguments):
+	"""
+	This function generates the class used to represent one type of outbound
+	Event Dictionary.
+	
+	The generated class's constructor accepts one positional argument for each
+	element of arguments, storing it under the key that element names.
+	
+	@type name: str
+	@param name: The name of the class, which must match the name to which it
+	    is bound in this module, so that its instances can be pickled.
+	@type eventname: str
+	@param eventname: The value of the 'eventname' key.
+	@type arguments: tuple
+	@param arguments: The keys of the Event Dictionary, in the order in which
+	    their values are passed to the constructor. A None element causes the
+	    corresponding argument to be accepted and discarded.
+	
+	@rtype: type
+	@return: A subclass of EventDictionary.
+	"""
+	keys = tuple([i for i in arguments if i])
+	parameters = []
+	for (position, key) in enumerate(arguments):
+		parameters.append(key or "unused_%i" % position)
+		
+	#A constructor that assigns each slot directly is several times faster than
+	#one that loops over the keys.
+	source = ["def __init__(self, %s):" % ', '.join(parameters)]
+	for i in keys:
+		source.append("\tself.%s = %s" % (i, i))
+	if not keys:
+		source.append("\tpass")
+	namespace = {}
+	exec '\n'.join(source) in namespace
+	
+	return type(name, (EventDictionary,), {
+	 '__slots__': keys,
+	 '__module__': __name__,
+	 '__init__': namespace['__init__'],
+	 'eventname': eventname,
+	 '_arguments': tuple(arguments),
+	 '_keys': ('eventname',) + keys,
+	 '_key_set': frozenset(('eventname',) + keys)
+	})
+	
+IRC_Channel_Banlist = _buildEventClass("IRC_Channel_Banlist", "Channel Banlist", ('irccontext', 'networkname', 'channel', 'banlist'))
+IRC_Channel_Close = _buildEventClass("IRC_Channel_Close", "Channel Close", ('irccontext', 'networkname', 'channel', 'message', 'kick', 'kicker'))
+IRC_Channel_Created = _buildEventClass("IRC_Channel_Created", "Channel Created", ('irccontext', 'networkname', 'channel', 'timestamp'))
+IRC_Channel_Information = _buildEventClass("IRC_Channel_Information", "Channel Information", ('irccontext', 'networkname', 'channel', 'message'))
+IRC_Channel_Invite = _buildEventClass("IRC_Channel_Invite", "Channel Invite", ('irccontext', 'networkname', 'channel', 'userdata'))
+IRC_Channel_Join = _buildEventClass("IRC_Channel_Join", "Channel Join", ('irccontext', 'networkname', 'timestamp', 'topicwho', 'topictime', 'channeldata'))
+IRC_Channel_Membership_Delta = _buildEventClass("IRC_Channel_Membership_Delta", "Channel Membership Delta", ('irccontext', 'networkname', 'channel', 'version', 'added', 'removed', 'renamed', 'ranks'))
+IRC_Channel_Message = _buildEventClass("IRC_Channel_Message", "Channel Message", ('irccontext', 'networkname', 'channel', 'message', 'action', 'userdata'))
+IRC_Channel_Message_Local = _buildEventClass("IRC_Channel_Message_Local", "Channel Message Local", ('irccontext', 'networkname', 'channel', 'message', 'action', 'username'))
+IRC_Channel_Modes = _buildEventClass("IRC_Channel_Modes", "Channel Modes", ('irccontext', 'networkname', 'channel', 'modestring', 'modestringsafe', 'modes'))
+IRC_Channel_Modes_Update = _buildEventClass("IRC_Channel_Modes_Update", "Channel Modes Update", ('irccontext', 'networkname', 'channel', 'changes', 'changestring', 'usermodes', 'modes', 'modestring', 'modestringsafe', 'userdata'))
+IRC_Channel_Names = _buildEventClass("IRC_Channel_Names", "Channel Names", ('irccontext', 'networkname', 'channel', 'users'))
+IRC_Channel_Topic = _buildEventClass("IRC_Channel_Topic", "Channel Topic", ('irccontext', 'networkname', 'channel', 'topic'))
+IRC_Channel_Topic_Information = _buildEventClass("IRC_Channel_Topic_Information", "Channel Topic Information", ('irccontext', 'networkname', 'channel', 'topicwho', 'topictime'))
+IRC_Channel_Topic_New = _buildEventClass("IRC_Channel_Topic_New", "Channel Topic New", ('irccontext', 'networkname', 'channel', 'topic', 'userdata'))
+IRC_Channel_User_Join = _buildEventClass("IRC_Channel_User_Join", "Channel User Join", ('irccontext', 'networkname', 'channel', 'userdata'))
+IRC_Channel_User_Part = _buildEventClass("IRC_Channel_User_Part", "Channel User Part", ('irccontext', 'networkname', 'channel', 'message', 'userdata', 'kick', 'kicker'))
+IRC_CTCP_Request = _buildEventClass("IRC_CTCP_Request", "CTCP Request", ('irccontext', 'networkname', 'userdata', 'target', 'event', 'data', 'handled'))
+IRC_CTCP_Response = _buildEventClass("IRC_CTCP_Response", "CTCP Response", ('irccontext', 'networkname', 'userdata', 'event', 'data'))
+IRC_IsOn_Response = _buildEventClass("IRC_IsOn_Response", "IsOn Response", ('irccontext', 'networkname', 'ison', 'username'))
+IRC_Object_Information = _buildEventClass("IRC_Object_Information", "Object Information", ('irccontext', 'networkname', 'object', 'message'))
+IRC_Ping = _buildEventClass("IRC_Ping", "Ping", ('irccontext', 'networkname', 'data', 'userdata'))
+IRC_Ping_Timeout = _buildEventClass("IRC_Ping_Timeout", "Ping Timeout", ('irccontext', 'networkname', 'username'))
+IRC_Ping_Timeout_Check = _buildEventClass("IRC_Ping_Timeout_Check", "Ping Timeout Check", ('irccontext', 'networkname'))
+IRC_Pong = _buildEventClass("IRC_Pong", "Pong", ('irccontext', 'networkname', 'pingtime', 'userdata'))
+IRC_Raw_Command = _buildEventClass("IRC_Raw_Command", "Raw Command", ('irccontext', 'networkname', 'data'))
+IRC_Raw_Event = _buildEventClass("IRC_Raw_Event", "Raw Event", ('irccontext', 'networkname', 'data'))
+IRC_User_Logon = _buildEventClass("IRC_User_Logon", "User Logon", ('irccontext', 'networkname', 'type', 'timestamp', 'data', 'userdata'))
+IRC_User_Modes = _buildEventClass("IRC_User_Modes", "User Modes", ('irccontext', 'networkname', 'username', 'changes', 'changestring', 'modes', 'modestring'))
+IRC_User_Notice = _buildEventClass("IRC_User_Notice", "User Notice", ('irccontext', 'networkname', 'text', 'target', 'userdata'))
+IRC_User_Nickname_Change = _buildEventClass("IRC_User_Nickname_Change", "User Nickname Change", ('irccontext', 'networkname', 'nickname', 'channels', 'userdata', 'islocal'))
+IRC_User_Private_Message = _buildEventClass("IRC_User_Private_Message", "Private Message", ('irccontext', 'networkname', 'message', 'action', 'userdata'))
+IRC_User_Private_Message_Local = _buildEventClass("IRC_User_Private_Message_Local", "Private Message Local", ('irccontext', 'networkname', 'target', 'message', 'action', 'username'))
+IRC_User_Quit = _buildEventClass("IRC_User_Quit", "User Quit", ('irccontext', 'networkname', 'message', 'channels', 'userdata'))
+IRC_User_Who_Fail = _buildEventClass("IRC_User_Who_Fail", "Who Fail", ('irccontext', 'networkname', 'username'))
+IRC_User_Who_Response = _buildEventClass("IRC_User_Who_Response", "Who Response", ('irccontext', 'networkname', 'channels', 'userdata'))
+IRC_User_WhoIs_Response = _buildEventClass("IRC_User_WhoIs_Response", "WhoIs Response", ('irccontext', 'networkname', 'ircserver', 'servername', 'timeinfo', 'channels', 'modes', 'bot', 'chanop', 'help', 'operator', 'registered', 'secure', 'data', 'userdata', 'address'))
+IRC_User_WhoWas_Fail = _buildEventClass("IRC_User_WhoWas_Fail", "WhoWas Fail", ('irccontext', 'networkname', 'username'))
+IRC_User_WhoWas_Response = _buildEventClass("IRC_User_WhoWas_Response", "WhoWas Response", ('irccontext', 'networkname', 'ircserver', 'timestring', 'userdata'))
+PyRC_Implement_Me = _buildEventClass("PyRC_Implement_Me", "Implement Me", ('details', 'raw'))
+PyRC_Initialised = _buildEventClass("PyRC_Initialised", "Initialised", ())
+PyRC_Plugin_Crash = _buildEventClass("PyRC_Plugin_Crash", "Plugin Crash", ('trace', 'module', 'pluginname', 'pluginversion', 'event', 'logfile'))
+PyRC_Plugin_Disable = _buildEventClass("PyRC_Plugin_Disable", "Plugin Disable", ('module', 'pluginname', 'pluginversion'))
+PyRC_Plugin_Enable = _buildEventClass("PyRC_Plugin_Enable", "Plugin Enable", ('module', 'pluginname', 'pluginversion'))
+PyRC_Plugin_Load = _buildEventClass("PyRC_Plugin_Load", "Plugin Load", ('module', 'pluginname', 'pluginversion'))
+PyRC_Plugin_Load_Error = _buildEventClass("PyRC_Plugin_Load_Error", "Plugin Load Error", ('module', 'trace', 'logfile'))
+PyRC_Plugin_Reload = _buildEventClass("PyRC_Plugin_Reload", "Plugin Reload", ('module', 'pluginname', 'pluginversion'))
+PyRC_Plugin_Status = _buildEventClass("PyRC_Plugin_Status", "Plugin Status", ('pluginname', 'pluginversion', 'message'))
+PyRC_Processing_Error = _buildEventClass("PyRC_Processing_Error", "Processing Error", ('trace',))
+PyRC_Status = _buildEventClass("PyRC_Status", "PyRC Status", ('message',))
+PyRC_Time_Signal = _buildEventClass("PyRC_Time_Signal", "Time Signal", ('timestamp', 'scale'))
+PyRC_Timer_Expired = _buildEventClass("PyRC_Timer_Expired", "Timer Expired", ('module', 'name', 'scheduled', 'timestamp'))
+Server_Connection_Error = _buildEventClass("Server_Connection_Error", "Server Connection Error", ('irccontext', None, 'message'))
+Server_Connection_Success = _buildEventClass("Server_Connection_Success", "Server Connection Success", ('irccontext', 'networkname', 'address', 'port', 'username', 'ident', 'realname', 'password', 'ssl'))
+Server_Disconnection = _buildEventClass("Server_Disconnection", "Server Disconnection", ('irccontext', 'networkname', 'message', 'localcause'))
+Server_Events_Shed = _buildEventClass("Server_Events_Shed", "Server Events Shed", ('irccontext', 'networkname', 'events'))
+Server_Information = _buildEventClass("Server_Information", "Server Information", ('irccontext', 'networkname', 'serveraddress', 'serverversion', 'usermodes', 'channelmodes'))
+Server_Kill = _buildEventClass("Server_Kill", "Server Kill", ('irccontext', 'networkname', 'username', 'message', 'userdata'))
+Server_Message = _buildEventClass("Server_Message", "Server Message", ('irccontext', 'networkname', 'message'))
+Server_MOTD = _buildEventClass("Server_MOTD", "Server MOTD", ('irccontext', 'networkname', 'motd'))
+Server_Protocol_Error = _buildEventClass("Server_Protocol_Error", "Server Protocol Error", ('irccontext', 'networkname', 'message'))
+Server_Reconnection_Error = _buildEventClass("Server_Reconnection_Error", "Server Reconnection Error", ('irccontext', 'networkname', 'message'))
+Server_Reconnection_Success = _buildEventClass("Server_Reconnection_Success", "Server Reconnection Success", ('irccontext', 'networkname', 'address', 'port', 'nickname', 'ident', 'realname', 'password', 'ssl'))
+Server_Welcome = _buildEventClass("Server_Welcome", "Server Welcome", ('irccontext', 'networkname', 'message'))
+	
+	
+#Benchmarking interface
+if __name__ == "__main__":
+	import gc
+	import sys
+	import time
+	
+	_EVENT_COUNT = 1000000 #: The number of synthetic "Channel Message" events to build.
+	
+	def _legacyChannelMessage(context_id, network_name, channel, message, action, user_data):
+		"""
+		This function reproduces the dict-based factory that preceded
+		IRC_Channel_Message, for comparison.
+		
+		@rtype: dict
+		@return: A "Channel Message" Event Dictionary.
+		"""
+		return {
+		 'eventname': "Channel Message",
+		 'irccontext': context_id,
+		 'networkname': network_name,
+		 'channel': channel,
+		 'message': message,
+		 'action': action,
+		 'userdata': user_data
+		}
+		
+	count = _EVENT_COUNT
+	if len(sys.argv) > 1:
+		count = int(sys.argv[1])
+		
+	user_data = {'username': u"flan"}
+	messages = [u"Message number %i" % i for i in xrange(1000)]
+	for (name, factory) in (("dict", _legacyChannelMessage), ("EventDictionary", IRC_Channel_Message)):
+		gc.collect()
+		start_time = time.time()
+		events = [factory(1, u"ZiRC", u"#animesuki.os", messages[i % 1000], False, user_data) for i in xrange(count)]
+		elapsed = time.time() - start_time
+		
+		size = sys.getsizeof(events[0]) * count
+		start_time = time.time()
+		for i in events:
+			i['message']
+			i['channel']
+			i.get('userdata')
+		read_time = time.time() - start_time
+		print "%s: built %i events in %.3f seconds; %.1f MiB (%i bytes each); three reads each in %.3f seconds" % (name, count, elapsed, size / 1048576.0, sys.getsizeof(events[0]), read_time)
+		del events
+		
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_common.scheduler
+
+Purpose
+=======
+ Run PyRC's timed callbacks from a single thread that sleeps until the
+ earliest of them falls due.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2007
+"""
+import heapq
+import itertools
+import os
+import select
+import threading
+import time
+
+_WAKE_INTERVAL = 1.0 #: The longest the scheduler may sleep if it cannot be woken by a pipe; timers scheduled while it sleeps may fire this late.
+_COMPACTION_THRESHOLD = 64 #: The number of cancelled timers that may wait in the heap before it is rebuilt without them, provided they make up at least half of it.
+
+_scheduler = None #: The Scheduler shared by all of PyRC, created on first use.
+_scheduler_lock = threading.Lock() #: A lock used to prevent multiple simultaneous creations of the shared Scheduler.
+
+class Timer(object):
+	"""
+	This class represents a callback that has been scheduled to run at a
+	specific time.
+	"""
+	_scheduler = None #: The Scheduler that will run this timer.
+	_time = None #: The UNIX timestamp at which this timer is due.
+	_callback = None #: The function to call when this timer is due.
+	_arguments = None #: A tuple of the arguments to pass to the callback.
+	_cancelled = False #: True if this timer should not run.
+	
+	def __init__(self, scheduler, due_time, callback, arguments):
+		"""
+		This function is invoked when a new Timer object is created.
+		
+		Timers should be created with Scheduler.schedule() or
+		Scheduler.scheduleAt(), rather than directly.
+		
+		@type scheduler: Scheduler
+		@param scheduler: The Scheduler that will run the timer.
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the timer is due.
+		@type callback: callable
+		@param callback: The function to call when the timer is due.
+		@type arguments: tuple
+		@param arguments: The arguments to pass to the callback.
+		
+		@return: Nothing.
+		"""
+		self._scheduler = scheduler
+		self._time = due_time
+		self._callback = callback
+		self._arguments = arguments
+		
+	def cancel(self):
+		"""
+		This function prevents the timer from running, if it has not already
+		done so.
+		
+		@return: Nothing.
+		"""
+		self._scheduler.cancel(self)
+		
+	def getTime(self):
+		"""
+		This function returns the time at which the timer is due.
+		
+		@rtype: float
+		@return: A UNIX timestamp.
+		"""
+		return self._time
+		
+	def isCancelled(self):
+		"""
+		This function indicates whether the timer has been cancelled.
+		
+		@rtype: bool
+		@return: True if the timer will not run.
+		"""
+		return self._cancelled
+		
+	def run(self):
+		"""
+		This function invokes the timer's callback, unless the timer has been
+		cancelled.
+		
+		@return: Nothing.
+		"""
+		if not self._cancelled:
+			self._callback(*self._arguments)
+			
+	def setCancelled(self):
+		"""
+		This function marks the timer as cancelled.
+		
+		It should only be called by the timer's Scheduler; use cancel()
+		instead.
+		
+		@rtype: bool
+		@return: True if the timer had not already been cancelled.
+		"""
+		if self._cancelled:
+			return False
+		self._cancelled = True
+		return True
+		
+		
+class Scheduler(threading.Thread):
+	"""
+	This class runs timers from a single thread.
+	
+	Timers are kept in a heap, ordered by the time at which they fall due, and
+	the thread sleeps until the earliest of them does, or until an earlier one
+	is scheduled, so it consumes no CPU time while nothing is due. Cancelled
+	timers are left in the heap and skipped when reached.
+	
+	Callbacks are run by the scheduler's thread, one after another, so they
+	must return promptly.
+	"""
+	_alive = True #: True until the thread is no longer useful.
+	_lock = None #: A lock used to prevent multiple simultaneous accesses to the heap.
+	_heap = None #: A heap of (<due_time:float>, <sequence:int>, <:Timer>) tuples; the sequence keeps timers that are due at the same time in the order in which they were scheduled.
+	_sequence = None #: An itertools.count that supplies the sequence numbers of new timers.
+	_cancelled_count = 0 #: The number of cancelled timers that may still be in the heap.
+	_wake_pipe = None #: A tuple containing the read and write ends of a pipe used to interrupt sleeping, or None if the platform can't select() pipes.
+	
+	def __init__(self):
+		"""
+		This function is invoked when a new Scheduler object is created.
+		
+		@return: Nothing.
+		"""
+		threading.Thread.__init__(self)
+		self._lock = threading.Lock()
+		self._heap = []
+		self._sequence = itertools.count()
+		
+		try:
+			import fcntl
+			self._wake_pipe = os.pipe()
+			for i in self._wake_pipe:
+				fcntl.fcntl(i, fcntl.F_SETFL, fcntl.fcntl(i, fcntl.F_GETFL) | os.O_NONBLOCK)
+		except (ImportError, OSError): #Microsoft platforms can only select() sockets.
+			self._wake_pipe = None
+			
+		self.setDaemon(True)
+		self.setName("Scheduler")
+		
+	def cancel(self, timer):
+		"""
+		This function prevents a timer from running, if it has not already done
+		so.
+		
+		@type timer: Timer
+		@param timer: The timer to be cancelled.
+		
+		@return: Nothing.
+		"""
+		self._lock.acquire()
+		
+		if timer.setCancelled():
+			self._cancelled_count += 1
+			if self._cancelled_count >= _COMPACTION_THRESHOLD and self._cancelled_count * 2 >= len(self._heap):
+				self._heap = [i for i in self._heap if not i[2].isCancelled()]
+				heapq.heapify(self._heap)
+				self._cancelled_count = 0
+				
+		self._lock.release()
+		
+	def getTimerCount(self):
+		"""
+		This function returns the number of timers waiting to run.
+		
+		@rtype: int
+		@return: The number of timers in the heap, including cancelled timers
+		    that have not yet been discarded.
+		"""
+		self._lock.acquire()
+		try:
+			return len(self._heap)
+		finally:
+			self._lock.release()
+			
+	def kill(self):
+		"""
+		This function terminates the Scheduler's execution after its current
+		iteration.
+		
+		@return: Nothing.
+		"""
+		self._alive = False
+		self._wake()
+		
+	def schedule(self, delay, callback, arguments=()):
+		"""
+		This function arranges for a function to be called after a number of
+		seconds have elapsed.
+		
+		@type delay: float
+		@param delay: The number of seconds to wait.
+		@type callback: callable
+		@param callback: The function to call.
+		@type arguments: tuple
+		@param arguments: The arguments to pass to the function.
+		
+		@rtype: Timer
+		@return: The timer, which may be used to cancel the call.
+		"""
+		return self.scheduleAt(time.time() + delay, callback, arguments)
+		
+	def scheduleAt(self, due_time, callback, arguments=()):
+		"""
+		This function arranges for a function to be called at a specific time.
+		
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the function should be
+		    called. Times in the past are due immediately.
+		@type callback: callable
+		@param callback: The function to call.
+		@type arguments: tuple
+		@param arguments: The arguments to pass to the function.
+		
+		@rtype: Timer
+		@return: The timer, which may be used to cancel the call.
+		"""
+		timer = Timer(self, due_time, callback, tuple(arguments))
+		self._lock.acquire()
+		
+		heapq.heappush(self._heap, (due_time, self._sequence.next(), timer))
+		earliest = self._heap[0][2] is timer
+		
+		self._lock.release()
+		if earliest: #The thread may be sleeping past the new timer.
+			self._wake()
+		return timer
+		
+	def run(self):
+		"""
+		This function is executed over the course of the Scheduler's lifetime.
+		
+		It runs every timer that has fallen due, then sleeps until the next one
+		does.
+		
+		@return: Nothing.
+		"""
+		while self._alive:
+			current_time = time.time()
+			due_timers = []
+			timeout = None
+			self._lock.acquire()
+			
+			heap = self._heap
+			while heap and heap[0][0] <= current_time:
+				timer = heapq.heappop(heap)[2]
+				if timer.isCancelled():
+					self._cancelled_count = max(0, self._cancelled_count - 1)
+				else:
+					due_timers.append(timer)
+			if heap:
+				timeout = heap[0][0] - current_time
+				
+			self._lock.release()
+			
+			if due_timers:
+				for i in due_timers:
+					try:
+						i.run()
+					except Exception: #A single misbehaving callback must not stall every other timer.
+						pass
+			else:
+				self._sleep(timeout)
+				
+	def _sleep(self, timeout):
+		"""
+		This function waits until a timeout expires or the thread is woken by
+		_wake().
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait, or None to wait until
+		    woken.
+		
+		@return: Nothing.
+		"""
+		if not self._wake_pipe:
+			if timeout is None or timeout > _WAKE_INTERVAL:
+				timeout = _WAKE_INTERVAL
+			time.sleep(timeout)
+			return
+			
+		try:
+			if select.select([self._wake_pipe[0]], [], [], timeout)[0]:
+				try:
+					while os.read(self._wake_pipe[0], 4096):
+						pass
+				except OSError: #The pipe has been drained.
+					pass
+		except (select.error, IOError, OSError): #Interrupted by a signal.
+			pass
+			
+	def _wake(self):
+		"""
+		This function interrupts the thread's current sleep, forcing it to
+		re-evaluate its timers.
+		
+		@return: Nothing.
+		"""
+		if self._wake_pipe:
+			try:
+				os.write(self._wake_pipe[1], 'x')
+			except OSError: #The pipe is full, so the thread is already due to wake.
+				pass
+				
+				
+def getScheduler():
+	"""
+	This function returns the Scheduler shared by all of PyRC, creating and
+	starting it if necessary.
+	
+	@rtype: Scheduler
+	@return: The shared Scheduler.
+	"""
+	global _scheduler
+	try:
+		_scheduler_lock.acquire()
+		if not _scheduler:
+			_scheduler = Scheduler()
+			_scheduler.start()
+		return _scheduler
+	finally:
+		_scheduler_lock.release()
+		
@@ -128,6 +128,8 @@ def _getNetworkDetailsFromNode(node):
 		  'description': <user-specified_network_description:unicode|None>,
 		  'autoconnect': <auto_connect:bool>,
 		  'workerthreads': <worker_threads:int>,
+		  'floodburst': <flood_burst:int>,
+		  'eventqueuesize': <event_queue_size:int>,
 		  'proxy': <proxy_identifier:unicode|None>,
 		  'addresses': <(randomize_addresses:bool, addresses_data:list)>,
 		  'profiles': <(use_all:bool, profile_data:tuple)>,
@@ -143,6 +145,16 @@ def _getNetworkDetailsFromNode(node):
 			workerthreads = int(workerthreads)
 		else:
 			workerthreads = GLOBAL.USR_SERVER_THREADS	
+		floodburst = parsers.xml_getAttributeValue(node, 'floodburst')
+		if floodburst:
+			floodburst = int(floodburst)
+		else:
+			floodburst = GLOBAL.IRC_FLOOD_BURST
+		eventqueuesize = parsers.xml_getAttributeValue(node, 'eventqueuesize')
+		if eventqueuesize:
+			eventqueuesize = int(eventqueuesize)
+		else:
+			eventqueuesize = GLOBAL.IRC_EVENT_QUEUE_SIZE
 		proxy = parsers.xml_getAttributeValue(node, 'proxy')
 		
 		name = parsers.xml_getSubNodeValue(node, "name")
@@ -194,6 +206,8 @@ def _getNetworkDetailsFromNode(node):
 		 'description': description,
 		 'autoconnect': autoconnect,
 		 'workerthreads': workerthreads,
+		 'floodburst': floodburst,
+		 'eventqueuesize': eventqueuesize,
 		 'proxy': proxy,
 		 'addresses': (addresses_random, addresses),
 		 'profiles': (profiles_use_all, tuple(profiles)),
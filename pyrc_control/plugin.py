@@ -18,6 +18,10 @@ import sys
 import imp
 import time
 import threading
+import collections
+
+import timers
+import triggers
 
 import pyrc_common.GLOBAL as GLOBAL
 import pyrc_common.asynch
@@ -41,6 +45,8 @@ _LOAD_MODE_RELOAD = -1 #: The load type identifier to pass to plugins when they
 _UNLOAD_MODE_DISABLE = 1 #: The unload type identifier to pass to plugins when they are being disabled.
 _UNLOAD_MODE_RELOAD = -1 #: The unload type identifier to pass to plugins when they are being reloaded. The negative value is used to prevent >= approaches, since this is a debug/development feature, and it should not be used in mature plugins.
 
+_MAILBOX_SIZE = 1000 #: The number of Event Dictionaries an observer plugin may have waiting before the oldest are discarded.
+
 _plugins = {}
 """
 This is a dictionary of all managed plugins.
@@ -48,6 +54,35 @@ This is a dictionary of all managed plugins.
 Its elements take the following form::
  <module_name:string>: <plugin_wrapper:_Plugin>
 """
+_plugin_order = []
+"""
+This is a list of all managed plugins, in the order in which they were loaded.
+
+Plugins receive events in this order.
+"""
+_subscriptions = {}
+"""
+This is an index of the plugins that handle each type of Event Dictionary.
+
+It is rebuilt whenever a plugin is loaded, enabled, or disabled, and it is
+replaced rather than modified, so broadcasting threads never need to lock it.
+
+Its elements take the following form::
+ (<eventname:string>, <unwrapped:bool>): <subscribers:tuple(tuple(_Plugin, _SourceFilter|None, triggers.Trigger|None))>
+"""
+_trigger_matchers = {}
+"""
+This is an index of the triggers.TriggerMatcher objects used to match the
+text of each type of Event Dictionary against every trigger declared for it.
+
+It is rebuilt along with _subscriptions.
+
+Its elements take the following form::
+ (<eventname:string>, <unwrapped:bool>): <matcher:triggers.TriggerMatcher>
+"""
+_subscription_lock = threading.Lock() #: A lock used to prevent multiple simultaneous rebuilds of the subscription index.
+_source_filters = {} #: A dictionary of compiled _SourceFilter objects, keyed by their normalised specifications, so that plugins declaring identical filters share one object.
+_source_filter_lock = threading.Lock() #: A lock used to prevent multiple simultaneous accesses to the compiled source filters.
 _ui = None #: This is a reference to the UI's _UI wrapper.
 
 _raw_event_disabled = True #: True if "Raw Event" dictionaries should be disabled, providing an efficiency boost; False otherwise.
@@ -55,8 +90,10 @@ _raw_command_disabled = True #: True if "Raw Command" dictionaries should be dis
 
 _raw_event_ui_override = False #: True if "Raw Event" dictionaries should be enabled for UI consumption after the UI has been set.
 _raw_command_ui_override = False #: True if "Raw Command" dictionaries should be enabled for UI consumption after the UI has been set.
+_membership_delta_ui_override = False #: True if "Channel Membership Delta" dictionaries should be enabled for UI consumption.
 
 _time_to_die = False #: True when all event processing should be disabled because PyRC is shutting down.
+_loading_plugins = set() #: The module names of plugins whose loadMe() functions are running, which may schedule timers before they are online.
 
 def setUI(module_path=None):
 	"""
@@ -144,6 +181,8 @@ def addPlugin(module_name, tolerate_fault=True):
 		]
 		plugin = _Plugin(module_name, GLOBAL.PTH_PLUGIN_MAIN_MODULE, module_paths, GLOBAL.PTH_PLUGIN_SUBPATH, tolerate_fault)
 		_plugins[module_name] = plugin
+		_plugin_order.append(plugin)
+		_rebuildSubscriptions()
 	except PluginLoadError, e:
 		trace = tuple(GLOBAL.errlog.grabTrace())
 		broadcastEvent(outboundDictionaries.PyRC_Plugin_Load_Error(module_name, trace,	GLOBAL.errlog.logError(GLOBAL.PTH_PLUGIN_SUBPATH, module_name, "Error while loading", trace)))
@@ -167,7 +206,7 @@ def reloadPlugin(module_name):
 	This function reloads a plugin in PyRC's plugin structure. It allows
 	developers the ability to modify their scripts without having to restart
 	PyRC.
-
+	
 	Caution: Hangs have been reported when reloading plugins with syntax errors
 	under Python 2.4.
 	
@@ -212,8 +251,8 @@ def reloadPlugin(module_name):
 def disablePlugin(module_name, subprocess=False, unload_mode=_UNLOAD_MODE_DISABLE):
 	"""
 	This function disables a plugin in PyRC's plugin structure. This prevents
-	the plugin from receiving future events, and it calls its unloadMe()
-	function.
+	the plugin from receiving future events, cancels all of its timers, and
+	calls its unloadMe() function.
 	
 	Following disablement, if the plugin processed raw events, all plugins will
 	be polled to find out if anything still needs raw events.
@@ -243,12 +282,16 @@ def disablePlugin(module_name, subprocess=False, unload_mode=_UNLOAD_MODE_DISABL
 		broadcastEvent(outboundDictionaries.PyRC_Status("'%s' is an unknown plugin. Perhaps it has not been loaded." % module_name))
 		return
 		
+	timers.cancelTimers(module_name)
 	try:
 		handled_raw_command = plugin.handlesRawCommand()
 		handled_raw_event = plugin.handlesRawEvent()
 		
-		disabled = plugin.disable(unload_mode)
-		
+		try:
+			disabled = plugin.disable(unload_mode)
+		finally:
+			_rebuildSubscriptions()
+			
 		if handled_raw_command and not _ui.handlesRawCommand():
 			global _raw_command_disabled
 			continue_raw_commands = False
@@ -315,8 +358,11 @@ def enablePlugin(module_name, load_mode=_LOAD_MODE_ENABLE):
 		return
 		
 	try:
-		plugin.enable(load_mode)
-		
+		try:
+			plugin.enable(load_mode)
+		finally:
+			_rebuildSubscriptions()
+			
 		global _raw_event_disabled
 		if _raw_event_disabled and plugin.handlesRawEvent():
 			_raw_event_disabled = False
@@ -407,6 +453,21 @@ def handlesRawCommand():
 	"""
 	return _raw_command_ui_override or not _raw_command_disabled
 	
+def handlesMembershipDelta():
+	"""
+	This function is used by PyRC's IAL to determine whether "Channel
+	Membership Delta" dictionaries should be generated and sent to the plugin
+	chain.
+	
+	They are generated only while at least one plugin handles them, or while
+	the UI has asked for them.
+	
+	@rtype: bool
+	@return: True if "Channel Membership Delta" dictionaries should be
+	    generated.
+	"""
+	return _membership_delta_ui_override or ("Channel Membership Delta", False) in _subscriptions
+	
 def handlesRawEvent():
 	"""
 	This function is used by PyRC's IAL to determine whether "Raw Event"
@@ -434,6 +495,23 @@ def toggleRawCommandHandling(enable):
 	global _raw_command_ui_override
 	_raw_command_ui_override = enable
 	
+def toggleMembershipDeltaHandling(enable):
+	"""
+	This function is used to allow UIs to turn "Channel Membership Delta" Event
+	Dictionary processing on or off.
+	
+	Note: Plugins that handle "Channel Membership Delta" dictionaries will
+	continue to receive them regardless of this setting.
+	
+	@type enable: bool
+	@param enable: True if "Channel Membership Delta" handling should be
+	    enabled, False to disable.
+	
+	@return: Nothing.
+	"""
+	global _membership_delta_ui_override
+	_membership_delta_ui_override = enable
+	
 def toggleRawEventHandling(enable):
 	"""
 	This function is used to allow UIs to turn "Raw Event" Event Dictionary
@@ -465,46 +543,28 @@ def broadcastEvent(dictionary, skip_ui=False, skip_plugins=False):
 	@return: Nothing.
 	"""
 	if not _time_to_die: #If PyRC is closing, ignore this event.
-		for i in _plugins:
-			if skip_plugins:
-				break
-			plugin = _plugins[i]
-			
+		if not skip_plugins:
 			#Unwrap the dictionary, if applicable.
 			unwrapped = False
+			wrapper = None
 			if dictionary['eventname'] == "Emit Known":
 				unwrapped = True
-				dictionary = dictionary['eventdict']
+				wrapper = dictionary
+				dictionary = outboundDictionaries.freezeDictionary(dictionary['eventdict'])
 				
-			#Process the dictionary.
-			try:
-				(action_code, result_dictionary) = processResult(plugin.processDictionary(dictionary, unwrapped))
-				if not action_code == _ENUM_ACTION_CODES.NORMAL:
-					if action_code == _ENUM_ACTION_CODES.REPLACE:
-						dictionary = result_dictionary
-					elif action_code == _ENUM_ACTION_CODES.SKIP_REST:
-						dictionary = result_dictionary
-						skip_plugins = True
-						break
-					elif action_code == _ENUM_ACTION_CODES.SKIP_ALL:
-						skip_plugins = True
-						skip_ui = True
-						break
-			except:
-				try:
-					trace = GLOBAL.errlog.grabTrace()
-					plugin_data = plugin.getData()
-					broadcastEventAsync(outboundDictionaries.PyRC_Plugin_Crash(trace, plugin.getName(), plugin_data['name'], plugin_data['version'], dictionary, GLOBAL.errlog.logErrorPlugin(GLOBAL.PTH_PLUGIN_SUBPATH, plugin_data, plugin.getName(), dictionary, trace)))
-				except:
-					pass
-					
+			(result, skip_plugins, skip_ui) = _dispatchToPlugins(dictionary, unwrapped, skip_ui)
+			
 			#Rewrap the dictionary, if applicable.
-			if unwrapped:
-				dictionary = {
-				 'eventname': "Emit Known",
-				 'eventdict': dictionary
-				}
-				
+			if unwrapped and not skip_plugins:
+				if result is dictionary: #No plugin replaced it, so the original wrapper is still accurate.
+					result = wrapper
+				else: #The IAL may modify the dictionaries it receives.
+					result = {
+					 'eventname': "Emit Known",
+					 'eventdict': result.copy()
+					}
+			dictionary = result
+			
 		#Handle wrapped events.
 		if not skip_plugins:
 			if dictionary['eventname'] == "Emit Generic":
@@ -534,25 +594,359 @@ def broadcastEvent(dictionary, skip_ui=False, skip_plugins=False):
 				except:
 					pass
 					
+def _dispatchToPlugins(dictionary, unwrapped, skip_ui):
+	"""
+	This function passes an Event Dictionary to every plugin that handles its
+	type, in load order, applying any Raise Event Dictionaries they return.
+	
+	If a plugin replaces the dictionary with one of a different type, the
+	replacement is passed to the plugins that follow it and handle the new
+	type.
+	
+	Every plugin receives the same read-only
+	outboundDictionaries.EventDictionary, rather than its own copy; a
+	replacement is made read-only once, before being passed along.
+	
+	Plugins that declared a source filter for the dictionary's type never see
+	it unless it matches; each distinct filter is evaluated at most once per
+	version of the dictionary. Likewise, the dictionary's message is matched
+	against all declared triggers at once, and only the handlers of matching
+	triggers are invoked.
+	
+	Observer plugins are not invoked here: the dictionary is posted to their
+	mailboxes, and processing moves on to the next plugin immediately.
+	
+	@type dictionary: dict
+	@param dictionary: The Event Dictionary to be processed, already
+	    unwrapped.
+	@type unwrapped: bool
+	@param unwrapped: True if the dictionary came from an Emit Known wrapper.
+	@type skip_ui: bool
+	@param skip_ui: True if the UI should not see this event.
+	
+	@rtype: tuple
+	@return: The dictionary as it stands after all plugins have processed it,
+	    followed by the skip_plugins and skip_ui values that should govern the
+	    rest of its broadcast.
+	"""
+	dictionary = outboundDictionaries.freezeDictionary(dictionary)
+	plugin = None
+	eventname = None
+	while not eventname == dictionary['eventname']:
+		eventname = dictionary['eventname']
+		verdicts = {}
+		triggered = None
+		for (plugin, source_filter, trigger) in _getSubscribers(eventname, unwrapped, plugin):
+			if source_filter:
+				verdict = verdicts.get(source_filter)
+				if verdict is None:
+					verdict = source_filter.matches(dictionary)
+					verdicts[source_filter] = verdict
+				if not verdict:
+					continue
+					
+			groups = None
+			if trigger:
+				if triggered is None:
+					triggered = _matchTriggers(dictionary, unwrapped)
+				groups = triggered.get(trigger)
+				if groups is None:
+					continue
+					
+			mailbox = plugin.getMailbox()
+			if mailbox:
+				mailbox.post(dictionary, unwrapped, trigger, groups)
+				continue
+				
+			try:
+				result = None
+				if trigger:
+					result = plugin.processTrigger(dictionary, trigger, groups)
+				else:
+					result = plugin.processDictionary(dictionary, unwrapped)
+					
+				(action_code, result_dictionary) = processResult(result)
+				if not action_code == _ENUM_ACTION_CODES.NORMAL:
+					if action_code == _ENUM_ACTION_CODES.REPLACE:
+						dictionary = outboundDictionaries.freezeDictionary(result_dictionary)
+						verdicts = {}
+						triggered = None
+						if not dictionary['eventname'] == eventname:
+							break
+					elif action_code == _ENUM_ACTION_CODES.SKIP_REST:
+						return (result_dictionary, True, skip_ui)
+					elif action_code == _ENUM_ACTION_CODES.SKIP_ALL:
+						return (dictionary, True, True)
+			except:
+				try:
+					trace = GLOBAL.errlog.grabTrace()
+					plugin_data = plugin.getData()
+					broadcastEventAsync(outboundDictionaries.PyRC_Plugin_Crash(trace, plugin.getName(), plugin_data['name'], plugin_data['version'], dictionary, GLOBAL.errlog.logErrorPlugin(GLOBAL.PTH_PLUGIN_SUBPATH, plugin_data, plugin.getName(), dictionary, trace)))
+				except:
+					pass
+	return (dictionary, False, skip_ui)
+	
+def _getSubscribers(eventname, unwrapped, after=None):
+	"""
+	This function returns the plugins that handle a type of Event Dictionary.
+	
+	@type eventname: basestring
+	@param eventname: The type of Event Dictionary.
+	@type unwrapped: bool
+	@param unwrapped: True if the dictionary came from an Emit Known wrapper.
+	@type after: _Plugin|None
+	@param after: If given, only plugins loaded after this one are returned.
+	
+	@rtype: tuple
+	@return: The subscribed plugins, in load order, each accompanied by the
+	    _SourceFilter it declared for this type, or None, and by the trigger
+	    that must match before it is invoked, or None.
+	"""
+	subscribers = _subscriptions.get((eventname, unwrapped), ())
+	if after:
+		position = _plugin_order.index(after)
+		subscribers = tuple([i for i in subscribers if _plugin_order.index(i[0]) > position])
+	return subscribers
+	
+def _rebuildSubscriptions():
+	"""
+	This function rebuilds the index used to find the plugins that handle each
+	type of Event Dictionary.
+	
+	It must be called whenever a plugin's set of handlers may have changed.
+	
+	@return: Nothing.
+	"""
+	global _subscriptions
+	global _trigger_matchers
+	try:
+		_subscription_lock.acquire()
+		subscriptions = {}
+		trigger_lists = {}
+		for i in _plugin_order:
+			for (key, source_filter, trigger) in i.getSubscriptions():
+				subscribers = subscriptions.get(key)
+				if not subscribers:
+					subscribers = []
+					subscriptions[key] = subscribers
+				subscribers.append((i, source_filter, trigger))
+				if trigger:
+					trigger_lists.setdefault(key, []).append(trigger)
+					
+		for i in subscriptions:
+			subscriptions[i] = tuple(subscriptions[i])
+		trigger_matchers = {}
+		for i in trigger_lists:
+			trigger_matchers[i] = triggers.TriggerMatcher(trigger_lists[i])
+		_trigger_matchers = trigger_matchers
+		_subscriptions = subscriptions
+	finally:
+		_subscription_lock.release()
+		
+def _matchTriggers(dictionary, unwrapped):
+	"""
+	This function matches the message carried by an Event Dictionary against
+	every trigger declared for its type.
+	
+	@type dictionary: dict
+	@param dictionary: The Event Dictionary to be tested.
+	@type unwrapped: bool
+	@param unwrapped: True if the dictionary came from an Emit Known wrapper.
+	
+	@rtype: dict
+	@return: A dictionary of tuples of captured groups, keyed by the
+	    triggers.Trigger objects that matched.
+	"""
+	matcher = _trigger_matchers.get((dictionary['eventname'], unwrapped))
+	message = dictionary.get('message')
+	if not matcher or not isinstance(message, basestring):
+		return {}
+	return matcher.match(message)
+	
+def _compileSourceFilter(specification):
+	"""
+	This function converts a source filter declared by a plugin in loadMe()
+	into a _SourceFilter.
+	
+	A source filter is a dictionary that may contain any of the following
+	elements; omitted elements do not restrict anything::
+	 'sources': {<network_name:basestring>: <names:sequence|None>}
+	  Only events from the listed networks are accepted. If a sequence of
+	  channel and user names is given for a network, only events about those
+	  channels, or from those users in private, are accepted; None accepts
+	  everything from that network.
+	 'nicknames': <names:sequence>
+	  Only events caused by these users are accepted.
+	 'action': <action:bool>
+	  Only actions (True) or only non-actions (False) are accepted.
+	
+	Identical specifications produce the same _SourceFilter object.
+	
+	@type specification: dict
+	@param specification: The source filter declared by the plugin.
+	
+	@rtype: _SourceFilter
+	@return: The compiled filter.
+	
+	@raise SourceFilterError: If the specification is malformed.
+	"""
+	try:
+		sources = specification.get('sources')
+		if not sources is None:
+			normalised_sources = []
+			for (network_name, names) in sources.items():
+				if not names is None:
+					names = frozenset([unicode(i) for i in names])
+				normalised_sources.append((unicode(network_name), names))
+			normalised_sources.sort()
+			sources = tuple(normalised_sources)
+			
+		nicknames = specification.get('nicknames')
+		if not nicknames is None:
+			nicknames = frozenset([unicode(i) for i in nicknames])
+			
+		action = specification.get('action')
+		if not action is None:
+			action = bool(action)
+	except Exception, e:
+		raise SourceFilterError(u"Malformed source filter %s: %s" % (repr(specification), e))
+		
+	key = (sources, nicknames, action)
+	try:
+		_source_filter_lock.acquire()
+		source_filter = _source_filters.get(key)
+		if not source_filter:
+			if not sources is None:
+				sources = dict(sources)
+			source_filter = _SourceFilter(sources, nicknames, action)
+			_source_filters[key] = source_filter
+		return source_filter
+	finally:
+		_source_filter_lock.release()
+		
+def _foldName(name):
+	"""
+	This function folds a name when the casemapping of the IRC server that
+	raised an event can't be determined.
+	
+	@type name: basestring
+	@param name: The nickname or channel name to be folded.
+	
+	@rtype: unicode
+	@return: The lower-case name.
+	"""
+	return unicode(name).lower()
+	
+def scheduleTimer(module_name, name, delay, interval, cron):
+	"""
+	This function schedules a timer on behalf of a plugin. Each time it
+	expires, the plugin, and only the plugin, receives a "Timer Expired" Event
+	Dictionary.
+	
+	Scheduling a timer under a name the plugin is already using replaces the
+	existing timer. All of a plugin's timers are cancelled when it is disabled.
+	
+	Timers may be scheduled by enabled plugins and by plugins whose loadMe()
+	functions are running; the latter are cancelled if loadMe() fails.
+	
+	If the timer cannot be scheduled, a "PyRC Status" event describing the
+	problem will be generated.
+	
+	@type module_name: basestring
+	@param module_name: The subpath fragment used to identify the plugin that
+	    owns the timer.
+	@type name: basestring
+	@param name: The name by which the plugin identifies the timer.
+	@type delay: int|None
+	@param delay: The number of milliseconds before the timer first expires.
+	@type interval: int|None
+	@param interval: The number of milliseconds between subsequent
+	    expirations, or None if the timer should expire only once.
+	@type cron: basestring|None
+	@param cron: A cron expression that determines when the timer expires,
+	    overriding delay and interval, or None.
+	
+	@return: Nothing.
+	"""
+	if not module_name in _loading_plugins: #Plugins that are being loaded aren't online yet.
+		plugin = _plugins.get(module_name)
+		if not plugin or not plugin.isOnline(): #Timers may only be scheduled by enabled plugins.
+			broadcastEvent(outboundDictionaries.PyRC_Status("'%s' is not an enabled plugin, so it may not schedule timers." % module_name))
+			return
+			
+	try:
+		timers.scheduleTimer(module_name, name, delay, interval, cron, _deliverTimer)
+	except timers.TimerError, e:
+		broadcastEvent(outboundDictionaries.PyRC_Status(u"Plugin '%s' could not schedule timer '%s': %s" % (module_name, name, e.description)))
+		
+def cancelTimer(module_name, name=None):
+	"""
+	This function cancels one or all of a plugin's timers.
+	
+	@type module_name: basestring
+	@param module_name: The subpath fragment used to identify the plugin that
+	    owns the timer.
+	@type name: basestring|None
+	@param name: The name by which the plugin identifies the timer, or None to
+	    cancel all of the plugin's timers.
+	
+	@return: Nothing.
+	"""
+	if name is None:
+		timers.cancelTimers(module_name)
+	else:
+		timers.cancelTimer(module_name, name)
+		
+def _deliverTimer(module_name, dictionary):
+	"""
+	This function passes a "Timer Expired" Event Dictionary to the plugin that
+	owns the timer. It is called by the timers module's worker threads.
+	
+	@type module_name: unicode
+	@param module_name: The subpath fragment used to identify the plugin.
+	@type dictionary: outboundDictionaries.EventDictionary
+	@param dictionary: The Event Dictionary to be delivered.
+	
+	@return: Nothing.
+	"""
+	plugin = _plugins.get(module_name)
+	if _time_to_die or not plugin:
+		return
+		
+	try:
+		plugin.processDictionary(dictionary, False)
+	except:
+		try:
+			trace = GLOBAL.errlog.grabTrace()
+			plugin_data = plugin.getData()
+			broadcastEventAsync(outboundDictionaries.PyRC_Plugin_Crash(trace, plugin.getName(), plugin_data['name'], plugin_data['version'], dictionary, GLOBAL.errlog.logErrorPlugin(GLOBAL.PTH_PLUGIN_SUBPATH, plugin_data, plugin.getName(), dictionary, trace)))
+		except:
+			pass
+			
 def broadcastEventAsync(dictionary):
 	"""
-	This function allows a dictionary to be broadcasted to all plugins using a
-	one-shot thread. It should be used only in cases where a worker thread
-	cannot reasonably wait for an event to complete.
+	This function allows a dictionary to be broadcasted to all plugins using
+	one of the shared pyrc_common.asynch.Executor's threads. It should be used
+	only in cases where a worker thread cannot reasonably wait for an event to
+	complete.
+	
+	If the Executor is saturated, as it may be during a storm of plugin
+	crashes, the dictionary is dropped, and the rejection is counted in the
+	Executor's metrics.
 	
 	@type dictionary: dict
 	@param dictionary: The Event Dictionary to be broadcasted to all plugins.
 	
 	@return: Nothing.
 	"""
-	pyrc_common.asynch.AsyncherSingleArg(broadcastEvent, dictionary).start()
+	pyrc_common.asynch.getExecutor().submit(broadcastEvent, (dictionary,))
 	
 	
 def processResult(dictionary):
 	"""
 	This function processes the value returned by a plugin following its receipt
 	of an event dictionary.
-		
+	
 	It is here that Raise Event Dictionaries are processed.
 	
 	@type dictionary: dict
@@ -584,6 +978,7 @@ def killAll():
 	#Disable all event processing.
 	global _time_to_die
 	_time_to_die = True
+	timers.cancelTimers()
 	
 	#Build a list of all plugins and the UI and call their unload() functions.
 	active_list = [pyrc_common.asynch.Asyncher(_ui.unload)]
@@ -688,7 +1083,7 @@ class _PluginPrototype(object):
 		
 		@rtype: tuple
 		@return: The loaded module and the path in which it was found.
-			
+		
 		@raise ImportError: If a problem occurs while locating the module.
 		@raise Exception: If a problem occurs while loading the module.
 		"""
@@ -709,7 +1104,7 @@ class _PluginPrototype(object):
 				sys.path.remove(path)
 				
 			raise e
-				
+			
 	def unload(self):
 		"""
 		This function is called when the plugin should be unloaded from PyRC's
@@ -736,6 +1131,7 @@ class _PluginPrototype(object):
 		It may contain the following elements::
 		 'author': <plugin_author:basestring>
 		 'e-mail': <authors_email:basestring>
+		 'observer': <never_returns_raise_event_dictionaries:bool>
 		
 		No other elements are currently specified in the PyRC plugin specs,
 		though the author is free to store any information they would like to
@@ -817,7 +1213,10 @@ class _Plugin(_PluginPrototype):
 	It is instantiated once per plugin loaded by PyRC.
 	"""
 	_handlers = None #: A dictionary of functions used to handle Event Dictionaries, keyed by eventname and unwrapped status.
+	_filters = None #: A dictionary of _SourceFilter objects that Event Dictionaries must match before reaching their handlers, keyed like _handlers.
+	_triggers = None #: A list of ((eventname, unwrapped), _SourceFilter|None, triggers.Trigger) tuples describing the triggers this plugin declared.
 	_online = True #: True if this plugin is enabled and ready to receive events.
+	_mailbox = None #: The _Mailbox through which this plugin receives Event Dictionaries, or None if it is not an observer.
 	
 	def __init__(self, module_name, file_name, paths, subpath, tolerate_fault):
 		"""
@@ -851,9 +1250,11 @@ class _Plugin(_PluginPrototype):
 		self._lock = threading.Lock()
 		self._module_name = module_name
 		self._handlers = {}
+		self._filters = {}
+		self._triggers = []
 		
 		self._init_(module_name, file_name, paths, subpath, tolerate_fault)
-			
+		
 		try:
 			self._loadModule(_LOAD_MODE_FIRST)
 		except Exception, e:
@@ -869,21 +1270,63 @@ class _Plugin(_PluginPrototype):
 		
 		All handlers will be generated by this function.
 		
+		Each element returned by the plugin's loadMe() function takes the
+		following form, where the optional source filter is a dictionary
+		described by _compileSourceFilter() and the optional trigger is a
+		dictionary described by triggers.compileTrigger()::
+		 (<eventname:basestring>, <handler:function>, <unwrapped:bool>[, <source_filter:dict|None>[, <trigger:dict>]])
+		
+		Handlers with triggers are called only when the event's message matches,
+		and they receive the captured groups as a third argument. A plugin may
+		declare any number of triggers for the same type of event.
+		
+		If the plugin's meta-data declares it an observer, a _Mailbox is
+		created for it, if it does not already have one; otherwise, any
+		_Mailbox left over from before a reload is stopped.
+		
+		While the plugin's loadMe() function runs, the plugin may schedule
+		timers, even though it is not yet online; if loading fails, they are
+		cancelled.
+		
 		@type load_mode: int
 		@param load_mode: An integer used to identify the type of load being
 			performed on the plugin.
-		
+			
 		@return: Nothing.
 		
 		@raise Exception: If a problem occurs during the enabling process.
 		"""
-		for i in self._module.loadMe(GLOBAL.irc_interface.processDictionary, load_mode):
-			self._handlers[(i[0], i[2])] = i[1]
-			if not self._processes_raw_event and i[0] == "Raw Event":
-				self._processes_raw_event = True
-			if not self._processes_raw_command and i[0] == "Raw Command":
-				self._processes_raw_command = True
-				
+		if self._module.__module_data__.get('observer'):
+			if not self._mailbox:
+				self._mailbox = _Mailbox(self)
+				self._mailbox.start()
+		else: #The plugin may have been reloaded without its observer declaration.
+			self._releaseMailbox()
+			
+		_loading_plugins.add(self._module_name) #Allow loadMe() to schedule timers.
+		try:
+			try:
+				for i in self._module.loadMe(GLOBAL.irc_interface.processDictionary, load_mode):
+					source_filter = None
+					if len(i) > 3 and i[3]: #A source filter was declared.
+						source_filter = _compileSourceFilter(i[3])
+						
+					if len(i) > 4 and i[4]: #A trigger was declared; many may share an event type.
+						self._triggers.append(((i[0], i[2]), source_filter, triggers.compileTrigger(i[4], i[1])))
+					else:
+						self._handlers[(i[0], i[2])] = i[1]
+						if source_filter:
+							self._filters[(i[0], i[2])] = source_filter
+					if not self._processes_raw_event and i[0] == "Raw Event":
+						self._processes_raw_event = True
+					if not self._processes_raw_command and i[0] == "Raw Command":
+						self._processes_raw_command = True
+			except:
+				timers.cancelTimers(self._module_name)
+				raise
+		finally:
+			_loading_plugins.discard(self._module_name)
+			
 	def reload(self):
 		"""
 		This function is used to reload the plugin, allowing developers to
@@ -913,7 +1356,8 @@ class _Plugin(_PluginPrototype):
 			self.disable(_UNLOAD_MODE_DISABLE)
 		except:
 			pass
-			
+		self._releaseMailbox()
+		
 	def disable(self, unload_mode):
 		"""
 		This function is used to disabled the plugin, preventing it from
@@ -926,7 +1370,7 @@ class _Plugin(_PluginPrototype):
 		@type unload_mode: int
 		@param unload_mode: An integer used to identify the type of unload being
 			performed on the plugin.
-		
+			
 		@rtype: bool
 		@return: True if the plugin was disabled; False if the plugin was
 		    already disabled.
@@ -942,6 +1386,9 @@ class _Plugin(_PluginPrototype):
 			self._processes_raw_command = False
 			self._processes_raw_event = False
 			self._handlers = {}
+			self._filters = {}
+			self._triggers = []
+			self._releaseMailbox()
 			
 			self._module.unloadMe(GLOBAL.irc_interface.processDictionary, unload_mode)
 			return True
@@ -960,7 +1407,7 @@ class _Plugin(_PluginPrototype):
 		@type load_mode: int
 		@param load_mode: An integer used to identify the type of load being
 			performed on the plugin.
-		
+			
 		@rtype: bool
 		@return: True if the plugin was enabled; False if the plugin was already
 		    enabled.
@@ -979,6 +1426,34 @@ class _Plugin(_PluginPrototype):
 		finally:
 			self._lock.release()
 			
+	def getMailbox(self):
+		"""
+		This function returns the mailbox through which this plugin receives
+		Event Dictionaries, if it is an observer.
+		
+		Observers declare, with the 'observer' element of their meta-data, that
+		they never return Raise Event Dictionaries, so they need not hold up
+		the plugins that follow them.
+		
+		@rtype: _Mailbox|None
+		@return: This plugin's mailbox, or None if it must be invoked directly.
+		"""
+		return self._mailbox
+		
+	def _releaseMailbox(self):
+		"""
+		This function stops this plugin's _Mailbox, if it has one, discarding
+		any dictionaries that have yet to be delivered.
+		
+		A new _Mailbox is created if the plugin is enabled again as an
+		observer.
+		
+		@return: Nothing.
+		"""
+		if self._mailbox:
+			self._mailbox.kill()
+			self._mailbox = None
+			
 	def isOnline(self):
 		"""
 		This function is used to determine whether this plugin is able to accept
@@ -988,6 +1463,24 @@ class _Plugin(_PluginPrototype):
 		@return: True if this plugin is online; False otherwise.
 		"""
 		return self._online
+		
+	def getSubscriptions(self):
+		"""
+		This function returns the types of Event Dictionary that this plugin
+		handles.
+		
+		@rtype: tuple
+		@return: A tuple of ((eventname, unwrapped), _SourceFilter|None,
+		    triggers.Trigger|None) tuples, or an empty tuple if this plugin is
+		    offline.
+		"""
+		try:
+			self._lock.acquire()
+			if not self._online:
+				return ()
+			return tuple([(i, self._filters.get(i), None) for i in self._handlers] + self._triggers)
+		finally:
+			self._lock.release()
 			
 	def processDictionary(self, dictionary, unwrapped):
 		"""
@@ -999,7 +1492,10 @@ class _Plugin(_PluginPrototype):
 		
 		If this plugin is offline, the dictionary will not be processed.
 		
-		@type dictionary: dict
+		The dictionary is shared with every other plugin, so it is read-only;
+		handlers that need to modify it must work on a copy().
+		
+		@type dictionary: outboundDictionaries.EventDictionary
 		@param dictionary: The Event Dictionary to be processed.
 		@type unwrapped: bool
 		@param unwrapped: True if the dictionary was in an Emit Known wrapper or
@@ -1018,11 +1514,276 @@ class _Plugin(_PluginPrototype):
 				if not handler:
 					return
 					
-				return handler(dictionary.copy(), GLOBAL.irc_interface.processDictionary)
+				return handler(dictionary, GLOBAL.irc_interface.processDictionary)
 		finally:
 			self._lock.release()
 			
+	def processTrigger(self, dictionary, trigger, groups):
+		"""
+		This function is called when the message carried by an Event Dictionary
+		matches one of this plugin's triggers.
+		
+		If this plugin is offline, the dictionary will not be processed. As with
+		processDictionary(), the dictionary is read-only.
+		
+		@type dictionary: outboundDictionaries.EventDictionary
+		@param dictionary: The Event Dictionary to be processed.
+		@type trigger: triggers.Trigger
+		@param trigger: The trigger that matched.
+		@type groups: tuple
+		@param groups: The groups captured by the trigger.
+		
+		@rtype: dict|None
+		@return: None if the dictionary is unprocessed or if the handler did not
+		    attempt to alter the processing flow. A Raise Event Dictionary if
+		    the dictionary's processing flow is supposed to be altered.
+		"""
+		try:
+			self._lock.acquire()
+			
+			if self._online:
+				return trigger.getHandler()(dictionary, GLOBAL.irc_interface.processDictionary, groups)
+		finally:
+			self._lock.release()
+			
+			
+class _Mailbox(threading.Thread):
+	"""
+	This class delivers Event Dictionaries to an observer plugin from a thread
+	of its own, so that a slow handler delays only that plugin.
+	
+	Dictionaries are delivered in the order in which they were posted. If the
+	plugin falls _MAILBOX_SIZE dictionaries behind, the oldest are discarded,
+	and a "PyRC Status" event announces it once per backlog.
+	
+	Anything the plugin's handlers return is ignored.
+	"""
+	_plugin = None #: The _Plugin to which dictionaries are delivered.
+	_condition = None #: A threading.Condition used to protect the queue and to wake the thread.
+	_queue = None #: A collections.deque of (<dictionary:outboundDictionaries.EventDictionary>, <unwrapped:bool>, <trigger:triggers.Trigger|None>, <groups:tuple|None>) tuples waiting to be delivered.
+	_dropped = 0 #: The number of dictionaries discarded since the queue was last empty.
+	_alive = True #: False when this thread is expected to stop delivering dictionaries.
+	
+	def __init__(self, plugin):
+		"""
+		This function is invoked when a new _Mailbox object is created.
+		
+		@type plugin: _Plugin
+		@param plugin: The plugin to which dictionaries will be delivered.
+		
+		@return: Nothing.
+		"""
+		threading.Thread.__init__(self)
+		self._plugin = plugin
+		self._condition = threading.Condition(threading.Lock())
+		self._queue = collections.deque()
+		self.setDaemon(True)
+		self.setName("Plugin Mailbox - %s" % plugin.getName())
+		
+	def post(self, dictionary, unwrapped, trigger, groups):
+		"""
+		This function queues an Event Dictionary for delivery and returns
+		immediately.
+		
+		@type dictionary: outboundDictionaries.EventDictionary
+		@param dictionary: The Event Dictionary to be delivered.
+		@type unwrapped: bool
+		@param unwrapped: True if the dictionary came from an Emit Known wrapper.
+		@type trigger: triggers.Trigger|None
+		@param trigger: The trigger that matched the dictionary, or None if it
+		    should be passed to the plugin's plain handler.
+		@type groups: tuple|None
+		@param groups: The groups captured by the trigger, if any.
+		
+		@return: Nothing.
+		"""
+		report = False
+		self._condition.acquire()
+		try:
+			if not self._alive: #The plugin was disabled after the dictionary was routed here.
+				return
+			if len(self._queue) >= _MAILBOX_SIZE:
+				self._queue.popleft()
+				self._dropped += 1
+				report = self._dropped == 1
+			self._queue.append((dictionary, unwrapped, trigger, groups))
+			self._condition.notify()
+		finally:
+			self._condition.release()
+			
+		if report:
+			broadcastEventAsync(outboundDictionaries.PyRC_Status("Plugin '%s' is more than %i events behind; the oldest are being discarded." % (self._plugin.getName(), _MAILBOX_SIZE)))
+			
+	def kill(self):
+		"""
+		This function is used to signal the end of the thread's life; it should
+		be called when the plugin is disabled, unloaded, or stops being an
+		observer.
+		
+		Dictionaries that have yet to be delivered are discarded, and the thread
+		exits once any handler it is running returns.
+		
+		@return: Nothing.
+		"""
+		self._condition.acquire()
+		try:
+			self._alive = False
+			self._queue.clear()
+			self._condition.notifyAll()
+		finally:
+			self._condition.release()
 			
+	def run(self):
+		"""
+		This function is executed over the course of the thread's lifetime,
+		delivering dictionaries as they are posted until it is killed.
+		
+		@return: Nothing.
+		"""
+		while self._alive:
+			self._condition.acquire()
+			try:
+				while not self._queue and self._alive:
+					self._dropped = 0
+					self._condition.wait()
+				if not self._alive:
+					return
+				(dictionary, unwrapped, trigger, groups) = self._queue.popleft()
+			finally:
+				self._condition.release()
+				
+			if _time_to_die:
+				continue
+				
+			plugin = self._plugin
+			try:
+				if trigger:
+					plugin.processTrigger(dictionary, trigger, groups)
+				else:
+					plugin.processDictionary(dictionary, unwrapped)
+			except:
+				try:
+					trace = GLOBAL.errlog.grabTrace()
+					plugin_data = plugin.getData()
+					broadcastEventAsync(outboundDictionaries.PyRC_Plugin_Crash(trace, plugin.getName(), plugin_data['name'], plugin_data['version'], dictionary, GLOBAL.errlog.logErrorPlugin(GLOBAL.PTH_PLUGIN_SUBPATH, plugin_data, plugin.getName(), dictionary, trace)))
+				except:
+					pass
+					
+					
+class _SourceFilter(object):
+	"""
+	This class represents a compiled source filter, which PyRC evaluates before
+	passing an Event Dictionary to a plugin, so that plugins are never invoked
+	for events they would discard.
+	
+	Names are compared the way the IRC server that raised the event compares
+	them, according to its casemapping.
+	
+	Use _compileSourceFilter() to build instances.
+	"""
+	_sources = None #: A dictionary of frozensets of channel and user names, as declared, keyed by network name, or None if sources are unrestricted. A None value accepts every source on its network.
+	_nicknames = None #: A frozenset of nicknames, as declared, or None if users are unrestricted.
+	_action = None #: True if only actions are accepted, False if only non-actions are accepted, or None if both are.
+	_folded = None #: A dictionary of (<sources:dict|None>, <nicknames:frozenset|None>) tuples holding _sources and _nicknames folded by a casemapping, keyed by the fold function.
+	
+	def __init__(self, sources, nicknames, action):
+		"""
+		This function is invoked when a new _SourceFilter object is created.
+		
+		@type sources: dict|None
+		@param sources: A dictionary of frozensets of channel and user names,
+		    keyed by network name, or None.
+		@type nicknames: frozenset|None
+		@param nicknames: A frozenset of nicknames, or None.
+		@type action: bool|None
+		@param action: Whether actions or non-actions are accepted, or None.
+		
+		@return: Nothing.
+		"""
+		self._sources = sources
+		self._nicknames = nicknames
+		self._action = action
+		self._folded = {}
+		
+	def matches(self, dictionary):
+		"""
+		This function determines whether an Event Dictionary satisfies this
+		filter.
+		
+		Dictionaries that lack the information a restriction needs, like a
+		network name, do not satisfy that restriction.
+		
+		@type dictionary: dict
+		@param dictionary: The Event Dictionary to be tested.
+		
+		@rtype: bool
+		@return: True if the dictionary should be passed to the plugin.
+		"""
+		if not self._action is None and not bool(dictionary.get('action')) == self._action:
+			return False
+			
+		user_data = dictionary.get('userdata')
+		(sources, nicknames) = (self._sources, self._nicknames)
+		fold = None
+		if not nicknames is None or sources and sources.get(dictionary.get('networkname')):
+			fold = GLOBAL.irc_interface.getFoldFunction(dictionary.get('irccontext')) or _foldName
+			(sources, nicknames) = self._getFolded(fold)
+			
+		if not sources is None:
+			network_name = dictionary.get('networkname')
+			if not network_name in sources:
+				return False
+				
+			names = sources[network_name]
+			if not names is None:
+				source = dictionary.get('channel')
+				if not source and user_data:
+					source = user_data['username']
+				if not source or not fold(source) in names:
+					return False
+					
+		if not nicknames is None:
+			nickname = None
+			if user_data:
+				nickname = user_data['username']
+			else: #Local events identify PyRC's own nickname directly.
+				nickname = dictionary.get('username')
+			if not nickname or not fold(nickname) in nicknames:
+				return False
+				
+		return True
+		
+	def _getFolded(self, fold):
+		"""
+		This function returns this filter's names folded by a casemapping,
+		folding them on first use.
+		
+		@type fold: function
+		@param fold: The function that implements the casemapping.
+		
+		@rtype: tuple
+		@return: The folded sources dictionary, or None, followed by the folded
+		    nicknames frozenset, or None.
+		"""
+		folded = self._folded.get(fold)
+		if not folded:
+			sources = None
+			if not self._sources is None:
+				sources = {}
+				for (network_name, names) in self._sources.items():
+					if not names is None:
+						names = frozenset([fold(i) for i in names])
+					sources[network_name] = names
+					
+			nicknames = None
+			if not self._nicknames is None:
+				nicknames = frozenset([fold(i) for i in self._nicknames])
+				
+			folded = (sources, nicknames)
+			self._folded[fold] = folded #Racing threads build identical tuples, so the last write is as good as the first.
+		return folded
+		
+		
 class _UI(_PluginPrototype):
 	"""
 	This class serves as a wrapper for UIs within PyRC's plugin
@@ -1142,3 +1903,21 @@ class PluginLoadError(Error):
 		"""
 		Error.__init__(self, description)
 		
+class SourceFilterError(Error):
+	"""
+	This class represents problems that might occur when compiling a source
+	filter declared by a plugin.
+	"""
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new SourceFilterError object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		Error.__init__(self, description)
+		
+		
\ No newline at end of file
@@ -0,0 +1,122 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) #Allow PyRC's packages to be found wherever this is run from.
+import pyrc_control.timers as timers
+
+class CronTest(unittest.TestCase):
+	def _parse(self, field, index):
+		"""
+		This parses a single field as though it were at the given position in a
+		cron expression.
+		"""
+		(minimum, maximum, names) = timers._CRON_FIELDS[index]
+		return timers._parseCronField(field, minimum, maximum, names)
+
+	def _nextTime(self, expression, after):
+		"""
+		This returns the next time at which the given expression matches, after
+		the given local time, as a local time tuple, or None.
+		"""
+		next_time = timers.compileCron(expression).getNextTime(time.mktime(after + (0, 0, 0, -1)))
+		if next_time is None:
+			return None
+		return time.localtime(next_time)[:5]
+
+	def testRanges(self):
+		"""
+		This test ensures that single values, ranges, and wildcards match exactly
+		the values they describe.
+		"""
+		self.assertEquals(self._parse("5", 0), frozenset((5,)))
+		self.assertEquals(self._parse("9-17", 1), frozenset(range(9, 18)))
+		self.assertEquals(self._parse("*", 1), frozenset(range(0, 24)))
+		self.assertEquals(self._parse("*", 2), frozenset(range(1, 32)))
+		self.assertEquals(self._parse("mon-fri", 4), frozenset(range(1, 6)))
+		self.assertEquals(self._parse("feb-apr", 3), frozenset((2, 3, 4)))
+
+	def testSteps(self):
+		"""
+		This test ensures that steps apply to wildcards, ranges, and single
+		values, which they extend to the end of the field.
+		"""
+		self.assertEquals(self._parse("*/15", 0), frozenset((0, 15, 30, 45)))
+		self.assertEquals(self._parse("1-10/3", 0), frozenset((1, 4, 7, 10)))
+		self.assertEquals(self._parse("5/20", 0), frozenset((5, 25, 45)))
+		self.assertEquals(self._parse("*/5", 3), frozenset((1, 6, 11)))
+
+	def testLists(self):
+		"""
+		This test ensures that lists combine every value their elements match.
+		"""
+		self.assertEquals(self._parse("0,30", 0), frozenset((0, 30)))
+		self.assertEquals(self._parse("1-3,10-12", 3), frozenset((1, 2, 3, 10, 11, 12)))
+		self.assertEquals(self._parse("jan,jul,dec", 3), frozenset((1, 7, 12)))
+		self.assertEquals(self._parse("0-10/5,58", 0), frozenset((0, 5, 10, 58)))
+
+	def testAliases(self):
+		"""
+		This test ensures that aliases, and both numbers for Sunday, are
+		recognised.
+		"""
+		self.assertEquals(self._nextTime("@hourly", (2026, 1, 1, 10, 30)), (2026, 1, 1, 11, 0))
+		self.assertEquals(self._nextTime("@daily", (2026, 1, 1, 10, 30)), (2026, 1, 2, 0, 0))
+		self.assertEquals(self._nextTime("@monthly", (2026, 1, 1, 10, 30)), (2026, 2, 1, 0, 0))
+		self.assertEquals(self._nextTime("0 0 * * 7", (2026, 1, 1, 10, 30)), (2026, 1, 4, 0, 0))
+		self.assertEquals(self._nextTime("0 0 * * 0", (2026, 1, 1, 10, 30)), (2026, 1, 4, 0, 0))
+
+	def testNextTime(self):
+		"""
+		This test ensures that the next matching minute is found, and that the
+		current minute is never matched again.
+		"""
+		self.assertEquals(self._nextTime("*/15 * * * *", (2026, 1, 1, 10, 7)), (2026, 1, 1, 10, 15))
+		self.assertEquals(self._nextTime("*/15 * * * *", (2026, 1, 1, 10, 15)), (2026, 1, 1, 10, 30))
+		self.assertEquals(self._nextTime("30 9-17 * * *", (2026, 1, 1, 17, 45)), (2026, 1, 2, 9, 30))
+		self.assertEquals(self._nextTime("0 0 1 jan *", (2026, 6, 1, 0, 0)), (2027, 1, 1, 0, 0))
+		self.assertEquals(self._nextTime("0 0 29 2 *", (2026, 1, 1, 0, 0)), (2028, 2, 29, 0, 0))
+		self.assertEquals(self._nextTime("0 0 31 2 *", (2026, 1, 1, 0, 0)), None)
+
+	def testDayInteraction(self):
+		"""
+		This test ensures that a day matching either the day of month or the day
+		of week is matched when both are restricted, and that only the
+		restricted field applies otherwise. 2026-01-02 is a Friday.
+		"""
+		self.assertEquals(self._nextTime("0 0 13 * *", (2026, 1, 1, 0, 30)), (2026, 1, 13, 0, 0))
+		self.assertEquals(self._nextTime("0 0 * * fri", (2026, 1, 1, 0, 30)), (2026, 1, 2, 0, 0))
+		self.assertEquals(self._nextTime("0 0 13 * fri", (2026, 1, 1, 0, 30)), (2026, 1, 2, 0, 0))
+		self.assertEquals(self._nextTime("0 0 13 * fri", (2026, 1, 9, 0, 30)), (2026, 1, 13, 0, 0))
+		self.assertEquals(self._nextTime("0 0 13 feb fri", (2026, 1, 1, 0, 30)), (2026, 2, 6, 0, 0))
+
+	def testErrors(self):
+		"""
+		This test ensures that malformed expressions are rejected.
+		"""
+		for expression in (
+		 "* * * *",
+		 "* * * * * *",
+		 "60 * * * *",
+		 "* 24 * * *",
+		 "* * 0 * *",
+		 "* * * 13 *",
+		 "* * * * 8",
+		 "*/0 * * * *",
+		 "*/x * * * *",
+		 "5-1 * * * *",
+		 "x * * * *",
+		 "* * * foo *",
+		 "1,,2 * * * *",
+		 "@often"
+		):
+			try:
+				timers.compileCron(expression)
+				self.fail("No error generated for %s. Expected %s." % (repr(expression), timers.TimerError.__name__))
+			except timers.TimerError, e: pass
+
+
+test_cron = unittest.main()
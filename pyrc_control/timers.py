@@ -0,0 +1,653 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_control.timers
+
+Purpose
+=======
+ Run the one-shot, repeating, and cron-style timers that plugins register
+ through the IAL, delivering their expirations from a small, fixed pool of
+ threads.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2004-2007
+"""
+import datetime
+import Queue
+import threading
+import time
+
+import pyrc_common.scheduler as scheduler
+
+import pyrc_common.dictionaries.outbound as outboundDictionaries
+#Dictionaries used by this module:
+##PyRC Timer Expired
+
+_WORKER_COUNT = 2 #: The number of threads that deliver expirations to plugins.
+_CRON_FIELDS = (
+ (0, 59, ()), #Minute
+ (0, 23, ()), #Hour
+ (1, 31, ()), #Day of month
+ (1, 12, ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')), #Month
+ (0, 7, ('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat')), #Day of week; 0 and 7 are both Sunday.
+) #: The (minimum, maximum, names) of each field of a cron expression, in order. Names are numbered from the minimum.
+_CRON_ALIASES = {
+ '@yearly': "0 0 1 1 *",
+ '@annually': "0 0 1 1 *",
+ '@monthly': "0 0 1 * *",
+ '@weekly': "0 0 * * 0",
+ '@daily': "0 0 * * *",
+ '@midnight': "0 0 * * *",
+ '@hourly': "0 * * * *",
+} #: The cron expressions abbreviated by each recognised alias.
+_CRON_SEARCH_DAYS = 366 * 28 #: The number of days to search for a match to a cron expression; weekdays and leap years repeat every 28 years.
+
+_timers = {} #: A dictionary of every pending PluginTimer, keyed by (<module_name:unicode>, <name:unicode>).
+_timer_lock = threading.Lock() #: A lock used to prevent multiple simultaneous accesses to the timer registry.
+_pool = None #: The _TimerPool that delivers expirations, created when the first timer is scheduled.
+
+def compileCron(expression):
+	"""
+	This function converts a cron expression into a CronSchedule.
+	
+	Expressions consist of five whitespace-separated fields: minute, hour, day
+	of month, month, and day of week. Each field is '*' or a comma-separated
+	list of values and ranges ("a-b"), any of which may be followed by a step
+	("/n"); months and days of the week may also be given by their English
+	three-letter abbreviations. The aliases @yearly, @annually, @monthly,
+	@weekly, @daily, @midnight, and @hourly are also recognised.
+	
+	As in cron, if both the day of month and the day of week are restricted, a
+	day that matches either is matched.
+	
+	Times are evaluated against the local clock.
+	
+	@type expression: basestring
+	@param expression: The cron expression to compile.
+	
+	@rtype: CronSchedule
+	@return: The compiled schedule.
+	
+	@raise TimerError: If the expression is malformed.
+	"""
+	expression = str(expression).strip().lower()
+	fields = _CRON_ALIASES.get(expression, expression).split()
+	if not len(fields) == len(_CRON_FIELDS):
+		raise TimerError(u"Cron expressions must have %i fields: %s" % (len(_CRON_FIELDS), repr(expression)))
+		
+	values = []
+	for (field, (minimum, maximum, names)) in zip(fields, _CRON_FIELDS):
+		values.append(_parseCronField(field, minimum, maximum, names))
+		
+	weekdays = values[4]
+	if 7 in weekdays:
+		weekdays = weekdays.union((0,)).difference((7,))
+	return CronSchedule(values[0], values[1], values[2], values[3], weekdays, not fields[2] == '*', not fields[4] == '*')
+	
+def _parseCronField(field, minimum, maximum, names):
+	"""
+	This function converts one field of a cron expression into the set of
+	values it matches.
+	
+	@type field: str
+	@param field: The field to parse.
+	@type minimum: int
+	@param minimum: The smallest value the field may hold.
+	@type maximum: int
+	@param maximum: The largest value the field may hold.
+	@type names: tuple
+	@param names: The names that may be used in place of numbers, starting
+	    with the name of the minimum value.
+	
+	@rtype: frozenset
+	@return: The values matched by the field.
+	
+	@raise TimerError: If the field is malformed or out of range.
+	"""
+	def parseValue(value):
+		if value in names:
+			return names.index(value) + minimum
+		try:
+			value = int(value)
+		except ValueError:
+			raise TimerError(u"Invalid cron value: %s" % repr(value))
+		if not minimum <= value <= maximum:
+			raise TimerError(u"Cron value %i is outside of the range %i-%i." % (value, minimum, maximum))
+		return value
+		
+	values = set()
+	for i in field.split(','):
+		step = 1
+		if '/' in i:
+			(i, step) = i.split('/', 1)
+			try:
+				step = int(step)
+			except ValueError:
+				step = 0
+			if step < 1:
+				raise TimerError(u"Invalid cron step in %s." % repr(field))
+				
+		if i == '*':
+			(start, end) = (minimum, maximum)
+		elif '-' in i:
+			(start, end) = [parseValue(j) for j in i.split('-', 1)]
+		else:
+			start = end = parseValue(i)
+			if not step == 1: #"a/n" means "a-maximum/n".
+				end = maximum
+		if start > end:
+			raise TimerError(u"Invalid cron range in %s." % repr(field))
+		values.update(range(start, end + 1, step))
+	return frozenset(values)
+	
+def scheduleTimer(module_name, name, delay, interval, cron, deliver):
+	"""
+	This function schedules a timer on behalf of a plugin, replacing any timer
+	the plugin had already scheduled under the same name.
+	
+	@type module_name: unicode
+	@param module_name: The module name of the plugin that owns the timer.
+	@type name: unicode
+	@param name: The name by which the plugin identifies the timer.
+	@type delay: int|None
+	@param delay: The number of milliseconds before the timer first expires.
+	    If None, the interval is used. Ignored if cron is given.
+	@type interval: int|None
+	@param interval: The number of milliseconds between subsequent
+	    expirations, or None if the timer should expire only once. Ignored if
+	    cron is given.
+	@type cron: basestring|None
+	@param cron: A cron expression, as described by compileCron(), that
+	    determines when the timer expires, or None.
+	@type deliver: function
+	@param deliver: The function to call, with the module name and a "Timer
+	    Expired" Event Dictionary, each time the timer expires.
+	
+	@return: Nothing.
+	
+	@raise TimerError: If the timer's parameters are invalid.
+	"""
+	current_time = time.time()
+	cron_schedule = None
+	if cron:
+		cron_schedule = compileCron(cron)
+		due_time = cron_schedule.getNextTime(current_time)
+		if due_time is None:
+			raise TimerError(u"Cron expression %s never matches." % repr(cron))
+		interval = None
+	else:
+		if not interval is None:
+			if interval <= 0:
+				raise TimerError(u"Timer intervals must be positive.")
+			interval = interval / 1000.0
+		if delay is None:
+			if interval is None:
+				raise TimerError(u"Timers must specify a delay, an interval, or a cron expression.")
+			delay = interval
+		elif delay < 0:
+			raise TimerError(u"Timer delays may not be negative.")
+		else:
+			delay = delay / 1000.0
+		due_time = current_time + delay
+		
+	global _pool
+	timer = PluginTimer(unicode(module_name), unicode(name), interval, cron_schedule, deliver)
+	try:
+		_timer_lock.acquire()
+		if not _pool:
+			_pool = _TimerPool(_WORKER_COUNT)
+			
+		previous = _timers.get(timer.getKey())
+		if previous:
+			previous.cancel()
+		_timers[timer.getKey()] = timer
+		timer.start(due_time)
+	finally:
+		_timer_lock.release()
+		
+def cancelTimer(module_name, name):
+	"""
+	This function cancels one of a plugin's timers.
+	
+	@type module_name: unicode
+	@param module_name: The module name of the plugin that owns the timer.
+	@type name: unicode
+	@param name: The name by which the plugin identifies the timer.
+	
+	@rtype: bool
+	@return: True if the timer was pending; False if it was unknown.
+	"""
+	_timer_lock.acquire()
+	timer = _timers.pop((unicode(module_name), unicode(name)), None)
+	_timer_lock.release()
+	
+	if timer:
+		timer.cancel()
+		return True
+	return False
+	
+def cancelTimers(module_name=None):
+	"""
+	This function cancels all of a plugin's timers, or every timer.
+	
+	It should be called whenever a plugin is disabled, so that its timers
+	cannot outlive it.
+	
+	@type module_name: unicode|None
+	@param module_name: The module name of the plugin whose timers are to be
+	    cancelled, or None to cancel every timer.
+	
+	@return: Nothing.
+	"""
+	_timer_lock.acquire()
+	if module_name is None:
+		timers = _timers.values()
+		_timers.clear()
+	else:
+		module_name = unicode(module_name)
+		timers = [_timers.pop(i) for i in _timers.keys() if i[0] == module_name]
+	_timer_lock.release()
+	
+	for i in timers:
+		i.cancel()
+		
+def getTimerNames(module_name):
+	"""
+	This function lists the timers a plugin has pending.
+	
+	@type module_name: unicode
+	@param module_name: The module name of the plugin.
+	
+	@rtype: list
+	@return: The names of the plugin's pending timers, sorted.
+	"""
+	module_name = unicode(module_name)
+	try:
+		_timer_lock.acquire()
+		return sorted([i[1] for i in _timers if i[0] == module_name])
+	finally:
+		_timer_lock.release()
+		
+def _releaseTimer(timer):
+	"""
+	This function removes a timer that will never expire again from the
+	registry, unless it has already been replaced.
+	
+	@type timer: PluginTimer
+	@param timer: The timer to be removed.
+	
+	@return: Nothing.
+	"""
+	_timer_lock.acquire()
+	if _timers.get(timer.getKey()) is timer:
+		del _timers[timer.getKey()]
+	_timer_lock.release()
+	
+	
+class CronSchedule(object):
+	"""
+	This class represents a compiled cron expression.
+	"""
+	_minutes = None #: A sorted tuple of the minutes that match.
+	_hours = None #: A sorted tuple of the hours that match.
+	_days = None #: A frozenset of the days of the month that match.
+	_months = None #: A frozenset of the months that match.
+	_weekdays = None #: A frozenset of the days of the week that match, with Sunday as 0.
+	_days_restricted = False #: True if the day of month field was not '*'.
+	_weekdays_restricted = False #: True if the day of week field was not '*'.
+	
+	def __init__(self, minutes, hours, days, months, weekdays, days_restricted, weekdays_restricted):
+		"""
+		This function is invoked when a new CronSchedule object is created.
+		
+		CronSchedules should be created with compileCron(), rather than
+		directly.
+		
+		@type minutes: frozenset
+		@param minutes: The minutes that match.
+		@type hours: frozenset
+		@param hours: The hours that match.
+		@type days: frozenset
+		@param days: The days of the month that match.
+		@type months: frozenset
+		@param months: The months that match.
+		@type weekdays: frozenset
+		@param weekdays: The days of the week that match, with Sunday as 0.
+		@type days_restricted: bool
+		@param days_restricted: True if the day of month was restricted.
+		@type weekdays_restricted: bool
+		@param weekdays_restricted: True if the day of week was restricted.
+		
+		@return: Nothing.
+		"""
+		self._minutes = tuple(sorted(minutes))
+		self._hours = tuple(sorted(hours))
+		self._days = days
+		self._months = months
+		self._weekdays = weekdays
+		self._days_restricted = days_restricted
+		self._weekdays_restricted = weekdays_restricted
+		
+	def getNextTime(self, after):
+		"""
+		This function determines the first time after a given moment that this
+		schedule matches.
+		
+		@type after: float
+		@param after: A UNIX timestamp.
+		
+		@rtype: float|None
+		@return: The UNIX timestamp of the start of the first matching minute
+		    after the given moment, or None if the schedule never matches.
+		"""
+		start = time.localtime(after)
+		day = datetime.date(start[0], start[1], start[2])
+		one_day = datetime.timedelta(1)
+		for i in xrange(_CRON_SEARCH_DAYS):
+			if self._matchesDay(day):
+				for hour in self._hours:
+					if i == 0 and hour < start[3]:
+						continue
+					for minute in self._minutes:
+						if i == 0 and hour == start[3] and minute < start[4]:
+							continue
+						timestamp = time.mktime((day.year, day.month, day.day, hour, minute, 0, 0, 0, -1))
+						if timestamp > after:
+							return timestamp
+			day += one_day
+		return None
+		
+	def _matchesDay(self, day):
+		"""
+		This function determines whether this schedule matches a date.
+		
+		@type day: datetime.date
+		@param day: The date to test.
+		
+		@rtype: bool
+		@return: True if the schedule matches some time on the given date.
+		"""
+		if not day.month in self._months:
+			return False
+			
+		day_matches = day.day in self._days
+		weekday_matches = (day.weekday() + 1) % 7 in self._weekdays
+		if self._days_restricted and self._weekdays_restricted:
+			return day_matches or weekday_matches
+		return day_matches and weekday_matches
+		
+		
+class PluginTimer(object):
+	"""
+	This class represents a timer scheduled by a plugin.
+	
+	Expirations are delivered by the _TimerPool. If a repeating timer expires
+	again before its previous expiration has been delivered, the new expiration
+	is dropped, so a slow handler cannot accumulate a backlog.
+	"""
+	_module_name = None #: The module name of the plugin that owns this timer.
+	_name = None #: The name by which the plugin identifies this timer.
+	_interval = None #: The number of seconds between expirations, or None.
+	_cron = None #: The CronSchedule that determines when this timer expires, or None.
+	_deliver = None #: The function to which expirations are delivered.
+	_timer = None #: The pyrc_common.scheduler.Timer that will next expire.
+	_cancelled = False #: True once this timer should never expire again.
+	_pending = False #: True while an expiration is waiting to be, or is being, delivered.
+	_lock = None #: A lock used to prevent multiple simultaneous accesses to this timer's state.
+	
+	def __init__(self, module_name, name, interval, cron, deliver):
+		"""
+		This function is invoked when a new PluginTimer object is created.
+		
+		@type module_name: unicode
+		@param module_name: The module name of the plugin that owns the timer.
+		@type name: unicode
+		@param name: The name by which the plugin identifies the timer.
+		@type interval: float|None
+		@param interval: The number of seconds between expirations, or None if
+		    the timer expires only once or follows a cron schedule.
+		@type cron: CronSchedule|None
+		@param cron: The schedule the timer follows, or None.
+		@type deliver: function
+		@param deliver: The function to which expirations are delivered.
+		
+		@return: Nothing.
+		"""
+		self._module_name = module_name
+		self._name = name
+		self._interval = interval
+		self._cron = cron
+		self._deliver = deliver
+		self._lock = threading.Lock()
+		
+	def cancel(self):
+		"""
+		This function prevents the timer from expiring again. An expiration
+		that is already being delivered is unaffected.
+		
+		@return: Nothing.
+		"""
+		self._lock.acquire()
+		
+		self._cancelled = True
+		if self._timer:
+			self._timer.cancel()
+			
+		self._lock.release()
+		
+	def deliver(self, due_time):
+		"""
+		This function delivers an expiration to the plugin that owns the timer.
+		
+		It is called by the _TimerPool.
+		
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the timer was due.
+		
+		@return: Nothing.
+		"""
+		try:
+			if not self._cancelled:
+				self._deliver(self._module_name, outboundDictionaries.PyRC_Timer_Expired(self._module_name, self._name, due_time, time.time()))
+		finally:
+			self._pending = False
+			
+	def getKey(self):
+		"""
+		This function returns the key under which the timer is registered.
+		
+		@rtype: tuple
+		@return: A (module_name, name) tuple.
+		"""
+		return (self._module_name, self._name)
+		
+	def start(self, due_time):
+		"""
+		This function schedules the timer's first expiration.
+		
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the timer first expires.
+		
+		@return: Nothing.
+		"""
+		self._lock.acquire()
+		
+		if not self._cancelled:
+			self._timer = scheduler.getScheduler().scheduleAt(due_time, self._expire, (due_time,))
+			
+		self._lock.release()
+		
+	def _expire(self, due_time):
+		"""
+		This function is called by the scheduler when the timer expires; it
+		schedules the next expiration, if any, and passes this one to the
+		_TimerPool.
+		
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the timer was due.
+		
+		@return: Nothing.
+		"""
+		self._lock.acquire()
+		if self._cancelled:
+			self._lock.release()
+			return
+			
+		next_time = None
+		if self._cron:
+			next_time = self._cron.getNextTime(due_time)
+		elif self._interval:
+			next_time = due_time + self._interval
+			current_time = time.time()
+			if next_time <= current_time: #Expirations were missed; keep to the original phase without replaying them.
+				next_time = current_time + self._interval - (current_time - due_time) % self._interval
+				
+		if not next_time is None:
+			self._timer = scheduler.getScheduler().scheduleAt(next_time, self._expire, (next_time,))
+			
+		deliver = not self._pending
+		self._pending = True
+		self._lock.release()
+		
+		if next_time is None:
+			_releaseTimer(self)
+		if deliver:
+			_pool.addTimer(self, due_time)
+			
+			
+class _TimerPool(object):
+	"""
+	This class delivers timer expirations from a fixed number of threads.
+	
+	Since each PluginTimer has at most one expiration pending, the pool's
+	queue can never hold more entries than there are timers.
+	"""
+	_queue = None #: A Queue.Queue of (PluginTimer, due_time) tuples awaiting delivery.
+	_workers = None #: A tuple of the _TimerWorker threads that service the queue.
+	
+	def __init__(self, worker_count):
+		"""
+		This function is invoked when a new _TimerPool object is created.
+		
+		@type worker_count: int
+		@param worker_count: The number of threads to start.
+		
+		@return: Nothing.
+		"""
+		self._queue = Queue.Queue()
+		workers = []
+		for i in range(worker_count):
+			worker = _TimerWorker(self._queue)
+			workers.append(worker)
+			worker.start()
+		self._workers = tuple(workers)
+		
+	def addTimer(self, timer, due_time):
+		"""
+		This function queues a timer's expiration for delivery.
+		
+		@type timer: PluginTimer
+		@param timer: The timer that expired.
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the timer was due.
+		
+		@return: Nothing.
+		"""
+		self._queue.put((timer, due_time))
+		
+		
+class _TimerWorker(threading.Thread):
+	"""
+	This class delivers the expirations queued in a _TimerPool.
+	"""
+	_queue = None #: The Queue.Queue from which expirations are taken.
+	
+	def __init__(self, queue):
+		"""
+		This function is invoked when a new _TimerWorker object is created.
+		
+		@type queue: Queue.Queue
+		@param queue: The queue from which expirations are taken.
+		
+		@return: Nothing.
+		"""
+		threading.Thread.__init__(self)
+		self._queue = queue
+		self.setDaemon(True)
+		self.setName("Plugin Timers - Worker Thread")
+		
+	def run(self):
+		"""
+		This function is executed over the course of the thread's lifetime,
+		delivering expirations as they are queued.
+		
+		@return: Nothing.
+		"""
+		while True:
+			(timer, due_time) = self._queue.get()
+			try:
+				timer.deliver(due_time)
+			except Exception: #The delivery function reports plugin crashes itself.
+				pass
+				
+				
+class Error(Exception):
+	"""
+	This class serves as the base from which all exceptions native to this
+	module are derived.
+	"""
+	description = None #: A description of the error.
+	
+	def __str__(self):
+		"""
+		This function returns an ASCII version of the description of this Error.
+		
+		When possible, the Unicode version should be used instead.
+		
+		@rtype: str
+		@return: The description of this error.
+		"""
+		return str(self.description)
+		
+	def __unicode__(self):
+		"""
+		This function returns the description of this Error.
+		
+		@rtype: unicode
+		@return: The description of this error.
+		"""
+		return self.description
+		
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new Error object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		self.description = unicode(description)
+		
+class TimerError(Error):
+	"""
+	This class represents problems that might occur when scheduling a timer
+	requested by a plugin.
+	"""
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new TimerError object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		Error.__init__(self, description)
+		
+		
\ No newline at end of file
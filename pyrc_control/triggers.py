@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_control.triggers
+
+Purpose
+=======
+ Match the text of messages against the command triggers declared by every
+ plugin in a single pass, so plugins are only invoked for commands they
+ recognise.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2004-2007
+"""
+import re
+
+_MAX_COMBINED_GROUPS = 99 #: The number of capturing groups a single combined regular expression may hold; Python's sre engine refuses to compile more than 100.
+_STANDALONE_REGEXP = re.compile(r"\\[1-9]|\(\?P=|\(\?[iLmsux]+\)") #: A regular expression used to identify patterns that cannot be safely embedded in a larger expression: those with numbered or named backreferences or global inline flags.
+
+def compileTrigger(specification, handler):
+	"""
+	This function converts a trigger declared by a plugin in loadMe() into a
+	Trigger.
+	
+	A trigger is a dictionary that contains exactly one of the following
+	elements::
+	 'prefix': <prefix:basestring>
+	  Messages that start with this string are matched. The handler receives
+	  a one-element tuple containing the rest of the message.
+	 'regexp': <pattern:basestring|_sre.SRE_Pattern>
+	  Messages that this regular expression matches, as with re.match(), are
+	  matched. The handler receives the tuple returned by the match's groups()
+	  function.
+	
+	It may also contain the following element::
+	 'ignorecase': <ignore_case:bool>
+	  If True, the prefix or pattern is matched without regard to case. This is
+	  implied by compiled patterns that were built with re.I.
+	
+	@type specification: dict
+	@param specification: The trigger declared by the plugin.
+	@type handler: function
+	@param handler: The function to call when the trigger matches. It must
+	    accept the Event Dictionary, the IAL's interface, and the tuple of
+	    captured groups.
+	
+	@rtype: Trigger
+	@return: The compiled trigger.
+	
+	@raise TriggerError: If the specification is malformed.
+	"""
+	prefix = specification.get('prefix')
+	regexp = specification.get('regexp')
+	ignore_case = bool(specification.get('ignorecase'))
+	if (prefix is None) == (regexp is None):
+		raise TriggerError(u"Triggers must specify exactly one of 'prefix' and 'regexp': %s" % repr(specification))
+		
+	if not prefix is None:
+		if not prefix:
+			raise TriggerError(u"Trigger prefixes may not be empty.")
+		return Trigger(handler, prefix=unicode(prefix), ignore_case=ignore_case)
+		
+	try:
+		if isinstance(regexp, basestring):
+			flags = 0
+			if ignore_case:
+				flags = re.I
+			regexp = re.compile(regexp, flags | re.U)
+		elif ignore_case and not regexp.flags & re.I:
+			regexp = re.compile(regexp.pattern, regexp.flags | re.I)
+	except Exception, e:
+		raise TriggerError(u"Invalid trigger pattern %s: %s" % (repr(regexp), e))
+	return Trigger(handler, regexp=regexp)
+	
+	
+class Trigger(object):
+	"""
+	This class represents a single compiled trigger and the plugin function it
+	invokes.
+	"""
+	_handler = None #: The function to call when this trigger matches.
+	_prefix = None #: The literal prefix this trigger matches, or None if it is a regexp trigger.
+	_ignore_case = False #: True if this trigger's prefix is matched without regard to case.
+	_regexp = None #: The compiled regular expression this trigger matches, or None if it is a prefix trigger.
+	
+	def __init__(self, handler, prefix=None, ignore_case=False, regexp=None):
+		"""
+		This function is invoked when a new Trigger object is created.
+		
+		@type handler: function
+		@param handler: The function to call when this trigger matches.
+		@type prefix: unicode|None
+		@param prefix: The literal prefix to match, or None.
+		@type ignore_case: bool
+		@param ignore_case: True if the prefix should be matched without regard
+		    to case.
+		@type regexp: _sre.SRE_Pattern|None
+		@param regexp: The compiled regular expression to match, or None.
+		
+		@return: Nothing.
+		"""
+		self._handler = handler
+		self._prefix = prefix
+		self._ignore_case = ignore_case
+		self._regexp = regexp
+		
+	def getHandler(self):
+		"""
+		This function returns the function this trigger invokes.
+		
+		@rtype: function
+		@return: The trigger's handler.
+		"""
+		return self._handler
+		
+	def getPrefix(self):
+		"""
+		This function returns the literal prefix this trigger matches.
+		
+		@rtype: unicode|None
+		@return: The prefix, or None if this is a regexp trigger.
+		"""
+		return self._prefix
+		
+	def getRegexp(self):
+		"""
+		This function returns the regular expression this trigger matches.
+		
+		@rtype: _sre.SRE_Pattern|None
+		@return: The compiled expression, or None if this is a prefix trigger.
+		"""
+		return self._regexp
+		
+	def ignoresCase(self):
+		"""
+		This function indicates whether this trigger's prefix is matched
+		without regard to case.
+		
+		@rtype: bool
+		@return: True if case is ignored.
+		"""
+		return self._ignore_case
+		
+		
+class TriggerMatcher(object):
+	"""
+	This class matches messages against a fixed set of triggers at once.
+	
+	Prefix triggers are stored in a character trie, which is walked once per
+	message. Regexp triggers are joined into as few alternations as their
+	flags and group counts allow, so a message that matches none of them costs
+	one regular expression evaluation per alternation.
+	"""
+	_trie = None #: A trie of case-sensitive prefix triggers; each node is a dictionary of child nodes keyed by character, with a list of completed triggers stored under None.
+	_folded_trie = None #: A trie, like _trie, of case-insensitive prefix triggers, keyed by lowercase characters.
+	_combined = None #: A list of (combined regexp, members) tuples, where members is a list of (trigger, wrapper group index, group count) tuples in alternation order.
+	_standalone = None #: A list of regexp triggers whose patterns cannot be embedded in an alternation.
+	
+	def __init__(self, triggers):
+		"""
+		This function is invoked when a new TriggerMatcher object is created.
+		
+		@type triggers: sequence
+		@param triggers: The Trigger objects to be matched.
+		
+		@return: Nothing.
+		"""
+		self._trie = {}
+		self._folded_trie = {}
+		self._combined = []
+		self._standalone = []
+		
+		groups = {} #Regexp triggers, grouped by flags.
+		for i in triggers:
+			prefix = i.getPrefix()
+			if not prefix is None:
+				node = self._trie
+				if i.ignoresCase():
+					node = self._folded_trie
+					prefix = prefix.lower()
+				for j in prefix:
+					node = node.setdefault(j, {})
+				node.setdefault(None, []).append(i)
+			else:
+				regexp = i.getRegexp()
+				if regexp.groupindex or _STANDALONE_REGEXP.search(regexp.pattern) or regexp.groups >= _MAX_COMBINED_GROUPS:
+					self._standalone.append(i)
+				else:
+					groups.setdefault(regexp.flags, []).append(i)
+					
+		for (flags, flag_triggers) in groups.items():
+			while flag_triggers:
+				patterns = []
+				members = []
+				group_count = 0
+				while flag_triggers and group_count + flag_triggers[0].getRegexp().groups + 1 <= _MAX_COMBINED_GROUPS:
+					trigger = flag_triggers.pop(0)
+					regexp = trigger.getRegexp()
+					patterns.append("(%s)" % regexp.pattern)
+					members.append((trigger, group_count + 1, regexp.groups))
+					group_count += regexp.groups + 1
+				self._combined.append((re.compile('|'.join(patterns), flags), members))
+				
+	def match(self, message):
+		"""
+		This function identifies every trigger that matches a message.
+		
+		@type message: basestring
+		@param message: The text of the message.
+		
+		@rtype: dict
+		@return: A dictionary of tuples of captured groups, keyed by the
+		    Trigger objects that matched.
+		"""
+		matches = {}
+		if self._trie:
+			self._walkTrie(self._trie, message, message, matches)
+		if self._folded_trie:
+			self._walkTrie(self._folded_trie, message.lower(), message, matches)
+			
+		for (combined, members) in self._combined:
+			match = combined.match(message)
+			if not match:
+				continue
+				
+			#The alternation stops at the first member that matches; the
+			#members that follow it must be tried individually.
+			groups = match.groups()
+			for (position, (trigger, group_index, group_count)) in enumerate(members):
+				if group_index == match.lastindex:
+					matches[trigger] = groups[group_index:group_index + group_count]
+					for (trigger, group_index, group_count) in members[position + 1:]:
+						match = trigger.getRegexp().match(message)
+						if match:
+							matches[trigger] = match.groups()
+					break
+					
+		for i in self._standalone:
+			match = i.getRegexp().match(message)
+			if match:
+				matches[i] = match.groups()
+		return matches
+		
+	def _walkTrie(self, trie, text, message, matches):
+		"""
+		This function finds every prefix trigger in a trie that matches a
+		message.
+		
+		@type trie: dict
+		@param trie: The root node of the trie to walk.
+		@type text: basestring
+		@param text: The message, folded to match the trie's keys.
+		@type message: basestring
+		@param message: The original message, used to build captured groups.
+		@type matches: dict
+		@param matches: The dictionary to which matched triggers are added.
+		
+		@return: Nothing.
+		"""
+		node = trie
+		depth = 0
+		for i in text:
+			node = node.get(i)
+			if node is None:
+				return
+			depth += 1
+			for j in node.get(None, ()):
+				matches[j] = (message[depth:],)
+		
+		
+class Error(Exception):
+	"""
+	This class serves as the base from which all exceptions native to this
+	module are derived.
+	"""
+	description = None #: A description of the error.
+	
+	def __str__(self):
+		"""
+		This function returns an ASCII version of the description of this Error.
+		
+		When possible, the Unicode version should be used instead.
+		
+		@rtype: str
+		@return: The description of this error.
+		"""
+		return str(self.description)
+		
+	def __unicode__(self):
+		"""
+		This function returns the description of this Error.
+		
+		@rtype: unicode
+		@return: The description of this error.
+		"""
+		return self.description
+		
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new Error object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		self.description = unicode(description)
+		
+class TriggerError(Error):
+	"""
+	This class represents problems that might occur when compiling a trigger
+	declared by a plugin.
+	"""
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new TriggerError object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		Error.__init__(self, description)
+		
+		
\ No newline at end of file
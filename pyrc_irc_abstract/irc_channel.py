@@ -18,7 +18,6 @@ import threading
 
 import irc_user
 
-import pyrc_common.GLOBAL as GLOBAL
 import pyrc_common.dictionaries.information as informationDictionaries
 #The following dictionaries are used by this module:
 ##Channel Data
@@ -68,7 +67,8 @@ class _UserContainer(object):
 		@return: A dictionary of dictionaries of the form returned by
 		    common.dictionaries.information.User_Data().
 		    
-		    The elements of this dictionary are keyed by lower-case username.
+		    The elements of this dictionary are keyed by username, folded
+		    according to the server's casemapping.
 		"""
 		pass
 		
@@ -82,10 +82,13 @@ class Channel(_UserContainer):
 	_mode_lock = None #: A lock used to prevent multiple simultaneous accesses to the mode pool.
 	_topic_lock = None #: A lock used to prevent multiple simultaneous accesses to the channel's topic.
 	_name = None #: A string containing the name of this channel.
+	_key = None #: The name of this channel, folded according to the server's casemapping.
 	_password = None #: A string containing the password of the channel, if any.
 	_topic = None #: A string containing the topic of this channel.
-	_modes = None #: A list of modes attached to this channel. Elements may be unicodes or tuples(2).
+	_modes = None #: A dictionary of the modes attached to this channel, keyed by mode; each value is the mode's parameter, or None.
+	_mode_cache = None #: A tuple of the form (<modes:tuple>, <modestring_full:unicode>, <modestring_safe:unicode>), rendered from _modes when first needed; None if the channel's modes have changed since it was rendered.
 	_user_manager = None #: The pyrc_irc_abstract.irc_user.UserManagerChannel object this channel uses to manage its users.
+	_membership_id = None #: The identifier assigned to this channel by its server's pyrc_irc_abstract.irc_user.MembershipTable.
 	
 	def __init__(self, server, channel_name, password=None):
 		"""
@@ -102,13 +105,15 @@ class Channel(_UserContainer):
 		"""
 		self._mode_lock = threading.Lock()
 		self._topic_lock = threading.Lock()
-		self._modes = []
+		self._modes = {}
 		
 		self._name = unicode(channel_name)
+		self._key = server.getISupport().fold(self._name)
 		if password:
 			self._password = unicode(password)
 			
 		_UserContainer.__init__(self, server)
+		self._membership_id = server.getUserManager().getMembershipTable().registerChannel(self)
 		self._user_manager = irc_user.UserManagerChannel(self)
 		
 	def close(self):
@@ -120,17 +125,23 @@ class Channel(_UserContainer):
 		@return: Nothing.
 		"""
 		self._user_manager.emptyPool()
+		self._server.getUserManager().getMembershipTable().releaseChannel(self._membership_id)
 		
-	def getData(self):
+	def getData(self, capture=False):
 		"""
 		This function returns a dictionary containing all information known about
 		the channel and its users.
 		
+		@type capture: bool
+		@param capture: True if the users' dictionaries should describe them as
+		    they are now, as events must; False if they should describe them as
+		    they are whenever they are read.
+		
 		@rtype: dict
 		@return: A dictionary of the format returned by
 		    common.dictionaries.information.Channel_Data().
 		"""
-		return informationDictionaries.Channel_Data(self._name, self.getTopic(), self.getModes(), self.getModeStringFull(), self.getModeStringSafe(), self._user_manager.getUsersData())
+		return informationDictionaries.Channel_Data(self._name, self.getTopic(), self.getModes(), self.getModeStringFull(), self.getModeStringSafe(), self.getUsersData(capture))
 		
 	#Channel management
 	####################################
@@ -146,42 +157,47 @@ class Channel(_UserContainer):
 		@rtype: tuple
 		@return: A tuple of the channel's current modes.
 		"""
+		return self._getModeCache()[0]
+		
+	def _getModeCache(self):
+		"""
+		This function returns the channel's current modes and modestrings,
+		rendering them only if the channel's modes have changed since they were
+		last requested.
+		
+		@rtype: tuple
+		@return: A tuple of the form described by _mode_cache.
+		"""
 		try:
 			self._mode_lock.acquire()
-			return tuple(self._modes)
+			if self._mode_cache is None:
+				modes = []
+				for (mode, parameter) in self._modes.iteritems():
+					if parameter:
+						modes.append((mode, parameter))
+					else:
+						modes.append(mode)
+				modes.sort()
+				
+				modestring = paramstring = u""
+				modestring_safe = paramstring_safe = u""
+				for i in modes:
+					if type(i) == unicode:
+						modestring += i
+						modestring_safe += i
+					else:
+						modestring += i[0]
+						paramstring += ' ' + i[1]
+						if not i[0] == 'k':
+							modestring_safe += i[0]
+							paramstring_safe += ' ' + i[1]
+						else: #Omit the channel's key.
+							modestring_safe = i[0] + modestring_safe
+				self._mode_cache = (tuple(modes), modestring + paramstring, modestring_safe + paramstring_safe)
+			return self._mode_cache
 		finally:
 			self._mode_lock.release()
 			
-	def _getModeString(self, tuple_handler):
-		"""
-		This function will handle generation of a modestring, using a
-		call-specific routine for handling tuples.
-		
-		@type tuple_handler: Function
-		@param tuple_handler: A function to be invoked when handling a mode
-		    stored as a tuple.
-		    
-		    It must accept a tuple(2), a modestring, and an paramstring.
-		    
-		    It must return a tuple(2) that contains the updated modestring and
-		    paramstring.
-		    
-		@rtype: unicode
-		@return: A finished modestring containing the channel's current modes.
-		"""
-		modestring = ""
-		paramstring = ""
-		self._mode_lock.acquire()
-		
-		for i in self._modes:
-			if type(i) == unicode:
-				modestring += i
-			else:
-				(modestring, paramstring) = tuple_handler(i, modestring, paramstring)
-				
-		self._mode_lock.release()
-		return unicode(modestring + paramstring)
-		
 	def getModeStringFull(self):
 		"""
 		This function returns the channel's current modes, expressed as a string.
@@ -189,13 +205,7 @@ class Channel(_UserContainer):
 		@rtype: unicode
 		@return: A string containing the channel's current modes.
 		"""
-		def tupleHandler(tuple_in, modestring, paramstring):
-			modestring += tuple_in[0]
-			if tuple_in[1]:
-				paramstring += ' ' + tuple_in[1]
-			return modestring, paramstring
-			
-		return self._getModeString(tupleHandler)
+		return self._getModeCache()[1]
 		
 	def getModeStringSafe(self):
 		"""
@@ -207,16 +217,17 @@ class Channel(_UserContainer):
 		@rtype: unicode
 		@return: A string containing the channel's current modes.
 		"""
-		def tupleHandler(tuple_in, modestring, paramstring):
-			if not tuple_in[0] == 'k':
-				modestring += tuple_in[0]
-				if tuple_in[1]:
-					paramstring += ' ' + tuple_in[1]
-			else:
-				modestring = tuple_in[0] + modestring
-			return modestring, paramstring
-			
-		return self._getModeString(tupleHandler)
+		return self._getModeCache()[2]
+		
+	def getKey(self):
+		"""
+		This function returns the channel's name, folded according to the
+		server's casemapping.
+		
+		@rtype: unicode
+		@return: The channel's folded name.
+		"""
+		return self._key
 		
 	def getName(self):
 		"""
@@ -227,6 +238,16 @@ class Channel(_UserContainer):
 		"""
 		return self._name
 		
+	def getMembershipID(self):
+		"""
+		This function returns the identifier assigned to this channel by its
+		server's MembershipTable.
+		
+		@rtype: int
+		@return: The channel's membership identifier.
+		"""
+		return self._membership_id
+		
 	def getPassword(self):
 		"""
 		This function returns the channel's password, if any.
@@ -260,6 +281,16 @@ class Channel(_UserContainer):
 		finally:
 			self._topic_lock.release()
 			
+	def refoldName(self):
+		"""
+		This function recomputes the folded names of the channel and its users
+		after the server's casemapping has changed.
+		
+		@return: Nothing.
+		"""
+		self._key = self._server.getISupport().fold(self._name)
+		self._user_manager.refoldNicknames()
+		
 	def setModes(self, modes):
 		"""
 		This function sets the channel's modes to an arbitrary list.
@@ -275,17 +306,17 @@ class Channel(_UserContainer):
 		"""
 		self._mode_lock.acquire()
 		
-		mode_list = []
+		mode_table = {}
 		for i in modes:
 			if i[1]:
-				mode_list.append((unicode(i[0]), unicode(i[1])))
+				mode_table[unicode(i[0])] = unicode(i[1])
 				if i[0] == 'k':
 					self._password = unicode(i[1])
 			else:
-				mode_list.append(unicode(i[0]))
+				mode_table[unicode(i[0])] = None
 				
-		mode_list.sort()
-		self._modes = mode_list
+		self._modes = mode_table
+		self._mode_cache = None
 		
 		self._mode_lock.release()
 		
@@ -329,11 +360,13 @@ class Channel(_UserContainer):
 		removed_channel_modes = []
 		added_user_modes = []
 		removed_user_modes = []
+		rank_changes = []
+		isupport = self._server.getISupport()
 		for i in modes:
-			if i[0] in GLOBAL.IRC_IGNORED_MODES:
+			if isupport.isListMode(i[0]):
 				continue
-			elif i[0] in GLOBAL.IRC_RANK_ORDER: #The mode is intended for a user.
-				self.updateUserStatus(i[1], i[0], i[2])
+			elif isupport.isRankMode(i[0]): #The mode is intended for a user.
+				rank_changes.append((i[1], i[0], i[2]))
 				if i[2]:
 					added_user_modes.append(i)
 				else:
@@ -341,44 +374,29 @@ class Channel(_UserContainer):
 			elif i[2]: #The mode is being added.
 				self._mode_lock.acquire()
 				
-				add = True
-				remove = False
-				element_to_remove = None
 				added_channel_modes.append(i[:2])
-				for j in self._modes:
-					if j[0] == i[0]: #The mode was already set.
-						if j[1] == i[1]: #And the parameter hasn't changed
-							add = False
-						else: #The paramater is changing, so remove the old mode.
-							remove = True
-							element_to_remove = j
-						break
-				if remove:
-					self._modes.remove(element_to_remove)
-				if add:
-					if not i[1]:
-						self._modes.append(unicode(i[0]))
-					else:
-						self._modes.append((unicode(i[0]), unicode(i[1])))
-						if i[0] == 'k':
-							self._password = unicode(i[1])
-							
+				parameter = None
+				if i[1]:
+					parameter = unicode(i[1])
+					if i[0] == 'k':
+						self._password = parameter
+				mode = unicode(i[0])
+				if not mode in self._modes or not self._modes[mode] == parameter:
+					self._modes[mode] = parameter
+					self._mode_cache = None
+					
 				self._mode_lock.release()
 			else: #The mode is being removed.
 				self._mode_lock.acquire()
 				
 				removed_channel_modes.append(i[:2])
-				for j in self._modes:
-					if j[0] == i[0]:
-						self._modes.remove(j)
-						break
-						
+				if i[0] in self._modes:
+					del self._modes[i[0]]
+					self._mode_cache = None
+					
 				self._mode_lock.release()
-		self._mode_lock.acquire()
-		
-		self._modes.sort()
-		
-		self._mode_lock.release()
+		if rank_changes: #Apply every rank change in the line at once, so the member list is updated only once.
+			self._user_manager.updateChannelStatuses(rank_changes)
 		return (added_channel_modes, removed_channel_modes, added_user_modes, removed_user_modes)
 		
 	#User managerment
@@ -406,15 +424,32 @@ class Channel(_UserContainer):
 		This function adds a list of users to the channel; it is typically called
 		when PyRC is joining.
 		
+		This function's logic and persistence have been exported to this
+		channel's UserManagerChannel object.
+		
 		@type nicknames: list
 		@param nicknames: A list of basestrings representing the users in the
-		    channel.
+		    channel. These may be symbol-prefixed.
 		
 		@return: Nothing.
 		"""
-		for i in nicknames:
-			self.addUser(i)
-			
+		self._user_manager.addUsers(nicknames)
+		
+	def getMembershipSnapshot(self):
+		"""
+		This function retrieves the channel-specific "User Data" dictionaries
+		associated with all users in the channel, along with the version of the
+		channel's membership that they describe.
+		
+		This function's logic and persistence have been exported to this
+		channel's UserManagerChannel object.
+		
+		@rtype: tuple
+		@return: A tuple of the form (<version:int>, <users:dict>), as returned
+		    by irc_user.UserManagerChannel.getMembershipSnapshot().
+		"""
+		return self._user_manager.getMembershipSnapshot()
+		
 	def getUser(self, nickname):
 		"""
 		This function retrieves a User object from the channel.
@@ -449,7 +484,7 @@ class Channel(_UserContainer):
 		"""
 		return self._user_manager.getUserData(nickname)
 		
-	def getUsersData(self):
+	def getUsersData(self, capture=False):
 		"""
 		This function retrieves the channel-specific "User Data" dictionaries
 		associated with all users in the channel.
@@ -457,6 +492,11 @@ class Channel(_UserContainer):
 		This function's logic and persistence have been exported to this
 		channel's UserManagerChannel object.
 		
+		@type capture: bool
+		@param capture: True if the dictionaries should describe the users as
+		    they are now, as events must; False if they should describe them as
+		    they are whenever they are read.
+		
 		@rtype: dict
 		@return: A dictionary of dictionaries of the form returned by
 		    User.getData(). The containing dictionary takes the following form::
@@ -464,8 +504,11 @@ class Channel(_UserContainer):
 		      <nickname:unicode>: <User_Data:dictionary>
 		     }
 		     
-		    The nicknames used as keys are all lower-case.
+		    The nicknames used as keys are folded according to the server's
+		    casemapping.
 		"""
+		if capture:
+			return self._user_manager.captureUsersData()
 		return self._user_manager.getUsersData()
 		
 	def removeUser(self, nickname):
@@ -542,7 +585,7 @@ class SimpleUserContainer(_UserContainer):
 	It is required for gathering information about users in channels that PyRC
 	has not joined.
 	"""
-	_users = None #: A dictionary of dictionaries of the form returned by common.dictionaries.information.User_Data(). These are keyed by lower-case username.
+	_users = None #: A dictionary of dictionaries of the form returned by common.dictionaries.information.User_Data(). These are keyed by username, folded according to the server's casemapping.
 	
 	def __init__(self, server):
 		"""
@@ -570,33 +613,19 @@ class SimpleUserContainer(_UserContainer):
 		
 		@return: Nothing.		
 		"""
-		for i in nicknames:
-			nickname = unicode(i)
-			
-			#Pop every relevant mode from the user's token.
-			modes = []
-			for j in range(len(nickname)):
-				if nickname[j] in GLOBAL.IRC_RANK_PREFIX:
-					modes.append(nickname[j])
-				else:
-					nickname = nickname[j:]
-					break
-					
-			symbol = None
-			for j in GLOBAL.IRC_RANK_ORDER:
-				if j in modes:
-					symbol = j
-					break
-					
+		isupport = self._server.getISupport()
+		members = [isupport.parseNamesToken(i) for i in nicknames if i]
+		users = self._server.getUserManager().getUsers([nickname for (nickname, ranks) in members])
+		for ((nickname, ranks), user) in zip(members, users):
+			symbol = isupport.getRankSymbol(ranks)
 			user_data = None
-			user = self._server.getUser(nickname)
 			if user:
-				user_data = user.getData()
+				user_data = user.getData().copy()
 				user_data['symbol'] = symbol
 			else:
 				user_data = informationDictionaries.User_Data(nickname, None, None, None, None, None, None, None, symbol)
 				
-			self._users[nickname.lower()] = user_data
+			self._users[isupport.fold(nickname)] = user_data
 			
 	def getUsersData(self):
 		"""
@@ -607,7 +636,8 @@ class SimpleUserContainer(_UserContainer):
 		@return: A dictionary of dictionaries of the form returned by
 		    common.dictionaries.information.User_Data().
 		    
-		    The elements of this dictionary are keyed by lower-case username.
+		    The elements of this dictionary are keyed by username, folded
+		    according to the server's casemapping.
 		"""
 		return self._users
 		
@@ -624,8 +654,10 @@ class ChannelManager(object):
 	
 	Its elements take the following form::
 	 {
-	  <channel_name:unicode>: <:Channel>
+	  <channel_key:unicode>: <:Channel>
 	 }
+	
+	Each channel is keyed by its name, as folded by Channel.getKey().
 	"""
 	
 	def __init__(self, server):
@@ -655,10 +687,10 @@ class ChannelManager(object):
 		@return: Nothing.
 		"""
 		#Sanitize input
-		channel_name = unicode(channel_name).lower()
+		channel = Channel(self._server, unicode(channel_name).lower(), password)
 		self._channel_lock.acquire()
 		
-		self._channels[channel_name] = Channel(self._server, channel_name, password)
+		self._channels[channel.getKey()] = channel
 		
 		self._channel_lock.release()
 		
@@ -672,9 +704,10 @@ class ChannelManager(object):
 		"""
 		self._channel_lock.acquire()
 		
-		channel_names = self._channels.keys()
-		for i in channel_names:
-			self._channels[i].close()
+		channel_names = []
+		for i in self._channels.itervalues():
+			i.close()
+			channel_names.append(i.getName())
 		self._channels = {}
 		
 		self._channel_lock.release()
@@ -694,10 +727,10 @@ class ChannelManager(object):
 		    be found.
 		"""
 		#Sanitize input
-		channel_name = unicode(channel_name).lower()
+		channel_key = self._server.getISupport().fold(channel_name)
 		try:
 			self._channel_lock.acquire()
-			return self._channels.get(channel_name)
+			return self._channels.get(channel_key)
 		finally:
 			self._channel_lock.release()
 			
@@ -710,7 +743,7 @@ class ChannelManager(object):
 		"""
 		self._channel_lock.acquire()
 		
-		channel_names = self._channels.keys()
+		channel_names = [i.getName() for i in self._channels.itervalues()]
 		
 		self._channel_lock.release()
 		channel_names.sort()
@@ -745,13 +778,30 @@ class ChannelManager(object):
 		@return: Nothing.
 		"""
 		#Sanitize input
-		channel_name = unicode(channel_name.lower())
+		channel_key = self._server.getISupport().fold(channel_name)
 		self._channel_lock.acquire()
 		
-		channel = self._channels.get(channel_name)
+		channel = self._channels.get(channel_key)
 		if channel:
 			channel.close()
-			del self._channels[channel_name]
+			del self._channels[channel_key]
 			
 		self._channel_lock.release()
+		
+	def refoldNames(self):
+		"""
+		This function recomputes the folded names of every managed channel and
+		its users after the server's casemapping has changed.
+		
+		@return: Nothing.
+		"""
+		self._channel_lock.acquire()
+		
+		channels = {}
+		for i in self._channels.itervalues():
+			i.refoldName()
+			channels[i.getKey()] = i
+		self._channels = channels
+		
+		self._channel_lock.release()
 		
\ No newline at end of file
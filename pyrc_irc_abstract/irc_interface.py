@@ -56,6 +56,24 @@ _registered_commands_lock = threading.Lock() #: A lock used to prevent multiple
 
 _worker_threads = None #: A tuple of worker threads used to handle requests from the user and plugins.
 
+def getFoldFunction(irc_context):
+	"""
+	This function returns the function that folds nicknames and channel names
+	according to an IRC server's casemapping, so that PyRC's core can compare
+	names the way the server does without issuing a reqresp for every event.
+	
+	@type irc_context: int
+	@param irc_context: The session-unique ID of the connection.
+	
+	@rtype: function|None
+	@return: The server's fold function, which takes a name and returns a
+	    unicode key, or None if the connection is unknown.
+	"""
+	server = _irc_servers.getServer(irc_context)
+	if server:
+		return server.getISupport().getFoldFunction()
+	return None
+	
 def initialise(thread_count):
 	"""
 	This function must be called before the IAL is used; it creates the IAL's
@@ -127,7 +145,7 @@ def _eventGenerator():
 			
 		_irc_servers.getServer(dictionary['irccontext']).send("PRIVMSG %s :\001%s%s\001" % (dictionary['target'], dictionary['event'], dictionary['data']), GLOBAL.ENUM_SERVER_SEND_PRIORITY.AVERAGE)
 	events['CTCP Request'] = _IRC_CTCP_Request
-
+	
 	def _IRC_CTCP_Response(dictionary):
 		if dictionary['data']:
 			dictionary['data'] = " %s" % dictionary['data']
@@ -175,6 +193,10 @@ def _eventGenerator():
 		_irc_servers.getServer(dictionary['irccontext']).send(dictionary['data'], GLOBAL.ENUM_SERVER_SEND_PRIORITY.LOW)
 	events['Raw Command'] = _IRC_Raw_Command
 	
+	def _PyRC_Cancel_Timer(dictionary):
+		GLOBAL.plugin.cancelTimer(dictionary['module'], dictionary['name'])
+	events['Cancel Timer'] = _PyRC_Cancel_Timer
+	
 	def _PyRC_Plugin_Disable(dictionary):
 		GLOBAL.plugin.disablePlugin(dictionary['module'])
 	events['Plugin Disable'] = _PyRC_Plugin_Disable
@@ -260,12 +282,20 @@ def _eventGenerator():
 		_registered_commands_lock.release()
 	events['Register Autocompletion'] = _PyRC_Register_Autocompletion
 	
+	def _PyRC_Schedule_Timer(dictionary):
+		GLOBAL.plugin.scheduleTimer(dictionary['module'], dictionary['name'], dictionary['delay'], dictionary['interval'], dictionary['cron'])
+	events['Schedule Timer'] = _PyRC_Schedule_Timer
+	
 	def _PyRC_Set_Environment_Variable(dictionary):
 		GLOBAL.ENV_VARIABLES_LOCK.acquire()
 		GLOBAL.ENV_VARIABLES[dictionary['variable']] = dictionary['value']
 		GLOBAL.ENV_VARIABLES_LOCK.release()
 	events['Set Environment Variable'] = _PyRC_Set_Environment_Variable
 	
+	def _PyRC_Toggle_Membership_Delta_Handling(dictionary):
+		GLOBAL.plugin.toggleMembershipDeltaHandling(dictionary['enable'])
+	events['Toggle Membership Delta Handling'] = _PyRC_Toggle_Membership_Delta_Handling
+	
 	def _PyRC_Toggle_Raw_Command_Handling(dictionary):
 		GLOBAL.plugin.toggleRawCommandHandling(dictionary['enable'])
 	events['Toggle Raw Command Handling'] = _PyRC_Toggle_Raw_Command_Handling
@@ -293,6 +323,12 @@ def _eventGenerator():
 		worker_threads = dictionary['options'].get('workerthreads')
 		if not worker_threads:
 			worker_threads = GLOBAL.USR_SERVER_THREADS
+		flood_burst = dictionary['options'].get('floodburst')
+		if flood_burst is None:
+			flood_burst = GLOBAL.IRC_FLOOD_BURST
+		event_queue_size = dictionary['options'].get('eventqueuesize')
+		if event_queue_size is None:
+			event_queue_size = GLOBAL.IRC_EVENT_QUEUE_SIZE
 			
 		auto_connect = False
 		#proxy = None
@@ -318,6 +354,8 @@ def _eventGenerator():
 				
 			auto_connect = network['autoconnect']
 			worker_threads = network['workerthreads']
+			flood_burst = network['floodburst']
+			event_queue_size = network['eventqueuesize']
 			#proxy = network['proxy']
 			
 			if dictionary['tryall']: #Only add addresses if the user doesn't say no.
@@ -407,7 +445,7 @@ def _eventGenerator():
 			pyrc_control.config.profiles.unload()
 			
 		#Try connecting.
-		server = _irc_servers.addServer(network_name, worker_threads)
+		server = _irc_servers.addServer(network_name, worker_threads, flood_burst, event_queue_size)
 		try:
 			server.connect(nicknames, ident, real_name, addresses, dictionary['password'], channels)
 		except Exception, e:
@@ -490,6 +528,15 @@ def _reqrespGenerator():
 		}
 	reqresps['Get Channel Modes'] = _IRC_Get_Channel_Modes
 	
+	def _IRC_Get_Channel_Membership(dictionary):
+		(version, users) = _irc_servers.getServer(dictionary['irccontext']).getChannel(dictionary['channel']).getMembershipSnapshot()
+		
+		return {
+		 'version': version,
+		 'users': users
+		}
+	reqresps['Get Channel Membership'] = _IRC_Get_Channel_Membership
+	
 	def _IRC_Get_Channel_Users(dictionary):
 		return {
 		 'users': _irc_servers.getServer(dictionary['irccontext']).getChannel(dictionary['channel']).getUsersData()
@@ -502,6 +549,18 @@ def _reqrespGenerator():
 		}
 	reqresps['Get Current Nickname'] = _IRC_Get_Current_Nickname
 	
+	def _IRC_Get_Flood_Credit(dictionary):
+		server = _irc_servers.getServer(dictionary['irccontext'])
+		if not server:
+			return None
+			
+		return {
+		 'credit': server.getFloodCredit(),
+		 'burst': server.getFloodBurst(),
+		 'queued': server.getMessageCount()
+		}
+	reqresps['Get Flood Credit'] = _IRC_Get_Flood_Credit
+	
 	def _IRC_Get_Network_Names(dictionary):
 		networks = {0: 'Local'}
 		for i in _irc_servers.getServers():
@@ -576,6 +635,10 @@ def _reqrespGenerator():
 		return variables
 	reqresps['Get Environment Variables'] = _PyRC_Get_Environment_Variables
 	
+	def _PyRC_Get_Executor_Metrics(dictionary):
+		return pyrc_common.asynch.getExecutor().getMetrics()
+	reqresps['Get Executor Metrics'] = _PyRC_Get_Executor_Metrics
+	
 	def _PyRC_Get_Ping_Thresholds(dictionary):
 		return {
 		 'waittime': GLOBAL.IRC_IDLE_WAIT_TIME,
@@ -639,7 +702,7 @@ def processDictionary(dictionary):
 	@type dictionary: dict
 	@param dictionary: The PyRC-spec-compliant dictionary that is to be
 	    processed.
-	    
+	
 	@rtype: None|dict
 	@return: The result of processing the dictionary, which is None for all
 	    events and a dict for all reqresps unless the reqresp failed to resolve.
@@ -668,3 +731,4 @@ def processDictionary(dictionary):
 			#Some attribute in the dictionary wasn't as expected.
 			_event_queue.put(outboundDictionaries.PyRC_Processing_Error(GLOBAL.errlog.grabTrace()))
 			
+			
\ No newline at end of file
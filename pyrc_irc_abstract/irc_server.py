@@ -14,23 +14,28 @@ Legal
  
  (C) Neil Tallim, 2004-2007
 """
-import re
 import threading
 import time
 import random
 import Queue
 import socket
+import collections
 
 import irc_user
 import irc_channel
 
 import resources.connection
+import resources.io_engine
+import resources.isupport
 import resources.irc_events
+import resources.message
 import resources.numeric_events
 
 import pyrc_common.GLOBAL as GLOBAL
 import pyrc_common.G_OBJECTS as G_OBJECTS
 import pyrc_common.C_FUNCS as C_FUNCS
+import pyrc_common.asynch
+import pyrc_common.scheduler as scheduler
 
 import pyrc_common.dictionaries.information as informationDictionaries
 #The following dictionaries are used by this module:
@@ -46,9 +51,28 @@ import pyrc_common.dictionaries.outbound as outboundDictionaries
 ##Server Connection Error
 ##Server Connection Success
 ##Server Disconnection
+##Server Events Shed
 ##Server Protocol Error
 ##Server Reconnection Success
 
+_SEND_INTERVAL = 0.1 #: The minimum number of seconds between messages sent to an IRC server by an _IntervalFloodControl.
+
+_EVENT_POLICY_BLOCK = 0 #: Events that make the thread that raised them wait for space in a full _EventQueue, for up to _EVENT_BLOCK_TIMEOUT seconds, before being queued anyway.
+_EVENT_POLICY_DROP = 1 #: Events that are discarded, oldest first, to make room in a full _EventQueue.
+_EVENT_POLICY_COALESCE = 2 #: Events that are discarded when an _EventQueue is full if an event of the same type with the same message is already queued; otherwise, they are blocked.
+_EVENT_POLICY_KEEP = 3 #: Events that are always queued immediately, even if their _EventQueue is full.
+_EVENT_POLICIES = {
+ 'CTCP Request': _EVENT_POLICY_KEEP,
+ 'Private Message': _EVENT_POLICY_KEEP,
+ 'Private Message Local': _EVENT_POLICY_KEEP,
+ 'Raw Command': _EVENT_POLICY_DROP,
+ 'Raw Event': _EVENT_POLICY_DROP,
+ 'Server Events Shed': _EVENT_POLICY_KEEP,
+ 'User Quit': _EVENT_POLICY_COALESCE,
+} #: The policy applied to each type of event when an _EventQueue is full, keyed by eventname; unlisted types are blocked.
+_EVENT_BLOCK_TIMEOUT = 5.0 #: The number of seconds a thread will wait for space in a full _EventQueue before queueing its event anyway, so that a wedged plugin cannot stall PyRC forever.
+_EVENT_SHED_REPORT_INTERVAL = 5.0 #: The number of seconds an _EventQueue that remains more than half full may wait before reporting discarded events.
+
 class Server(object):
 	"""
 	This class serves as an interface to PyRC's communication with, and
@@ -62,6 +86,7 @@ class Server(object):
 	
 	_channel_manager = None #: The pyrc_irc_abstract.irc_channel.ChannelManager object used to manage all channels PyRC is in.
 	_user_manager = None #: The pyrc_irc_abstract.irc_user.UserManagerServer object used to manage all users PyRC knows about.
+	_isupport = None #: The resources.isupport.ISupport object that describes the ranks, channel modes, and limits of the IRC server.
 	
 	_connection = None #: The _Connection object used to actually communicate with the IRC server.
 	
@@ -76,15 +101,17 @@ class Server(object):
 	_network_name = None #: The name of the IRC network to which this Server is attached.
 	_network_group_name = None #: The user-specified name of this network's group; this will be used for consistency if available.
 	_connection_data = None #: The _ConnectionData object used to retain the information used to connect to the IRC network for future reconnect() calls.
-	_event_queue = None #: A queue of events that will be passed to PyRC's plugins via the worker threads.
+	_event_queues = None #: A tuple of _EventQueues, one per worker thread, holding events that will be passed to PyRC's plugins.
 	
 	_stash = None #: The _Stash object used to collect pieces of data used to build a complete dictionary.
 	
-	_worker_threads = None #: A tuple of worker threads used to send events from the IRC network to PyRC's plugins.
+	_worker_threads = None #: A tuple of worker threads used to send events from the IRC network to PyRC's plugins; each one drains the queue at the same index in _event_queues.
+	
+	_flood_burst = None #: The number of seconds of penalty the IRC server tolerates before it stops reading; 0 if messages should be sent at a fixed pace.
 	
 	_local_ip = None #The IP address of the system running PyRC, as seen by the IRC server.
 	
-	def __init__(self, id_number, network_group_name, thread_count):
+	def __init__(self, id_number, network_group_name, thread_count, flood_burst=GLOBAL.IRC_FLOOD_BURST, event_queue_size=GLOBAL.IRC_EVENT_QUEUE_SIZE):
 		"""
 		This function is invoked when a new Server object is created.
 		
@@ -96,28 +123,44 @@ class Server(object):
 		    fails. Do not set when the user specifies an unknown address.
 		@type thread_count: int
 		@param thread_count: The number of worker threads to spawn for use by
-		    this Server object.
+		    this Server object. Events about the same channel or user are
+		    always handled by the same thread, so they reach plugins in the
+		    order in which they were received; at least one thread is always
+		    spawned.
+		@type flood_burst: int
+		@param flood_burst: The number of seconds of penalty the IRC server
+		    tolerates before it stops reading, as described in RFC 1459; 0 to
+		    send messages at a fixed pace instead.
+		@type event_queue_size: int
+		@param event_queue_size: The number of events each worker thread may
+		    have waiting before the policies described by _EventQueue are
+		    applied; 0 if the queues should be unbounded.
 		
 		@return: Nothing.
 		"""
 		self._context_id = id_number
+		self._flood_burst = flood_burst
 		if network_group_name:
 			self._network_group_name = unicode(network_group_name)
 		self._channel_manager = irc_channel.ChannelManager(self)
 		self._user_manager = irc_user.UserManagerServer()
+		self.setISupport(resources.isupport.ISupport())
 		self._stash = _Stash(self)
 		self._nickname_lock = threading.Lock()
 		self._user_modes = []
 		self._mode_lock = threading.Lock()
-		self._event_queue = Queue.Queue(0)
 		
 		self.resetIdleTime()
 		
+		event_queues = []
 		worker_threads = []
-		for i in range(thread_count):
-			worker_thread = G_OBJECTS.WorkerThread(self._event_queue, "Context ID: %i" % id_number)
+		for i in range(max(1, thread_count)):
+			event_queue = _EventQueue(self, event_queue_size)
+			worker_thread = G_OBJECTS.WorkerThread(event_queue, "Context ID: %i, shard %i" % (id_number, i))
+			event_queues.append(event_queue)
 			worker_threads.append(worker_thread)
 			worker_thread.start()
+		self._event_queues = tuple(event_queues)
 		self._worker_threads = tuple(worker_threads)
 		
 	def connect(self, nicknames, ident, real_name, addresses, password, channels):
@@ -270,10 +313,10 @@ class Server(object):
 		"""
 		This function processes the raw input provided by the IRC server.
 		
-		It works by splitting the input into lines based on linebreak
-		characters. If the last line is missing such a character, it is
-		considered a fragment and stored in the Server's _Stash to be used when
-		processing the next packet.
+		It works by appending the input to the _LineFramer kept in the Server's
+		_Stash, which hands back every line that is now complete. Anything
+		after the last linebreak is kept there to be used when processing the
+		next packet.
 		
 		Each line is individually fed to _processInput, which handles
 		evaluation.
@@ -286,20 +329,13 @@ class Server(object):
 		    problem. (The returned value is meaningless; an event dictionary
 		    will be generated to describe the problem)
 		"""
-		fragment = self._stash.getFragment()
-		if fragment:
-			raw_string = fragment + raw_string
-			
-		lines = re.split(r"\r|\n", raw_string)
-		if not re.match(r"\r|\n", raw_string[-1]):
-			self._stash.setFragment(lines.pop())
-			
-		for i in lines:
-			if i:
-				result = self._processInput(i)
-				if result:
-					return result
-					
+		line_framer = self._stash.getLineFramer()
+		line_framer.feed(raw_string)
+		for i in line_framer.getLines():
+			result = self._processInput(i)
+			if result:
+				return result
+				
 	def _processInput(self, raw_string):
 		"""
 		This function accepts raw lines from the IRC server and delegates its
@@ -322,27 +358,31 @@ class Server(object):
 		if GLOBAL.plugin.handlesRawEvent():
 			self.addEvent(outboundDictionaries.IRC_Raw_Event(self.getContextID(), self.getName(), raw_string))
 			
-		if not raw_string.startswith(':'):
+		try: #Decode and tokenise the line exactly once; handlers work from the result.
+			message = resources.message.parseMessage(unicode(raw_string, 'utf-8', 'replace'))
+		except resources.message.ProtocolError, e:
+			self.addEvent(outboundDictionaries.Server_Protocol_Error(self.getContextID(), self.getName(), e.description))
+			return
+			
+		if not message.prefix:
 			try:
-				return resources.irc_events.handleNonColon(self, raw_string) 
+				return resources.irc_events.handleNonColon(self, message)
 			except resources.irc_events.ProtocolError, e:
 				self.addEvent(outboundDictionaries.Server_Protocol_Error(self.getContextID(), self.getName(), e.description))
+		elif not message.code is None: #Server code.
+			try:
+				return resources.numeric_events.handleIRCEvent(self, message)
+			except resources.numeric_events.ProtocolError, e:
+				self.addEvent(outboundDictionaries.Server_Protocol_Error(self.getContextID(), self.getName(), e.description))
 		else: #Determine what sort of event this is.
-			data = raw_string[1:].split(None, 2)
-			if data[1].isdigit(): #Server code.
-				try:
-					return resources.numeric_events.handleIRCEvent(self, data[0], data[1:], raw_string)
-				except resources.numeric_events.ProtocolError, e:
-					self.addEvent(outboundDictionaries.Server_Protocol_Error(self.getContextID(), self.getName(), e.description))
-			else:
-				try:
-					if data[0].find("!") == -1:
-						return resources.irc_events.handleServerCode(self, data[0], data[1:], raw_string)
-					else:
-						return resources.irc_events.handleResponseCode(self, data[0], data[1:], raw_string)
-				except resources.irc_events.ProtocolError, e:
-					self.addEvent(outboundDictionaries.Server_Protocol_Error(self.getContextID(), self.getName(), e.description))
-					
+			try:
+				if message.prefix.find("!") == -1:
+					return resources.irc_events.handleServerCode(self, message)
+				else:
+					return resources.irc_events.handleResponseCode(self, message)
+			except resources.irc_events.ProtocolError, e:
+				self.addEvent(outboundDictionaries.Server_Protocol_Error(self.getContextID(), self.getName(), e.description))
+				
 	def send(self, message, priority=GLOBAL.ENUM_SERVER_SEND_PRIORITY.AVERAGE):
 		"""
 		This function queues a string for transmission to the IRC server.
@@ -405,16 +445,70 @@ class Server(object):
 		"""
 		self._channel_manager.addChannel(channel_name)
 		
-	def addEvent(self, event):
+	def addEvent(self, event, block=True):
 		"""
 		This function adds an event to the server's broadcast queue.
 		
+		Events are sharded by the channel they describe or, failing that, by the
+		user who caused them, and each shard is drained by a single worker
+		thread. This preserves the order of every conversation while letting
+		unrelated channels be processed in parallel.
+		
+		If the shard's queue is full, the event is subject to the policies
+		described by _EventQueue. The Server's own worker threads are never
+		made to wait, since they are the ones that must make space, and neither
+		are the shared resources.io_engine.IOEngine and
+		pyrc_common.scheduler.Scheduler, since every other connection and timer
+		they service would be stalled along with this one.
+		
 		@type event: dict
 		@param event: The event to broadcast to PyRC's plugins.
+		@type block: bool
+		@param block: False if the caller must not wait for space, as is the case
+		    whenever a lock that a worker thread may need is held.
 		
 		@return: Nothing.
 		"""
-		self._event_queue.put(event)
+		current_thread = threading.currentThread()
+		if current_thread in self._worker_threads or isinstance(current_thread, (resources.io_engine.IOEngine, scheduler.Scheduler)):
+			block = False
+		self._event_queues[self._getEventShard(event)].put(event, block)
+		
+	def _getEventShard(self, event):
+		"""
+		This function determines which worker thread is responsible for
+		broadcasting an event.
+		
+		Events that are not tied to a channel or a user, such as MOTD and
+		welcome messages, are always assigned to the first shard, so they
+		retain their relative order.
+		
+		Events that span several channels, like quits and nickname changes, are
+		sharded by user, so they are ordered with respect to that user's private
+		conversation, but not with respect to channel messages.
+		
+		Keys are folded by the IRC server's casemapping, so every spelling of
+		a name the server considers equal reaches the same shard.
+		
+		@type event: dict
+		@param event: The event to be broadcast.
+		
+		@rtype: int
+		@return: The index of the queue in _event_queues that should receive
+		    the event.
+		"""
+		shard_count = len(self._event_queues)
+		if shard_count == 1:
+			return 0
+			
+		key = event.get('channel')
+		if not key:
+			user_data = event.get('userdata')
+			if user_data:
+				key = user_data['username']
+		if not key:
+			return 0
+		return hash(self._isupport.fold(key)) % shard_count
 		
 	def addUser(self, user):
 		"""
@@ -425,7 +519,7 @@ class Server(object):
 		
 		@type user: irc_user.User
 		@param user: The User object to be added to the pool.
-				
+		
 		@return: Nothing.
 		"""
 		self._user_manager.addUser(user)
@@ -497,6 +591,30 @@ class Server(object):
 			
 		return informationDictionaries.ServerData(self._context_id, self._network_group_name, self._network_name, address, port, self.getNickname(), ident, realname, self.getUserModes(), self.getUserModeString(), self._channel_manager.getChannelsData(), self.getIdleTime(), self._local_ip)
 		
+	def getFloodBurst(self):
+		"""
+		This function returns the number of seconds of penalty the IRC server
+		tolerates before it stops reading.
+		
+		@rtype: int
+		@return: The flood burst window, or 0 if messages are sent at a fixed
+		    pace.
+		"""
+		return self._flood_burst
+		
+	def getFloodCredit(self):
+		"""
+		This function returns the number of seconds of penalty PyRC may still
+		accumulate before queued messages are held back.
+		
+		@rtype: float|None
+		@return: The remaining flood credit, or None if there is no connection or
+		    messages are sent at a fixed pace.
+		"""
+		if self._connection:
+			return self._connection.getFloodCredit()
+		return None
+		
 	def getIdent(self):
 		"""
 		This function returns the ident this Server object is set to
@@ -504,11 +622,11 @@ class Server(object):
 		
 		@rtype: unicode|None
 		@return: The ident this Server object provides to IRC servers.
-		    
+		
 		    This value will not change while a connection is active, and it
 		    will still be available through this function after a connection
 		    ends.
-		    
+		
 		    It changes only when a connection is attempted; it will be None if
 		    this Server object is new.
 		"""
@@ -516,6 +634,18 @@ class Server(object):
 			return self._connection_data.getProfile()[0]
 		return None
 		
+	def getMessageCount(self):
+		"""
+		This function returns the number of messages waiting to be sent to the
+		IRC server.
+		
+		@rtype: int
+		@return: The number of unsent messages.
+		"""
+		if self._connection:
+			return self._connection.getMessageCount()
+		return 0
+		
 	def getIdleTime(self):
 		"""
 		This function returns the number of seconds that have elapsed since the
@@ -527,6 +657,19 @@ class Server(object):
 		"""
 		return time.time() - self._last_action
 		
+	def getISupport(self):
+		"""
+		This function returns the tables that describe the ranks, channel modes,
+		and limits of the IRC server, as advertised by its RPL_ISUPPORT replies.
+		
+		The returned object is never modified, so it may be used freely from any
+		thread; it is replaced whenever the IRC server advertises new values.
+		
+		@rtype: resources.isupport.ISupport
+		@return: The IRC server's ISUPPORT tables.
+		"""
+		return self._isupport
+		
 	def getLocalIP(self):
 		"""
 		This function returns the local IP of PyRC, as set by the user, seen by
@@ -583,11 +726,11 @@ class Server(object):
 		
 		@rtype: unicode|None
 		@return: The real name this Server object provides to IRC servers.
-		    
+		
 		    This value will not change while a connection is active, and it
 		    will still be available through this function after a connection
 		    ends.
-		    
+		
 		    It changes only when a connection is attempted; it will be None if
 		    this Server object is new.
 		"""
@@ -756,6 +899,29 @@ class Server(object):
 		"""
 		self._local_ip = unicode(ip)
 		
+	def setISupport(self, isupport):
+		"""
+		This function replaces the tables that describe the ranks, channel modes,
+		and limits of the IRC server.
+		
+		If the IRC server's casemapping has changed, every channel and user is
+		refiled under its new folded name.
+		
+		This function should only be called by the thread that processes the
+		IRC server's events, since it does not guard against concurrent updates.
+		
+		@type isupport: resources.isupport.ISupport
+		@param isupport: The new tables.
+		
+		@return: Nothing.
+		"""
+		previous_isupport = self._isupport
+		self._isupport = isupport
+		self._user_manager.getMembershipTable().setISupport(isupport)
+		if previous_isupport and not previous_isupport.getCaseMapping() == isupport.getCaseMapping():
+			self._channel_manager.refoldNames()
+			self._user_manager.refoldNicknames()
+			
 	def setName(self, network_name):
 		"""
 		This function sets the name of the IRC network to which this Server is
@@ -796,7 +962,7 @@ class Server(object):
 		@type modes: list
 		@param modes: A list of changed modes with which to update PyRC's
 		    internal mode list.
-		    
+		
 		    These modes may be single-character mode strings or tuples
 		    comprised of a single-character mode string and a variable-length
 		    single-token parameter.
@@ -978,7 +1144,7 @@ class _Stash(object):
 	_whois_replies = None #: A dictionary used to track WHOIS requests sent by PyRC. Data is received in bits and pieces, so it needs to be aggregated before a dictionary can be emitted.
 	_whowas_replies = None #: A dictionary used to track WHOWAS requests sent by PyRC. Data is received in bits and pieces, so it needs to be aggregated before a dictionary can be emitted.
 	_who_replies = None #: A dictionary used to track WHO requests sent by PyRC. Data is received in bits and pieces, so it needs to be aggregated before a dictionary can be emitted.
-	_fragment = None #: A string fragment of a line received from the IRC server. This is used if the data the server tried to send exceeds the allowed packet size.
+	_line_framer = None #: A _LineFramer holding any partial line received from the IRC server. This is used if the data the server tried to send exceeds the allowed packet size.
 	
 	def __init__(self, server):
 		"""
@@ -990,6 +1156,7 @@ class _Stash(object):
 		@return: Nothing.
 		"""
 		self._server = server
+		self._line_framer = _LineFramer()
 		
 		self.flush()
 		
@@ -1007,7 +1174,7 @@ class _Stash(object):
 		self._whois_replies = {}
 		self._whowas_replies = {}
 		self._who_replies = {}
-		self._fragment = None
+		self._line_framer.clear()
 		
 	def completeMOTD(self):
 		"""
@@ -1420,30 +1587,82 @@ class _Stash(object):
 		"""
 		return self._whowas_replies.get(unicode(username).lower())
 		
-	def getFragment(self):
+	def getLineFramer(self):
 		"""
-		This function retrieves any partial line that may have been cut if the
-		IRC server tried to send more information than it could fit in a
-		packet.
+		This function retrieves the _LineFramer used to reassemble lines that
+		were cut because the IRC server tried to send more information than it
+		could fit in a packet.
 		
-		@rtype: basestring|None
-		@return: A line fragment or None if the last packet ended cleanly.
+		@rtype: _LineFramer
+		@return: The _LineFramer associated with this connection.
+		"""
+		return self._line_framer
+		
+class _LineFramer(object):
+	"""
+	This class reassembles lines from the packets received from an IRC server.
+	
+	Packets are appended to a single bytearray. Each search for the last line
+	terminator covers only data that has not been searched before, so a
+	partial line is never copied or re-examined when the next packet arrives.
+	Once a packet completes one or more lines, the completed region is copied
+	out exactly once and split in a single pass.
+	"""
+	_buffer = None #: A bytearray containing all received data that has not yet been handed out as lines.
+	_scan_offset = 0 #: The offset in _buffer at which the next search for a line terminator should begin.
+	
+	def __init__(self):
+		"""
+		This function is invoked when a new _LineFramer object is created.
+		
+		@return: Nothing.
+		"""
+		self._buffer = bytearray()
+		
+	def clear(self):
 		"""
-		fragment = self._fragment
-		self._fragment = None
-		return fragment
+		This function discards any partial line being held.
 		
-	def setFragment(self, fragment):
+		@return: Nothing.
+		"""
+		del self._buffer[:]
+		self._scan_offset = 0
+		
+	def feed(self, data):
 		"""
-		This function is used to save a partial line that was cut because the
-		IRC server tried to send more data than could be accepted in a packet.
+		This function appends a packet received from the IRC server.
 		
-		@type fragment: basestring
-		@param fragment: The partial line to be stored.
+		@type data: str
+		@param data: The raw bytes received from the IRC server.
 		
 		@return: Nothing.
 		"""
-		self._fragment = fragment
+		self._buffer.extend(data)
+		
+	def getLines(self):
+		"""
+		This function hands out every complete line received so far, in order.
+		
+		Lines are delimited by LF, CR, or CRLF; empty lines are skipped.
+		Anything after the last LF or CR is retained for the next call. If a
+		CRLF is split between packets, the LF that arrives later simply
+		terminates an empty line.
+		
+		@rtype: list
+		@return: A list of complete lines, as strs.
+		"""
+		buffer = self._buffer
+		end = max(buffer.rfind('\n', self._scan_offset), buffer.rfind('\r', self._scan_offset))
+		if end == -1:
+			self._scan_offset = len(buffer)
+			return []
+			
+		view = memoryview(buffer)
+		complete = view[:end].tobytes()
+		del view #The buffer can't be resized while a view of it exists.
+		del buffer[:end + 1]
+		self._scan_offset = len(buffer)
+		return filter(None, complete.splitlines())
 		
 class _Connection(object):
 	"""
@@ -1456,6 +1675,8 @@ class _Connection(object):
 	_socket_sender = None #: A _SocketSender used to feed new messages to the IRC server.
 	_ping_core = None #: A _PingCore used to manage all PING-related services on this connection.
 	_priority_queue = None #: A _PriorityQueue object used to manage outbound data.
+	_flood_control = None #: A _FloodControl object used to pace outbound data.
+	_io_engine = None #: The resources.io_engine.IOEngine that reads from this connection, or None if it is read by its own _SocketReader.
 	
 	def __init__(self, server, host, port, nickname, realname, ident, password, ssl):
 		"""
@@ -1463,6 +1684,14 @@ class _Connection(object):
 		
 		It connects to the specified IRC server and authenticates the connection.
 		
+		If GLOBAL.IRC_SHARED_IO is set, the connection is read by the shared
+		resources.io_engine.IOEngine instead of spawning its own reader thread.
+		It always sends from a _SocketSender of its own, though, since a peer
+		that stops accepting data would otherwise stall every connection the
+		engine serves, and SSL connections never use the engine, since an
+		incomplete TLS record blocks their reads. Either way, PING timeouts are
+		managed by the shared pyrc_common.scheduler.Scheduler.
+		
 		@type server: Server
 		@param server: A reference to the Server that owns this object.
 		@type host: basestring
@@ -1489,7 +1718,11 @@ class _Connection(object):
 		    established at the specified host/port.
 		"""
 		self._server = server
-		
+		if server.getFloodBurst() > 0:
+			self._flood_control = _PenaltyFloodControl(server.getFloodBurst())
+		else:
+			self._flood_control = _IntervalFloodControl()
+			
 		if ssl:
 			self._socket = resources.connection.SSLSocket()
 		else:
@@ -1502,15 +1735,19 @@ class _Connection(object):
 		self.send("NICK %s" % nickname)
 		self.send("USER %s %s %s :%s" % (ident, socket.gethostname(), host, realname))
 		
-		self._socket_reader = _SocketReader(self)
-		self._socket_sender = _SocketSender(self)
 		self._ping_core = _PingCore(self)
 		self._priority_queue = _PriorityQueue()
-		
-		self._socket_reader.start()
-		self._socket_sender.start()
 		self._ping_core.start()
 		
+		self._socket_sender = _SocketSender(self)
+		self._socket_sender.start()
+		if GLOBAL.IRC_SHARED_IO and not ssl:
+			self._io_engine = resources.io_engine.getEngine()
+			self._io_engine.register(self)
+		else:
+			self._socket_reader = _SocketReader(self)
+			self._socket_reader.start()
+			
 	def addMessage(self, message, priority=GLOBAL.ENUM_SERVER_SEND_PRIORITY.AVERAGE):
 		"""
 		This function queues a message to be sent to the IRC server.
@@ -1521,16 +1758,22 @@ class _Connection(object):
 		@param priority: An enumeration value used to determine the priority at
 		    which this message should be pulled out of the queue.
 		
+		Messages sent at NOW priority are written immediately, unless the
+		calling thread is the shared IOEngine, which must never wait for a
+		socket; they are then queued at CRITICAL priority.
+		
 		@return: Nothing.
 		"""
 		if priority == GLOBAL.ENUM_SERVER_SEND_PRIORITY.NOW:
-			try:
-				self.send(message)
-			except resources.connection.InvalidStateError: #The socket must have been closed prior to this instruction.
-				pass
-		else:
-			self._priority_queue.addMessage(message, priority)
-			
+			if not isinstance(threading.currentThread(), resources.io_engine.IOEngine):
+				try:
+					self.send(message)
+				except resources.connection.InvalidStateError: #The socket must have been closed prior to this instruction.
+					pass
+				return
+			priority = GLOBAL.ENUM_SERVER_SEND_PRIORITY.CRITICAL
+		self._priority_queue.addMessage(message, priority)
+				
 	def close(self):
 		"""
 		This function terminates all connections and threads in use by this
@@ -1539,11 +1782,36 @@ class _Connection(object):
 		@return: Nothing.
 		"""
 		self._ping_core.kill()
-		self._socket_reader.kill()
+		if self._io_engine:
+			self._io_engine.unregister(self)
+		else:
+			self._socket_reader.kill()
 		self._socket_sender.kill()
-		
+		self._priority_queue.interrupt()
+			
 		self._socket.close()
 		
+	def fileno(self):
+		"""
+		This function returns the file descriptor of this connection's socket,
+		so that the IOEngine can watch it.
+		
+		@rtype: int
+		@return: The socket's file descriptor.
+		"""
+		return self._socket.fileno()
+		
+	def getFloodCredit(self):
+		"""
+		This function returns the number of seconds of penalty this connection
+		may still accumulate before queued messages are held back.
+		
+		@rtype: float|None
+		@return: The remaining flood credit, or None if the connection's
+		    _FloodControl doesn't model the IRC server's penalty clock.
+		"""
+		return self._flood_control.getCredit(time.time())
+		
 	def getLatency(self):
 		"""
 		This function returns the number of seconds that have elapsed since the
@@ -1554,7 +1822,7 @@ class _Connection(object):
 		    the server.
 		"""
 		return self._ping_core.getServerPingTime()
-			
+		
 	def getMessage(self):
 		"""
 		This function returns the next message to be sent to the IRC server.
@@ -1565,6 +1833,36 @@ class _Connection(object):
 		"""
 		return self._priority_queue.getMessage()
 		
+	def peekMessage(self, timeout=0):
+		"""
+		This function returns the next message to be sent to the IRC server
+		without removing it from the queue, waiting for one to be queued if
+		necessary.
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait for a message, or None to
+		    wait indefinitely.
+		
+		@rtype: unicode|None
+		@return: The next message to be sent, if any, or None if no message was
+		    queued before the timeout expired.
+		"""
+		return self._priority_queue.peekMessage(timeout)
+		
+	def getSendDelay(self, message):
+		"""
+		This function returns the number of seconds that must pass before the
+		given message can be sent without risking an "Excess Flood" disconnect.
+		
+		@type message: basestring
+		@param message: The message to be sent.
+		
+		@rtype: float
+		@return: The number of seconds to wait; 0 if the message may be sent
+		    immediately.
+		"""
+		return self._flood_control.getDelay(message, time.time())
+		
 	def getMessageCount(self):
 		"""
 		This function will return the number of unsent messages.
@@ -1585,6 +1883,80 @@ class _Connection(object):
 		"""
 		return self._server
 		
+	def handleError(self):
+		"""
+		This function is called by the IOEngine when handleRead() or
+		handleTimers() raises an exception. It reports the exception as a
+		"Server Protocol Error", since it almost always means that a line from
+		the IRC server could not be processed.
+		
+		It must be called while the exception is being handled.
+		
+		@return: Nothing.
+		"""
+		trace = GLOBAL.errlog.grabTrace()
+		reason = u"unknown error"
+		if trace:
+			reason = unicode(trace[-1], 'utf-8', 'replace')
+		self._server.addEvent(outboundDictionaries.Server_Protocol_Error(self._server.getContextID(), self._server.getName(), u"Unhandled error while processing server data: %s" % reason))
+		
+	def handleRead(self):
+		"""
+		This function is called by the IOEngine when data is waiting on this
+		connection's socket. It performs one iteration of a _SocketReader's
+		work.
+		
+		@return: Nothing.
+		"""
+		try:
+			data = self._socket.readPendingData(GLOBAL.IRC_PACKET_SIZE)
+		except resources.connection.InvalidStateError: #The socket must have been closed prior to this instruction.
+			return
+		except resources.connection.IncomingTransmissionError:
+			self._server.addEvent(outboundDictionaries.Server_Disconnection(self._server.getContextID(), self._server.getName(), "Connection reset by peer.", False))
+			self._server.disconnect()
+			return
+			
+		if data:
+			self.processData(data)
+		else: #An empty read means that the socket was closed.
+			self._server.addEvent(outboundDictionaries.Server_Disconnection(self._server.getContextID(), self._server.getName(), "Remote host closed socket.", False))
+			self._server.disconnect()
+			
+	def handleTimers(self, current_time):
+		"""
+		This function is called by the IOEngine on every pass through its loop.
+		
+		Queued messages are sent by this connection's _SocketSender, since a
+		blocking write here would stall every connection the engine serves, so
+		there is never anything for the engine to do.
+		
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: None
+		@return: None, since nothing needs to be scheduled.
+		"""
+		return None
+		
+	def processData(self, data):
+		"""
+		This function passes data read from the IRC server to the Server for
+		processing, disconnecting if the Server requests it.
+		
+		@type data: basestring
+		@param data: The data received from the IRC server.
+		
+		@return: Nothing.
+		"""
+		data = self._server.processInput(data)
+		if data: #The server told us to disconnect.
+			if data[0]:
+				self._server.addEvent(outboundDictionaries.Server_Disconnection(self._server.getContextID(), self._server.getName(), data[0], not data[1]))
+			self._server.disconnect()
+		else:
+			self.resetTimeout()
+			
 	def read(self):
 		"""
 		This function reads data from the IRC server.
@@ -1615,6 +1987,7 @@ class _Connection(object):
 		if GLOBAL.plugin.handlesRawCommand():
 			self._server.addEvent(outboundDictionaries.IRC_Raw_Command(self._server.getContextID(), self._server.getName(), message))
 		self._socket.sendData(message.encode("utf-8") + GLOBAL.IRC_LINE_TERMINATOR)
+		self._flood_control.recordSend(message, time.time())
 		
 	def ping(self, target=None):
 		"""
@@ -1656,18 +2029,24 @@ class _Connection(object):
 		self._ping_core.resetCountdown()
 		
 		
-class _PingCore(threading.Thread):
+class _PingCore(object):
 	"""
 	This class defines an object that manages all PING-related activity on a
 	server, including user PING timeouts, and server PING-accessibility.
+	
+	It has no thread of its own: each timeout is a
+	pyrc_common.scheduler.Timer, so nothing is checked until something could
+	actually have timed out.
 	"""
-	_alive = True #: True until the thread is no longer useful.
+	_alive = True #: True until the object is no longer useful.
 	_connection = None #: A reference to the _Connection that owns this object.
 	_server = None #: A reference to the _Server that owns this object.
+	_scheduler = None #: The pyrc_common.scheduler.Scheduler that runs this object's timers.
 	_user_lock = None #: A lock used to prevent multiple simultaneous accesses to the user list.
 	_time_of_server_ping = None #: The time at which the last PING was sent to the server.
 	_server_timeout = None #: The timestamp against which timeout events will be processed.
 	_server_pinged = False #: Set to True when the server is PINGed to test for activity.
+	_server_timer = None #: The pyrc_common.scheduler.Timer that will next check the server's responsiveness.
 	_time_lock = None #: A lock used to prevent multiple simultaneous accesses to the timeout counters.
 	_users = None
 	"""
@@ -1676,7 +2055,7 @@ class _PingCore(threading.Thread):
 	
 	Elements in this dictionary take the following form::
 	 {
-	  <username:unicode>: <time_of_ping:float>
+	  <username:unicode>: (<time_of_ping:float>, <timeout:pyrc_common.scheduler.Timer>)
 	 }
 	"""
 	
@@ -1689,71 +2068,51 @@ class _PingCore(threading.Thread):
 		
 		@return: Nothing.
 		"""
-		threading.Thread.__init__(self)
 		self._connection = connection
 		self._server = connection.getServer()
+		self._scheduler = scheduler.getScheduler()
 		self._user_lock = threading.Lock()
 		self._time_lock = threading.RLock()
 		self._users = {}
 		self._time_of_server_ping = time.time()
 		self._server_timeout = time.time()
-		self.setDaemon(True)
-		self.setName("Ping Core, server %i" % self._server.getContextID())
 		
 	def kill(self):
 		"""
-		This function terminates the _PingCore's execution after its current
-		iteration.
+		This function cancels all of the _PingCore's pending timeouts.
 		
 		It should be called when its parent is destroyed.
 		
 		@return: Nothing.
 		"""
+		self._time_lock.acquire()
+		
 		self._alive = False
+		if self._server_timer:
+			self._server_timer.cancel()
+			
+		self._time_lock.release()
+		self._user_lock.acquire()
 		
-	def run(self):
-		"""
-		This function is executed over the course of the _PingCore's lifetime.
+		for (ping_time, timer) in self._users.itervalues():
+			timer.cancel()
+		self._users = {}
 		
-		It decrements the time remaining before a PING timeout for each tracked
-		user, and the time remaining before an automatic PING is sent to the
-		server to ensure that the connection is still active.
+		self._user_lock.release()
 		
-		Alternatively, if such a PING has been sent to the server, it counts down
-		the time before declaring the server unresponsive and raising a
-		Ping Timeout event.
+	def start(self):
+		"""
+		This function begins monitoring the server's responsiveness, scheduling
+		the first check for when the server could first be considered idle.
 		
 		@return: Nothing.
 		"""
-		while self._alive:
-			start_time = time.time()
-			self._user_lock.acquire()
-			
-			timeouts = []
-			for i, user_time in self._users.iteritems():
-				if start_time - user_time >= GLOBAL.IRC_IDLE_WAIT_TIME:
-					timeouts.append(i)
-					
-			for i in timeouts:
-				self._server.addEvent(outboundDictionaries.IRC_Ping_Timeout(self._server.getContextID(), i, self._server.getName()))
-				del self._users[i]
-				
-			self._user_lock.release()
-			self._time_lock.acquire()
-			
-			working_time = start_time - self._server_timeout
-			if working_time >= GLOBAL.IRC_IDLE_WAIT_TIME:
-				if not self._server_pinged:
-					self._server.addEvent(outboundDictionaries.IRC_Ping_Timeout_Check(self._server.getContextID(), self._server.getName()))
-					self.sendPing()
-				elif working_time >= GLOBAL.IRC_IDLE_WAIT_TIME + GLOBAL.IRC_PING_TIMEOUT:
-					self._server.addEvent(outboundDictionaries.IRC_Ping_Timeout(self._server.getContextID(), self._server.getName(), None))
-					self._server.addEvent(outboundDictionaries.Server_Disconnection(self._server.getContextID(), self._server.getName(), "Ping timeout.", False))
-					self._server.disconnect()
-					
-			self._time_lock.release()
-			time.sleep(1)
-			
+		self._time_lock.acquire()
+		
+		self._scheduleServerCheck(self._server_timeout + GLOBAL.IRC_IDLE_WAIT_TIME)
+		
+		self._time_lock.release()
+		
 	def getServerPingTime(self):
 		"""
 		This function returns the number of seconds that have elapsed since the
@@ -1786,13 +2145,14 @@ class _PingCore(threading.Thread):
 		    hasn't been PINGed.
 		"""
 		#Sanitize input.
-		username = unicode(username).lower()
+		username = self._server.getISupport().fold(username)
 		self._user_lock.acquire()
 		
-		ping_time = self._users.get(username)
-		if ping_time:
-			ping_time = time.time() - ping_time
-			del self._users[username]
+		ping_time = None
+		ping = self._users.pop(username, None)
+		if ping:
+			ping_time = time.time() - ping[0]
+			ping[1].cancel()
 			
 		self._user_lock.release()
 		return ping_time
@@ -1802,6 +2162,9 @@ class _PingCore(threading.Thread):
 		This function prevents a fatal PING timeout event from being raised. It
 		should be called every time data is received from the server.
 		
+		The pending check is left alone, since it will reschedule itself when
+		it finds that the server has been active.
+		
 		@return: Nothing.
 		"""
 		self._time_lock.acquire()
@@ -1830,9 +2193,13 @@ class _PingCore(threading.Thread):
 		if username:
 			#Sanitize input.
 			username = unicode(username)
+			key = self._server.getISupport().fold(username)
 			self._user_lock.acquire()
 			
-			self._users[username.lower()] = ping_time
+			ping = self._users.get(key)
+			if ping:
+				ping[1].cancel()
+			self._users[key] = (ping_time, self._scheduler.scheduleAt(ping_time + GLOBAL.IRC_IDLE_WAIT_TIME, self._expireUser, (key, ping_time)))
 			
 			self._user_lock.release()
 			ping_string = "PRIVMSG %s :\001PING %s\001" % (username, current_time)
@@ -1853,12 +2220,363 @@ class _PingCore(threading.Thread):
 		except resources.connection.InvalidStateError: #The socket must have been closed prior to this instruction.
 			pass
 			
+	def _checkServer(self):
+		"""
+		This function is called by the scheduler when the server may have been
+		idle long enough to need a PING, or may have left a PING unanswered for
+		long enough to be declared unresponsive.
+		
+		Since activity only ever moves the server's countdown forward, a check
+		that finds the server has been active since it was scheduled simply
+		reschedules itself for the new deadline.
+		
+		Since the scheduler's thread is shared by every connection, only the
+		countdown is examined while the time lock is held. The PING is queued
+		for the connection's sender, rather than written here, and a
+		disconnection is left to the shared pyrc_common.asynch.Executor.
+		
+		@return: Nothing.
+		"""
+		ping_time = None
+		timed_out = False
+		self._time_lock.acquire()
+		
+		if self._alive:
+			working_time = time.time() - self._server_timeout
+			if not self._server_pinged:
+				if working_time >= GLOBAL.IRC_IDLE_WAIT_TIME:
+					ping_time = time.time()
+					self._server_pinged = True
+					self._time_of_server_ping = ping_time
+					self._scheduleServerCheck(self._server_timeout + GLOBAL.IRC_IDLE_WAIT_TIME + GLOBAL.IRC_PING_TIMEOUT)
+				else:
+					self._scheduleServerCheck(self._server_timeout + GLOBAL.IRC_IDLE_WAIT_TIME)
+			elif working_time >= GLOBAL.IRC_IDLE_WAIT_TIME + GLOBAL.IRC_PING_TIMEOUT:
+				timed_out = True
+			else:
+				self._scheduleServerCheck(self._server_timeout + GLOBAL.IRC_IDLE_WAIT_TIME + GLOBAL.IRC_PING_TIMEOUT)
+				
+		self._time_lock.release()
+		
+		if not ping_time is None:
+			self._server.addEvent(outboundDictionaries.IRC_Ping_Timeout_Check(self._server.getContextID(), self._server.getName()))
+			self._connection.addMessage("PING :%i" % ping_time, GLOBAL.ENUM_SERVER_SEND_PRIORITY.CRITICAL)
+		elif timed_out:
+			self._server.addEvent(outboundDictionaries.IRC_Ping_Timeout(self._server.getContextID(), self._server.getName(), None))
+			self._server.addEvent(outboundDictionaries.Server_Disconnection(self._server.getContextID(), self._server.getName(), "Ping timeout.", False))
+			pyrc_common.asynch.getExecutor().submit(self._server.disconnect, required=True)
+		
+	def _expireUser(self, username, ping_time):
+		"""
+		This function is called by the scheduler when a user has failed to
+		reply to a PING in time, raising a PING timeout event.
+		
+		@type username: unicode
+		@param username: The folded name of the user who was PINGed.
+		@type ping_time: float
+		@param ping_time: The time at which the PING was sent, used to ignore
+		    timeouts for PINGs that have since been superseded.
+		
+		@return: Nothing.
+		"""
+		self._user_lock.acquire()
+		
+		ping = self._users.get(username)
+		expired = ping and ping[0] == ping_time
+		if expired:
+			del self._users[username]
+			
+		self._user_lock.release()
+		if expired:
+			self._server.addEvent(outboundDictionaries.IRC_Ping_Timeout(self._server.getContextID(), self._server.getName(), username))
+			
+	def _scheduleServerCheck(self, due_time):
+		"""
+		This function schedules the next check of the server's responsiveness.
+		
+		It must be called while the time lock is held.
+		
+		@type due_time: float
+		@param due_time: The UNIX timestamp at which the check should run.
+		
+		@return: Nothing.
+		"""
+		if self._alive:
+			self._server_timer = self._scheduler.scheduleAt(due_time, self._checkServer)
+			
+			
+class _FloodControl(object):
+	"""
+	This abstract class defines the policy used to pace messages sent to an IRC
+	server, since they need to be throttled to avoid an "Excessive Flood" kick.
+	
+	Every message written to the socket is reported through recordSend(); the
+	_SocketSender (or IOEngine) asks getDelay() before taking a message out of
+	the _PriorityQueue.
+	"""
+	_lock = None #: A lock used to prevent multiple simultaneous accesses to the policy's state.
+	
+	def __init__(self):
+		"""
+		This function would be invoked if it were possible to instantiate a
+		_FloodControl object, but it is abstract, so it can't be done.
+		
+		Instantiate one of its inheriting classes instead.
+		
+		@return: Nothing.
+		
+		@raise InstantiationError: If instantiation is attempted.
+		"""
+		raise InstantiationError(u"_FloodControl is an abstract class, so it cannot be instantiated.")
+		
+	def getDelay(self, message, current_time):
+		"""
+		This function returns the number of seconds that must pass before the
+		given message can be sent.
+		
+		@type message: basestring
+		@param message: The message to be sent.
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float
+		@return: The number of seconds to wait; 0 if the message may be sent
+		    immediately.
+		"""
+		try:
+			self._lock.acquire()
+			return self._getDelay(message, current_time)
+		finally:
+			self._lock.release()
+			
+	def _getDelay(self, message, current_time):
+		"""
+		This function provides a logical implementation for getDelay(). It must
+		be overridden to properly subclass _FloodControl.
+		
+		@type message: basestring
+		@param message: The message to be sent.
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float
+		@return: The number of seconds to wait; 0 if the message may be sent
+		    immediately.
+		"""
+		return 0
+		
+	def getCredit(self, current_time):
+		"""
+		This function returns the number of seconds of penalty that may still be
+		accumulated before messages are held back.
+		
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float|None
+		@return: The remaining credit, or None if this policy doesn't model the
+		    IRC server's penalty clock.
+		"""
+		try:
+			self._lock.acquire()
+			return self._getCredit(current_time)
+		finally:
+			self._lock.release()
 			
+	def _getCredit(self, current_time):
+		"""
+		This function provides a logical implementation for getCredit(). It may
+		be overridden by subclasses that model the IRC server's penalty clock.
+		
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float|None
+		@return: The remaining credit, or None if this policy doesn't model the
+		    IRC server's penalty clock.
+		"""
+		return None
+		
+	def recordSend(self, message, current_time):
+		"""
+		This function informs the policy that a message was written to the
+		socket.
+		
+		@type message: basestring
+		@param message: The message that was sent.
+		@type current_time: float
+		@param current_time: The UNIX timestamp at which the message was sent.
+		
+		@return: Nothing.
+		"""
+		self._lock.acquire()
+		
+		self._recordSend(message, current_time)
+		
+		self._lock.release()
+		
+	def _recordSend(self, message, current_time):
+		"""
+		This function provides a logical implementation for recordSend(). It
+		must be overridden to properly subclass _FloodControl.
+		
+		@type message: basestring
+		@param message: The message that was sent.
+		@type current_time: float
+		@param current_time: The UNIX timestamp at which the message was sent.
+		
+		@return: Nothing.
+		"""
+		pass
+		
+class _IntervalFloodControl(_FloodControl):
+	"""
+	This class provides an implementation of _FloodControl that enforces a
+	minimum interval between messages.
+	
+	A message sent after a quiet period goes out immediately.
+	"""
+	_interval = None #: The minimum number of seconds between messages.
+	_last_send = 0 #: The UNIX timestamp at which the last message was sent.
+	
+	def __init__(self, interval=_SEND_INTERVAL):
+		"""
+		This function is invoked when creating a new _IntervalFloodControl
+		object.
+		
+		@type interval: float
+		@param interval: The minimum number of seconds between messages.
+		
+		@return: Nothing.
+		"""
+		self._lock = threading.Lock()
+		self._interval = interval
+		
+	def _getDelay(self, message, current_time):
+		"""
+		This function provides the functionality of _FloodControl.getDelay().
+		
+		@type message: basestring
+		@param message: The message to be sent.
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float
+		@return: The number of seconds to wait; 0 if the message may be sent
+		    immediately.
+		"""
+		return max(0, self._last_send + self._interval - current_time)
+		
+	def _recordSend(self, message, current_time):
+		"""
+		This function provides the functionality of _FloodControl.recordSend().
+		
+		@type message: basestring
+		@param message: The message that was sent.
+		@type current_time: float
+		@param current_time: The UNIX timestamp at which the message was sent.
+		
+		@return: Nothing.
+		"""
+		self._last_send = current_time
+		
+class _PenaltyFloodControl(_FloodControl):
+	"""
+	This class provides an implementation of _FloodControl that mirrors the
+	penalty clock an IRC server keeps for each client, as described in section
+	8.10 of RFC 1459.
+	
+	Every message advances the clock by GLOBAL.IRC_FLOOD_MESSAGE_PENALTY
+	seconds, plus one second for every GLOBAL.IRC_FLOOD_BYTE_PENALTY bytes. The
+	clock never falls behind the current time, and the server stops reading
+	once it runs more than the burst window ahead, so messages are held back
+	only when sending them would push the clock past that point.
+	"""
+	_burst = None #: The number of seconds the penalty clock may run ahead of the current time.
+	_penalty_time = 0 #: The UNIX timestamp at which the IRC server's penalty clock is estimated to stand.
+	
+	def __init__(self, burst=GLOBAL.IRC_FLOOD_BURST):
+		"""
+		This function is invoked when creating a new _PenaltyFloodControl
+		object.
+		
+		@type burst: int
+		@param burst: The number of seconds the penalty clock may run ahead of
+		    the current time.
+		
+		@return: Nothing.
+		"""
+		self._lock = threading.Lock()
+		self._burst = burst
+		
+	def _getCost(self, message):
+		"""
+		This function returns the number of seconds of penalty the IRC server
+		will assign to a message.
+		
+		Servers charge for the bytes they receive, so unicode messages are
+		measured as the UTF-8 they will be sent as.
+		
+		@type message: basestring
+		@param message: The message to be evaluated.
+		
+		@rtype: float
+		@return: The message's penalty, in seconds.
+		"""
+		if isinstance(message, unicode):
+			message = message.encode("utf-8")
+		return GLOBAL.IRC_FLOOD_MESSAGE_PENALTY + float(len(message) + len(GLOBAL.IRC_LINE_TERMINATOR)) / GLOBAL.IRC_FLOOD_BYTE_PENALTY
+		
+	def _getCredit(self, current_time):
+		"""
+		This function provides the functionality of _FloodControl.getCredit().
+		
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float
+		@return: The remaining credit, in seconds.
+		"""
+		return self._burst - max(0, self._penalty_time - current_time)
+		
+	def _getDelay(self, message, current_time):
+		"""
+		This function provides the functionality of _FloodControl.getDelay().
+		
+		A message is never held back while the penalty clock is idle, so
+		messages more expensive than the whole burst window still get sent.
+		
+		@type message: basestring
+		@param message: The message to be sent.
+		@type current_time: float
+		@param current_time: The current UNIX timestamp.
+		
+		@rtype: float
+		@return: The number of seconds to wait; 0 if the message may be sent
+		    immediately.
+		"""
+		backlog = self._penalty_time - current_time
+		if backlog <= 0:
+			return 0
+		return min(backlog, max(0, backlog + self._getCost(message) - self._burst))
+		
+	def _recordSend(self, message, current_time):
+		"""
+		This function provides the functionality of _FloodControl.recordSend().
+		
+		@type message: basestring
+		@param message: The message that was sent.
+		@type current_time: float
+		@param current_time: The UNIX timestamp at which the message was sent.
+		
+		@return: Nothing.
+		"""
+		self._penalty_time = max(self._penalty_time, current_time) + self._getCost(message)
+		
 class _PriorityQueue(object):
 	"""
 	This class maintains a series of queues, which are used to prioritise
-	messages sent to the IRC server, since they need to be throttled to avoid
-	an "Excessive Flood" kick.
+	messages sent to the IRC server.
 	
 	Under a five-queue system, the following guidelines should be used when
 	assigning priorities::
@@ -1867,10 +2585,14 @@ class _PriorityQueue(object):
 	 3: Significant (NOTICE)
 	 4: Normal (PRIVMSG)
 	 5: Whenever (WHO)
+	
+	Threads waiting in peekMessage() are woken as soon as a message is added.
 	"""
+	_interrupted = False #: True once interrupt() has been called, after which peekMessage() never waits.
 	_length = None #: The number of messages sitting in the various queues.
-	_queues = None #: A list of lists that will behave like queues to organize messages.
+	_queues = None #: A list of collections.deque objects used to organize messages.
 	_queue_lock = None #: A lock used to prevent multiple simultaneous access to the queue lists.
+	_queue_condition = None #: A condition, bound to _queue_lock, used to wake threads waiting for messages.
 	
 	def __init__(self):
 		"""
@@ -1880,15 +2602,18 @@ class _PriorityQueue(object):
 		"""
 		self._queues = []
 		self._queue_lock = threading.Lock()
+		self._queue_condition = threading.Condition(self._queue_lock)
 		self._length = 0
 		
 		for i in range(len(GLOBAL.ENUM_SERVER_SEND_PRIORITY) - 1):
-			self._queues.append([])
+			self._queues.append(collections.deque())
 			
 	def addMessage(self, message, priority):
 		"""
 		This function adds a new message to the queue structure.
 		
+		Empty messages are discarded, since there is nothing to send.
+		
 		@type message: basestring
 		@param message: The string to be sent to the IRC server.
 		@type priority: GLOBAL.ENUM_SERVER_SEND_PRIORITY.EnumValue
@@ -1897,10 +2622,14 @@ class _PriorityQueue(object):
 		
 		@return: Nothing.
 		"""
+		if not message:
+			return
+			
 		self._queue_lock.acquire()
 		
-		self._queues[priority.index - 1].insert(0, unicode(message))
+		self._queues[priority.index - 1].append(unicode(message))
 		self._length += 1
+		self._queue_condition.notifyAll()
 		
 		self._queue_lock.release()
 		
@@ -1915,12 +2644,13 @@ class _PriorityQueue(object):
 		self._queue_lock.acquire()
 		
 		message = None
-		for i in range(len(self._queues)):
-			if self._queues[i]:
-				message = self._queues[i].pop()
-				self._length -= 1
-				break
-				
+		if self._length:
+			for i in self._queues:
+				if i:
+					message = i.popleft()
+					self._length -= 1
+					break
+					
 		self._queue_lock.release()
 		return message
 		
@@ -1937,9 +2667,221 @@ class _PriorityQueue(object):
 			self._queue_lock.acquire()
 			return self._length
 		finally:
-			self.queue_lock.release()
+			self._queue_lock.release()
+			
+	def interrupt(self):
+		"""
+		This function wakes every thread waiting in peekMessage(), even though no
+		message has been added, and prevents any later call from waiting, so
+		that a consumer that is about to wait can't miss the interruption.
+		
+		It should be called when the queue's consumer is being killed.
+		
+		@return: Nothing.
+		"""
+		self._queue_lock.acquire()
+		
+		self._interrupted = True
+		self._queue_condition.notifyAll()
+		
+		self._queue_lock.release()
+		
+	def peekMessage(self, timeout=0):
+		"""
+		This function returns the next message to be sent to the IRC server
+		without removing it, waiting for one to be added if necessary.
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait for a message, or None to
+		    wait indefinitely.
+		
+		@rtype: unicode|None
+		@return: The next message to be sent, if any, or None if the queue
+		    structure is still unpopulated when the timeout expires or once
+		    interrupt() has been called.
+		"""
+		try:
+			self._queue_lock.acquire()
+			if not self._length and not timeout == 0 and not self._interrupted:
+				self._queue_condition.wait(timeout)
+				
+			if self._length:
+				for i in self._queues:
+					if i:
+						return i[0]
+			return None
+		finally:
+			self._queue_lock.release()
+			
+			
+class _EventQueue(object):
+	"""
+	This class holds the events waiting to be broadcast by one of a Server's
+	worker threads, applying backpressure when they pile up.
+	
+	Once the queue holds its maximum number of events, each new event is
+	handled according to the policy _EVENT_POLICIES assigns its type::
+	 _EVENT_POLICY_KEEP: Queued regardless (private messages).
+	 _EVENT_POLICY_DROP: Queued in place of the oldest queued event with the
+	  same policy, or discarded if there is none (raw events).
+	 _EVENT_POLICY_COALESCE: Discarded if an event of the same type with the
+	  same message is already queued, as happens with every quit during a
+	  netsplit; otherwise, treated as blocked.
+	 _EVENT_POLICY_BLOCK: Queued in place of the oldest droppable event, if
+	  there is one; otherwise, the thread that raised the event waits for the
+	  queue to drain, which, for a _SocketReader, leaves data in the socket.
+	  Threads that must not wait, including the shared IOEngine and
+	  Scheduler and any thread holding a channel's lock, queue the event
+	  immediately.
+	
+	Discarded events are counted, and the counts are delivered, ahead of the
+	next queued event, as a "Server Events Shed" event once the queue is no
+	more than half full, or after _EVENT_SHED_REPORT_INTERVAL seconds.
+	
+	The get() interface of Queue.Queue is provided for G_OBJECTS.WorkerThread.
+	"""
+	_server = None #: The Server whose events are queued.
+	_max_size = None #: The number of events that may be queued before policies are applied, or 0 if the queue is unbounded.
+	_events = None #: A collections.deque of one-element lists, each holding a queued event, or None if the event was discarded after being queued.
+	_droppable = None #: A collections.deque of the elements of _events that hold droppable events, oldest first.
+	_length = 0 #: The number of events queued and not discarded.
+	_messages = None #: A dictionary of the number of coalescable events queued, keyed by (eventname, message).
+	_shed = None #: A dictionary of the number of events discarded since the last report, keyed by eventname.
+	_shed_time = None #: The UNIX timestamp at which the first unreported event was discarded.
+	_condition = None #: A threading.Condition used to protect the queue and to wake waiting threads.
+	
+	def __init__(self, server, max_size):
+		"""
+		This function is invoked when creating a new _EventQueue object.
+		
+		@type server: Server
+		@param server: The Server whose events will be queued.
+		@type max_size: int
+		@param max_size: The number of events that may be queued before
+		    policies are applied, or 0 if the queue should be unbounded.
+		
+		@return: Nothing.
+		"""
+		self._server = server
+		self._max_size = max(0, max_size)
+		self._events = collections.deque()
+		self._droppable = collections.deque()
+		self._messages = {}
+		self._shed = {}
+		self._condition = threading.Condition(threading.Lock())
+		
+	def get(self, block=True, timeout=None):
+		"""
+		This function removes and returns the next event to be broadcast.
+		
+		@type block: bool
+		@param block: True if the function should wait for an event.
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait, or None to wait
+		    indefinitely.
+		
+		@rtype: dict
+		@return: The next event.
+		
+		@raise Queue.Empty: If no event is available.
+		"""
+		self._condition.acquire()
+		try:
+			if not self._length and not self._shed and block:
+				self._condition.wait(timeout)
+				
+			if self._shed and (self._length <= self._max_size / 2 or time.time() - self._shed_time >= _EVENT_SHED_REPORT_INTERVAL):
+				shed = self._shed
+				self._shed = {}
+				return outboundDictionaries.Server_Events_Shed(self._server.getContextID(), self._server.getName(), shed)
+				
+			while self._length:
+				cell = self._events.popleft()
+				event = cell[0]
+				if event is None: #Discarded.
+					continue
+					
+				self._length -= 1
+				if self._droppable and self._droppable[0] is cell:
+					self._droppable.popleft()
+				elif _EVENT_POLICIES.get(event['eventname']) == _EVENT_POLICY_COALESCE:
+					key = (event['eventname'], event.get('message'))
+					count = self._messages[key] - 1
+					if count:
+						self._messages[key] = count
+					else:
+						del self._messages[key]
+				self._condition.notifyAll()
+				return event
+			raise Queue.Empty()
+		finally:
+			self._condition.release()
 			
+	def put(self, event, block=True):
+		"""
+		This function adds an event to the queue, subject to the policy of its
+		type if the queue is full.
+		
+		@type event: dict
+		@param event: The event to be queued.
+		@type block: bool
+		@param block: False if the calling thread must never wait for space,
+		    in which case events that would block are queued immediately.
+		
+		@return: Nothing.
+		"""
+		policy = _EVENT_POLICIES.get(event['eventname'], _EVENT_POLICY_BLOCK)
+		self._condition.acquire()
+		try:
+			if self._max_size and self._length >= self._max_size and not policy == _EVENT_POLICY_KEEP:
+				if policy == _EVENT_POLICY_COALESCE and self._messages.get((event['eventname'], event.get('message'))):
+					self._addShed(event)
+					return
+					
+				if self._droppable: #Make room by discarding the oldest droppable event.
+					cell = self._droppable.popleft()
+					self._addShed(cell[0])
+					cell[0] = None
+					self._length -= 1
+				elif policy == _EVENT_POLICY_DROP:
+					self._addShed(event)
+					return
+				elif block:
+					deadline = time.time() + _EVENT_BLOCK_TIMEOUT
+					while self._length >= self._max_size:
+						remaining = deadline - time.time()
+						if remaining <= 0:
+							break
+						self._condition.wait(remaining)
+						
+			cell = [event]
+			self._events.append(cell)
+			self._length += 1
+			if policy == _EVENT_POLICY_DROP:
+				self._droppable.append(cell)
+			elif policy == _EVENT_POLICY_COALESCE:
+				key = (event['eventname'], event.get('message'))
+				self._messages[key] = self._messages.get(key, 0) + 1
+			self._condition.notifyAll()
+		finally:
+			self._condition.release()
 			
+	def _addShed(self, event):
+		"""
+		This function counts a discarded event.
+		
+		It must be called while the queue's lock is held.
+		
+		@type event: dict
+		@param event: The event being discarded.
+		
+		@return: Nothing.
+		"""
+		if not self._shed:
+			self._shed_time = time.time()
+		self._shed[event['eventname']] = self._shed.get(event['eventname'], 0) + 1
+		
+		
 class _SocketReader(threading.Thread):
 	"""
 	This class regularly checks its parent's socket for new data, and sends
@@ -2003,17 +2945,11 @@ class _SocketReader(threading.Thread):
 					self._server.disconnect()
 					
 			if data:
-				data = self._server.processInput(data)
-				if data: #The server told us to disconnect.
-					if data[0]:
-						self._server.addEvent(outboundDictionaries.Server_Disconnection(self._server.getContextID(), self._server.getName(), data[0], not data[1]))
-					self._server.disconnect()
-				else:
-					self._connection.resetTimeout()
-					
+				self._connection.processData(data)
+				
 class _SocketSender(threading.Thread):
 	"""
-	This class regularly checks its parent _Connection for new messages, and
+	This class waits for its parent _Connection to queue new messages, and
 	sends them to the IRC server.
 	"""
 	_connection = None #: The _Connection that owns this object.
@@ -2049,25 +2985,37 @@ class _SocketSender(threading.Thread):
 		This function is executed over the course of the _SocketSender's
 		lifetime.
 		
-		It checks its parent for new messages every 0.1 seconds, and sends
-		anything it finds to the IRC server.
+		It sleeps until its parent has a message queued, waits for as long as
+		the parent's _FloodControl requires, and then sends the message to the
+		IRC server.
+		
+		The message is re-examined after any wait, so that a higher-priority
+		message queued in the meantime is sent first.
 		
 		@return: Nothing.
 		"""
 		while self._alive:
+			message = self._connection.peekMessage(None)
+			if message is None: #Woken without a message; the _Connection may have been closed.
+				continue
+				
+			delay = self._connection.getSendDelay(message)
+			if delay > 0:
+				time.sleep(delay)
+				continue
+				
 			message = self._connection.getMessage()
-			if message:
+			if not message is None:
 				try:
 					self._connection.send(message)
 				except resources.connection.InvalidStateError: #The socket must have been closed prior to this instruction.
 					break
 				except resources.connection.OutgoingTransmissionError:
 					server = self._connection.getServer()
-					server.addEvent(outboundDictionaries.Server_Disconnection(server.getContextID(), server.getName(), "Remote host closed socket."))
+					server.addEvent(outboundDictionaries.Server_Disconnection(server.getContextID(), server.getName(), "Remote host closed socket.", False))
 					server.disconnect()
 					
-			time.sleep(0.1)
-			
+					
 class ServerManager(object):
 	"""
 	This class maintains a server-specific list of servers.
@@ -2093,7 +3041,7 @@ class ServerManager(object):
 		self._server_lock = threading.Lock()
 		self._servers = {}
 		
-	def addServer(self, name, thread_count):
+	def addServer(self, name, thread_count, flood_burst=GLOBAL.IRC_FLOOD_BURST, event_queue_size=GLOBAL.IRC_EVENT_QUEUE_SIZE):
 		"""
 		This function creates a blank Server object.
 		
@@ -2103,6 +3051,10 @@ class ServerManager(object):
 		@type thread_count: int
 		@param thread_count: The number of worker threads to spawn for this
 		    Server.
+		@type flood_burst: int
+		@param flood_burst: The number of seconds of penalty the IRC server
+		    tolerates before it stops reading; 0 to send messages at a fixed
+		    pace instead.
 		
 		@rtype: Server
 		@return: The newly created Server.		
@@ -2110,7 +3062,7 @@ class ServerManager(object):
 		self._server_lock.acquire()
 		
 		self._connection_counter += 1
-		server = Server(self._connection_counter, name, thread_count)
+		server = Server(self._connection_counter, name, thread_count, flood_burst, event_queue_size)
 		self._servers[self._connection_counter] = server
 		
 		self._server_lock.release()
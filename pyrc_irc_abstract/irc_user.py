@@ -13,60 +13,306 @@ Legal
  
  (C) Neil Tallim, 2004-2007
 """
+import itertools
 import threading
 import time
 
+import resources.isupport
 import resources.tld_table
 
 import pyrc_common.GLOBAL as GLOBAL
+import pyrc_common.dictionaries.outbound as outboundDictionaries
 import pyrc_common.dictionaries.information as informationDictionaries
 #The following dictionaries are used by this module:
 ##User Data
 
-class User(object):
+_RANK_BITS = resources.isupport.MAX_RANKS #: The number of bits used to store a user's ranks within a channel.
+_RANK_MASK = (1 << _RANK_BITS) - 1 #: A mask that isolates the ranks from a packed membership entry.
+_CHANNEL_ID_BITS = 16 #: The number of bits used to store a channel's ID in a membership key; no server may track more channels than this allows at once.
+
+class MembershipTable(object):
 	"""
-	This class represents a user on an IRC server. It is primarily instantiated
-	as a child of channel objects, but since a user can be in more than one
-	channel, one object may be referenced several times. 
+	This class records which users are in which channels on a single IRC
+	server, along with their ranks and last actions there.
+	
+	Rather than giving each User a dictionary of lists, every membership is
+	stored in one server-wide dictionary, keyed by a combination of small
+	integer user and channel IDs, as a single integer that packs the user's
+	rank bitmask with the time of the user's last action in the channel.
+	
+	The table also interns the strings its users share, like idents, hostmasks
+	and server names, and provides the lock that protects all of its users'
+	details.
 	"""
-	_detail_lock = None #: A lock used to prevent multiple simultaneous accesses to the user's data.
-	_hostmask = None #: A string containing the user's hostmask, if known.
-	_ident = None #: A string containing the user's ident, if known.
-	_irc_server = None #: A string containing the URL of the IRC server to which the user is connected, if known.
-	_nickname = None #: A string containing the user's nickname.
-	_real_name = None #: A string containing the user's real name, if known.
-	_last_action = None #: A float containing the user's last global action as a UNIX timestamp, if known.
-	_channels = None
+	_lock = None #: A lock used to prevent multiple simultaneous accesses to the table and its users' details. Nothing that acquires another lock may be called while it is held.
+	_entries = None
 	"""
-	A dictionary containing a list of all channels to which this user belongs.
+	A dictionary containing every membership on the server.
 	
 	Its elements take the following form::
-	 {
-	  <channel:pyrc_irc_abstract.irc_channel.Channel>: [
-	   <status_modifiers:list>,
-	   <dominant_symbol:unicode|None>,
-	   <last_action:float|None>
-	  ]
-	 }
+	 <(user_id << _CHANNEL_ID_BITS) | channel_id:int>: <(last_action << _RANK_BITS) | ranks:int>
+	
+	A last action of 0 means that the user has not acted in the channel.
 	"""
+	_channels = None #: A list of the channels that have been assigned IDs, indexed by ID; released IDs are None.
+	_isupport = None #: The resources.isupport.ISupport object that gives meaning to the rank bitmasks stored in the table and folds the names of its channels.
+	_channel_ids = None #: A dictionary of the IDs of registered channels, keyed by folded channel name.
+	_free_channel_ids = None #: A list of released channel IDs, available for reuse.
+	_user_ids = None #: An itertools.count that supplies the IDs assigned to Users.
+	_strings = None #: A dictionary used to intern strings shared between users, keyed and valued by the strings themselves.
 	
-	def __init__(self, nickname, channel):
+	def __init__(self):
 		"""
-		This function is invoked when creating a new user object, which is
-		associated with the channel in which the user was first found.
+		This function is invoked when a new MembershipTable object is created.
+		
+		@return: Nothing.
+		"""
+		self._lock = threading.Lock()
+		self._entries = {}
+		self._channels = []
+		self._channel_ids = {}
+		self._isupport = resources.isupport.ISupport()
+		self._free_channel_ids = []
+		self._user_ids = itertools.count()
+		self._strings = {}
+		
+	def allocateUserID(self):
+		"""
+		This function assigns an ID to a new User.
+		
+		@rtype: int
+		@return: An ID that no other User on this server has.
+		"""
+		#itertools.count is implemented in C, so drawing from it is atomic and
+		#the lock isn't needed here.
+		return self._user_ids.next()
+		
+	def addMemberships(self, channel, members):
+		"""
+		This function associates many users with a channel at once, holding the
+		lock only once.
 		
-		@type nickname: basestring
-		@param nickname: The user's nickname.
 		@type channel: pyrc_irc_abstract.irc_channel.Channel
-		@param channel: The channel in which the user is residing.
+		@param channel: The channel with which to associate the users.
+		@type members: sequence
+		@param members: A sequence of (<:User>, <ranks:int>) tuples. The ranks
+		    are granted to users who are already in the channel.
 		
 		@return: Nothing.
 		"""
-		self._detail_lock = threading.RLock()
-		self._channels = {}
+		channel_id = channel.getMembershipID()
+		try:
+			self._lock.acquire()
+			for (user, ranks) in members:
+				user.addChannelID(channel_id, ranks)
+		finally:
+			self._lock.release()
+			
+	def getChannel(self, channel_id):
+		"""
+		This function returns the channel that was assigned an ID.
+		
+		@type channel_id: int
+		@param channel_id: The ID of the channel.
+		
+		@rtype: pyrc_irc_abstract.irc_channel.Channel|None
+		@return: The channel, or None if the ID is not in use.
+		"""
+		if channel_id < len(self._channels):
+			return self._channels[channel_id]
+		return None
+		
+	def getChannelID(self, channel_name):
+		"""
+		This function returns the ID assigned to a channel, given its name.
+		
+		@type channel_name: basestring
+		@param channel_name: The name of the channel, in any case.
 		
-		self.addChannel(channel)
+		@rtype: int|None
+		@return: The channel's ID, or None if no channel by that name is
+		    registered.
+		"""
+		return self._channel_ids.get(self._isupport.fold(channel_name))
+		
+	def getEntries(self):
+		"""
+		This function returns the dictionary in which memberships are stored.
+		
+		The caller must hold this table's lock while using it.
+		
+		@rtype: dict
+		@return: The membership dictionary, described by _entries.
+		"""
+		return self._entries
+		
+	def getISupport(self):
+		"""
+		This function returns the tables used to interpret the rank bitmasks
+		stored in the table.
+		
+		@rtype: resources.isupport.ISupport
+		@return: The IRC server's ISUPPORT tables.
+		"""
+		return self._isupport
+		
+	def getLock(self):
+		"""
+		This function returns the lock that protects this table and its users'
+		details.
+		
+		@rtype: thread.lock
+		@return: The table's lock.
+		"""
+		return self._lock
+		
+	def intern(self, string):
+		"""
+		This function returns a canonical copy of a string, so that users who
+		share an ident, hostmask, or server also share the memory used to store
+		it.
+		
+		Python's built-in intern() does not accept unicodes.
+		
+		The caller must hold this table's lock.
+		
+		@type string: basestring|None
+		@param string: The string to intern.
+		
+		@rtype: unicode|None
+		@return: The canonical copy of the string, or None if it was None.
+		"""
+		if string is None:
+			return None
+		string = unicode(string)
+		return self._strings.setdefault(string, string)
+		
+	def registerChannel(self, channel):
+		"""
+		This function assigns an ID to a channel.
+		
+		@type channel: pyrc_irc_abstract.irc_channel.Channel
+		@param channel: The channel to be registered.
+		
+		@rtype: int
+		@return: The channel's ID.
+		
+		@raise MembershipError: If the server is tracking too many channels.
+		"""
+		try:
+			self._lock.acquire()
+			if self._free_channel_ids:
+				channel_id = self._free_channel_ids.pop()
+				self._channels[channel_id] = channel
+			else:
+				channel_id = len(self._channels)
+				if channel_id >> _CHANNEL_ID_BITS:
+					raise MembershipError(u"Unable to track more than %i channels." % (1 << _CHANNEL_ID_BITS))
+				self._channels.append(channel)
+			self._channel_ids[channel.getKey()] = channel_id
+			return channel_id
+		finally:
+			self._lock.release()
+			
+	def releaseChannel(self, channel_id):
+		"""
+		This function frees a channel's ID for reuse.
+		
+		Every user must have been removed from the channel first.
+		
+		@type channel_id: int
+		@param channel_id: The ID of the channel.
+		
+		@return: Nothing.
+		"""
+		try:
+			self._lock.acquire()
+			channel = self._channels[channel_id]
+			if channel:
+				channel_key = channel.getKey()
+				if self._channel_ids.get(channel_key) == channel_id:
+					del self._channel_ids[channel_key]
+				self._channels[channel_id] = None
+				self._free_channel_ids.append(channel_id)
+		finally:
+			self._lock.release()
+			
+	def setISupport(self, isupport):
+		"""
+		This function replaces the tables used to interpret the rank bitmasks
+		stored in the table and to fold the names of its channels.
+		
+		@type isupport: resources.isupport.ISupport
+		@param isupport: The IRC server's new ISUPPORT tables.
+		
+		@return: Nothing.
+		"""
+		try:
+			self._lock.acquire()
+			if not isupport.getCaseMapping() == self._isupport.getCaseMapping():
+				channel_ids = {}
+				for (channel_id, channel) in enumerate(self._channels):
+					if channel:
+						channel_ids[isupport.fold(channel.getName())] = channel_id
+				self._channel_ids = channel_ids
+			self._isupport = isupport
+		finally:
+			self._lock.release()
+			
+			
+class User(object):
+	"""
+	This class represents a user on an IRC server. It is primarily instantiated
+	as a child of channel objects, but since a user can be in more than one
+	channel, one object may be referenced several times.
+	
+	Since PyRC may track hundreds of thousands of users, this class is kept
+	small: it has no dictionary of attributes, its shared strings are interned,
+	its details are protected by its server's MembershipTable's lock, and its
+	channel-specific data is stored in that table.
+	"""
+	__slots__ = (
+	 '_table', #: The MembershipTable of the server on which the user resides.
+	 '_lock', #: The table's lock, which is used to prevent multiple simultaneous accesses to the user's data.
+	 '_id', #: The user's ID within the table.
+	 '_channel_ids', #: A tuple of the IDs of all channels to which this user belongs.
+	 '_nickname', #: A string containing the user's nickname.
+	 '_key', #: The user's nickname, folded according to the server's casemapping.
+	 '_ident', #: A string containing the user's ident, if known.
+	 '_hostmask', #: A string containing the user's hostmask, if known.
+	 '_country', #: A string containing the country identified by a TLD lookup on the user's hostmask; computed when first needed and discarded when the hostmask changes.
+	 '_irc_server', #: A string containing the URL of the IRC server to which the user is connected, if known.
+	 '_real_name', #: A string containing the user's real name, if known.
+	 '_last_action' #: An int containing the user's last global action as a UNIX timestamp, if known.
+	)
+	
+	def __init__(self, nickname, table):
+		"""
+		This function is invoked when creating a new user object.
+		
+		The user should then be associated with the channel in which it was
+		first found, using addChannel().
+		
+		@type nickname: basestring
+		@param nickname: The user's nickname.
+		@type table: MembershipTable
+		@param table: The MembershipTable of the server on which the user
+		    resides.
+		
+		@return: Nothing.
+		"""
+		self._table = table
+		self._lock = table.getLock()
+		self._id = table.allocateUserID()
+		self._channel_ids = ()
 		self._nickname = unicode(nickname)
+		self._key = table.getISupport().fold(self._nickname)
+		self._ident = None
+		self._hostmask = None
+		self._country = None
+		self._irc_server = None
+		self._real_name = None
+		self._last_action = None
 		
 	def addChannel(self, channel):
 		"""
@@ -77,12 +323,38 @@ class User(object):
 		
 		@return: Nothing.
 		"""
-		self._detail_lock.acquire()
+		channel_id = channel.getMembershipID()
+		try:
+			self._lock.acquire()
+			self.addChannelID(channel_id, 0)
+		finally:
+			self._lock.release()
+			
+	def addChannelID(self, channel_id, ranks):
+		"""
+		This function associates the user with a channel, identified by its
+		MembershipTable ID, and grants the user ranks there.
 		
-		self._channels[channel] = [[], None, None]
+		The caller must hold the table's lock; addChannel() should be used
+		otherwise.
 		
-		self._detail_lock.release()
+		@type channel_id: int
+		@param channel_id: The ID of the channel with which to associate the
+		    user.
+		@type ranks: int
+		@param ranks: A bitmask of the ranks to be granted.
 		
+		@return: Nothing.
+		"""
+		entries = self._table.getEntries()
+		key = (self._id << _CHANNEL_ID_BITS) | channel_id
+		entry = entries.get(key)
+		if entry is None:
+			entries[key] = ranks
+			self._channel_ids += (channel_id,)
+		else:
+			entries[key] = entry | ranks
+			
 	def getChannels(self):
 		"""
 		This function retrieves a list of all channels in which this user
@@ -91,53 +363,238 @@ class User(object):
 		@rtype: tuple
 		@return: A tuple of the names of all channels in which this user resides.
 		"""
-		self._detail_lock.acquire()
-		
 		channels = []
-		for i in self._channels:
+		for i in self._getChannels():
 			channels.append(i.getName())
 			
 		channels.sort()
-		
-		self._detail_lock.release()
 		return tuple(channels)
 		
+	def _getChannels(self):
+		"""
+		This function retrieves all channels in which this user resides.
+		
+		@rtype: list
+		@return: A list of pyrc_irc_abstract.irc_channel.Channel objects.
+		"""
+		try:
+			self._lock.acquire()
+			channels = []
+			for i in self._channel_ids:
+				channel = self._table.getChannel(i)
+				if channel:
+					channels.append(channel)
+			return channels
+		finally:
+			self._lock.release()
+			
+	def _getMembershipKey(self, channel):
+		"""
+		This function returns the key under which this user's membership in a
+		channel is stored in the MembershipTable.
+		
+		Channels named by string are resolved through the table's index, so
+		the cost does not depend on how many channels the user is in.
+		
+		@type channel: pyrc_irc_abstract.irc_channel.Channel|basestring
+		@param channel: The channel, or its name.
+		
+		@rtype: int|None
+		@return: The membership key, or None if no such channel is known.
+		    The user is a member of the channel only if the key is present in
+		    the table's entries.
+		"""
+		if isinstance(channel, basestring):
+			channel_id = self._table.getChannelID(channel)
+			if channel_id is None:
+				return None
+		else:
+			channel_id = channel.getMembershipID()
+		return (self._id << _CHANNEL_ID_BITS) | channel_id
+		
+	def getChannelStatus(self, channel):
+		"""
+		This function returns the user's rank symbol and last action within a
+		channel.
+		
+		@type channel: pyrc_irc_abstract.irc_channel.Channel|basestring
+		@param channel: The channel for which data should be retrieved.
+		
+		@rtype: tuple
+		@return: A tuple of the form (<symbol:unicode|None>,
+		    <last_action:int|None>). Both elements are None if the user is not
+		    in the channel.
+		"""
+		key = self._getMembershipKey(channel)
+		try:
+			self._lock.acquire()
+			return self._getChannelStatus(key)
+		finally:
+			self._lock.release()
+			
+	def _getChannelStatus(self, key):
+		"""
+		This function returns the user's rank symbol and last action within a
+		channel, given the key of the membership.
+		
+		The caller must hold the table's lock.
+		
+		@type key: int|None
+		@param key: The key returned by _getMembershipKey(), or None.
+		
+		@rtype: tuple
+		@return: A tuple of the form (<symbol:unicode|None>,
+		    <last_action:int|None>). Both elements are None if the user is not
+		    in the channel.
+		"""
+		entry = self._table.getEntries().get(key)
+		if entry is None:
+			return (None, None)
+		return (self._table.getISupport().getRankSymbol(entry), (entry >> _RANK_BITS) or None)
+		
+	def getCountry(self, hostmask):
+		"""
+		This function returns the country identified by a TLD lookup on one of
+		the user's hostmasks.
+		
+		The lookup is performed at most once for the user's current hostmask;
+		lookups of earlier hostmasks, requested by UserData views created before
+		the hostmask changed, are not cached.
+		
+		@type hostmask: unicode|None
+		@param hostmask: The hostmask to be looked up.
+		
+		@rtype: unicode
+		@return: The user's country, or "Unknown".
+		"""
+		try:
+			self._lock.acquire()
+			if not hostmask == self._hostmask:
+				return self._table.intern(resources.tld_table.tldLookup(hostmask))
+			if self._country is None:
+				self._country = self._table.intern(resources.tld_table.tldLookup(self._hostmask))
+			return self._country
+		finally:
+			self._lock.release()
+			
 	def getData(self, channel=None):
 		"""
 		This function returns a dictionary containing all information known about
 		the user.
 		
+		The dictionary is a UserData view, which captures the user's details, and
+		rank and last action in the given channel, as they are when this
+		function is called: events cross threads before they are read, and they
+		must describe the user as the user was when they were raised. Only the
+		country, which is derived from the captured hostmask, is looked up when
+		requested. Its copy() function returns a detached dict.
+		
 		@type channel: pyrc_irc_abstract.irc_channel.Channel|basestring|None
 		@param channel: The channel for which symbol and last_action_channel data
 		    should be retrieved; None if only generic information is required.
 		
-		@rtype: dict
-		@return: A dictionary of the format returned by
+		@rtype: UserData
+		@return: A read-only dictionary of the format returned by
 		    common.dictionaries.information.User_Data().
 		"""
-		self._detail_lock.acquire()
-		
-		last_action = None
-		symbol = None
+		key = None
 		if channel:
-			channel_data = None
-			if type(channel) == dict:
-				channel_data = self._channels.get(channel)
-			else:
-				for i, channel_data_temp in self._channels.iteritems():
-					if i.getName() == channel:
-						channel_data = channel_data_temp
-						break
-						
-			if channel_data:
-				last_action = channel_data[2]
-				symbol = channel_data[1]
-				
-		user_data = informationDictionaries.User_Data(self._nickname, self._ident, self._hostmask, resources.tld_table.tldLookup(self._hostmask), self._real_name, self._irc_server, self._last_action, last_action, symbol)
+			key = self._getMembershipKey(channel)
+		try:
+			self._lock.acquire()
+			(symbol, last_action_channel) = self._getChannelStatus(key)
+			return UserData(self, self._nickname, self._ident, self._hostmask, self._real_name, self._irc_server, self._last_action, last_action_channel, symbol)
+		finally:
+			self._lock.release()
+			
+	def getLiveData(self, channel=None):
+		"""
+		This function returns a dictionary that describes the user as the user
+		is whenever it is read.
 		
-		self._detail_lock.release()
-		return user_data
+		Unlike the views returned by getData(), which describe the user at a
+		point in time and belong in events, these are meant for member lists
+		that are kept and queried, so that identities and actions learned after
+		a user joined are reported.
+		
+		@type channel: pyrc_irc_abstract.irc_channel.Channel|basestring|None
+		@param channel: The channel for which symbol and last_action_channel data
+		    should be retrieved; None if only generic information is required.
+		
+		@rtype: LiveUserData
+		@return: A read-only dictionary of the format returned by
+		    common.dictionaries.information.User_Data().
+		"""
+		#Reading a single attribute is atomic, so the lock isn't needed here.
+		return LiveUserData(self, self._nickname, channel)
+		
+	def getHostmask(self):
+		"""
+		This function returns the user's hostmask.
+		
+		@rtype: unicode|None
+		@return: The user's hostmask, if known.
+		"""
+		try:
+			self._lock.acquire()
+			return self._hostmask
+		finally:
+			self._lock.release()
+			
+	def getIdent(self):
+		"""
+		This function returns the user's ident.
+		
+		@rtype: unicode|None
+		@return: The user's ident, if known.
+		"""
+		try:
+			self._lock.acquire()
+			return self._ident
+		finally:
+			self._lock.release()
+			
+	def getIRCServer(self):
+		"""
+		This function returns the IRC server to which the user is connected.
+		
+		@rtype: unicode|None
+		@return: The URL of the user's IRC server, if known.
+		"""
+		try:
+			self._lock.acquire()
+			return self._irc_server
+		finally:
+			self._lock.release()
+			
+	def getKey(self):
+		"""
+		This function returns the user's nickname, folded according to the
+		server's casemapping.
 		
+		@rtype: unicode
+		@return: The user's folded nickname.
+		"""
+		try:
+			self._lock.acquire()
+			return self._key
+		finally:
+			self._lock.release()
+			
+	def getLastAction(self):
+		"""
+		This function returns the time of the user's last global action.
+		
+		@rtype: int|None
+		@return: The time of the user's last action, as a UNIX timestamp, if
+		    known.
+		"""
+		try:
+			self._lock.acquire()
+			return self._last_action
+		finally:
+			self._lock.release()
+			
 	def getNickname(self):
 		"""
 		This function returns the user's nickname.
@@ -146,11 +603,37 @@ class User(object):
 		@return: The user's nickname.
 		"""
 		try:
-			self._detail_lock.acquire()
+			self._lock.acquire()
 			return self._nickname
 		finally:
-			self._detail_lock.release()
+			self._lock.release()
+			
+	def getRealName(self):
+		"""
+		This function returns the user's real name.
+		
+		@rtype: unicode|None
+		@return: The user's real name, if known.
+		"""
+		try:
+			self._lock.acquire()
+			return self._real_name
+		finally:
+			self._lock.release()
 			
+	def refoldNickname(self):
+		"""
+		This function recomputes the user's folded nickname after the server's
+		casemapping has changed.
+		
+		@return: Nothing.
+		"""
+		self._lock.acquire()
+		
+		self._key = self._table.getISupport().fold(self._nickname)
+		
+		self._lock.release()
+		
 	def removeChannel(self, channel):
 		"""
 		This function disassociates the user from a channel.
@@ -162,12 +645,17 @@ class User(object):
 		@return: True if the user is still in at least one other channel, False
 		    otherwise.
 		"""
+		channel_id = channel.getMembershipID()
 		try:
-			self._detail_lock.acquire()
-			del self._channels[channel]
-			return not self._channels == {}
+			self._lock.acquire()
+			entries = self._table.getEntries()
+			key = (self._id << _CHANNEL_ID_BITS) | channel_id
+			if key in entries:
+				del entries[key]
+			self._channel_ids = tuple([i for i in self._channel_ids if not i == channel_id])
+			return not self._channel_ids == ()
 		finally:
-			self._detail_lock.release()
+			self._lock.release()
 			
 	def removeUser(self):
 		"""
@@ -175,13 +663,12 @@ class User(object):
 		
 		@return: None
 		"""
-		self._detail_lock.acquire()
-		
-		for i in self._channels.keys(): #.keys() prevents iteration errors, since the channel will remove itself from the user.
-			i.removeUser(self._nickname)
+		#The channels must be notified without holding the lock, since they
+		#will lock themselves and then call back into this object.
+		nickname = self.getNickname()
+		for i in self._getChannels():
+			i.removeUser(nickname)
 			
-		self._detail_lock.release()
-		
 	def setIdentity(self, ident, hostmask):
 		"""
 		This function takes identity data gathered through the IAL and uses it to
@@ -194,15 +681,16 @@ class User(object):
 		
 		@return: Nothing.
 		"""
-		self._detail_lock.acquire()
+		self._lock.acquire()
 		
 		if not self._ident:
-			self._ident = unicode(ident)
+			self._ident = self._table.intern(ident)
 			
 		if not self._hostmask == hostmask:
-			self._hostmask = unicode(hostmask)
+			self._hostmask = self._table.intern(hostmask)
+			self._country = None
 			
-		self._detail_lock.release()
+		self._lock.release()
 		
 	def setRealname(self, real_name):
 		"""
@@ -214,12 +702,12 @@ class User(object):
 		
 		@return: Nothing.
 		"""
-		self._detail_lock.acquire()
+		self._lock.acquire()
 		
 		if not self._real_name:
 			self._real_name = unicode(real_name)
 			
-		self._detail_lock.release()
+		self._lock.release()
 		
 	def setIRCServer(self, irc_server):
 		"""
@@ -232,12 +720,12 @@ class User(object):
 		
 		@return: Nothing.
 		"""
-		self._detail_lock.acquire()
+		self._lock.acquire()
 		
 		if not self._irc_server:
-			self._irc_server = unicode(irc_server)
+			self._irc_server = self._table.intern(irc_server)
 			
-		self._detail_lock.release()
+		self._lock.release()
 		
 	def updateChannelStatus(self, channel, status, grant):
 		"""
@@ -247,7 +735,7 @@ class User(object):
 		@param channel: The channel in which the user's rank is being modified.
 		@type status: basestring
 		@param status: The rank being modified (o, h, v...).
-		    
+		
 		    This parameter must always be exactly one character long.
 		@type grant: bool
 		@param grant: True if the user is geining the rank; False if the user is
@@ -255,29 +743,22 @@ class User(object):
 		
 		@return: Nothing.
 		"""
-		self._detail_lock.acquire()
-		
-		channel_data = self._channels[channel]
-		status = unicode(status).lower()
-		if grant:
-			if not status in channel_data[0]:
-				channel_data[0].append(status)
-		else:
-			try:
-				channel_data[0].remove(status)
-			except:
-				pass
+		flag = self._table.getISupport().getRankFlag(status)
+		if not flag: #Not a rank PyRC tracks.
+			return
+			
+		key = (self._id << _CHANNEL_ID_BITS) | channel.getMembershipID()
+		self._lock.acquire()
+		
+		entries = self._table.getEntries()
+		entry = entries.get(key)
+		if not entry is None:
+			if grant:
+				entries[key] = entry | flag
+			else:
+				entries[key] = entry & ~flag
 				
-		#Set the symbol associated with this user in this channel, if the user
-		#actually has mode flags.
-		channel_data[1] = None
-		if channel_data[0]:
-			for i in GLOBAL.IRC_RANK_ORDER:
-				if i in channel_data[0]:
-					channel_data[1] = unicode(GLOBAL.IRC_RANK_MAP[i])
-					break
-					
-		self._detail_lock.release()
+		self._lock.release()
 		
 	def updateLastEvent(self, channel=None):
 		"""
@@ -291,13 +772,18 @@ class User(object):
 		
 		@return: Nothing.
 		"""
-		self._detail_lock.acquire()
+		last_action = int(time.time())
+		self._lock.acquire()
 		
-		self._last_action = int(time.time())
+		self._last_action = last_action
 		if channel:
-			self._channels[channel][2] = self._last_action
-			
-		self._detail_lock.release()
+			entries = self._table.getEntries()
+			key = (self._id << _CHANNEL_ID_BITS) | channel.getMembershipID()
+			entry = entries.get(key)
+			if not entry is None:
+				entries[key] = (last_action << _RANK_BITS) | (entry & _RANK_MASK)
+				
+		self._lock.release()
 		
 	def updateNickname(self, new_nickname):
 		"""
@@ -310,15 +796,219 @@ class User(object):
 		
 		@return: Nothing
 		"""
-		self._detail_lock.acquire()
+		self._lock.acquire()
 		
 		old_nickname = self._nickname
 		self._nickname = unicode(new_nickname)
+		self._key = self._table.getISupport().fold(self._nickname)
+		
+		self._lock.release()
 		
-		for i in self._channels:
+		#The channels must be notified without holding the lock, since they
+		#will lock themselves.
+		for i in self._getChannels():
 			i.userNicknameChange(old_nickname, new_nickname)
 			
-		self._detail_lock.release()
+			
+class UserData(outboundDictionaries.EventDictionary):
+	"""
+	This class presents the information known about a User as a read-only
+	"User Data" dictionary, captured when it is created.
+	
+	Events that mention a user carry one of these, and they are read by other
+	threads, often after the user has acted again, changed rank, or left, so
+	every value is captured when the view is created. The only exception is
+	the country, which is derived from the captured hostmask by a TLD lookup
+	that is performed only if it is requested, since few consumers read it.
+	copy() returns a detached dict.
+	"""
+	__slots__ = (
+	 'username', #: The user's nickname when this view was created.
+	 'ident', #: The user's ident, if known.
+	 'hostmask', #: The user's hostmask, if known.
+	 'realname', #: The user's real name, if known.
+	 'ircserver', #: The URL of the user's IRC server, if known.
+	 'lastactionglobal', #: The time of the user's last action anywhere, if known.
+	 'lastactionchannel', #: The time of the user's last action in the view's channel, if known.
+	 'symbol', #: The user's dominant rank symbol in the view's channel, if any.
+	 '_user' #: The User being described, which performs the country lookup.
+	)
+	_keys = ('username', 'ident', 'hostmask', 'country', 'realname', 'ircserver', 'lastactionglobal', 'lastactionchannel', 'symbol')
+	_key_set = frozenset(_keys)
+	
+	def __init__(self, user, nickname, ident, hostmask, real_name, irc_server, last_action_global, last_action_channel, symbol):
+		"""
+		This function is invoked when creating a new UserData object.
+		
+		UserData objects should be obtained with User.getData(), rather than
+		directly.
+		
+		@type user: User
+		@param user: The User to be described.
+		@type nickname: unicode
+		@param nickname: The user's current nickname.
+		@type ident: unicode|None
+		@param ident: The user's ident, if known.
+		@type hostmask: unicode|None
+		@param hostmask: The user's hostmask, if known.
+		@type real_name: unicode|None
+		@param real_name: The user's real name, if known.
+		@type irc_server: unicode|None
+		@param irc_server: The URL of the user's IRC server, if known.
+		@type last_action_global: int|None
+		@param last_action_global: The time of the user's last action, if known.
+		@type last_action_channel: int|None
+		@param last_action_channel: The time of the user's last action in the
+		    view's channel, if known.
+		@type symbol: unicode|None
+		@param symbol: The user's dominant rank symbol in the view's channel, if
+		    any.
+		
+		@return: Nothing.
+		"""
+		self.username = nickname
+		self.ident = ident
+		self.hostmask = hostmask
+		self.realname = real_name
+		self.ircserver = irc_server
+		self.lastactionglobal = last_action_global
+		self.lastactionchannel = last_action_channel
+		self.symbol = symbol
+		self._user = user
+		
+	def _getCountry(self):
+		return self._user.getCountry(self.hostmask)
+	country = property(_getCountry) #: The user's country, as identified by a TLD lookup on the hostmask.
+	
+	def copy(self):
+		"""
+		This function returns a detached snapshot of the information this view
+		describes.
+		
+		@rtype: dict
+		@return: A dictionary of the format returned by
+		    common.dictionaries.information.User_Data().
+		"""
+		return informationDictionaries.User_Data(self.username, self.ident, self.hostmask, self.country, self.realname, self.ircserver, self.lastactionglobal, self.lastactionchannel, self.symbol)
+		
+	def __reduce__(self):
+		"""
+		This function allows UserData views to be copied and pickled; the
+		result is a detached snapshot.
+		
+		@rtype: tuple
+		@return: The information needed to build the snapshot.
+		"""
+		return (dict, (self.copy(),))
+		
+		
+class LiveUserData(outboundDictionaries.EventDictionary):
+	"""
+	This class presents the information known about a User as a read-only
+	"User Data" dictionary whose values are read from the User whenever they
+	are requested.
+	
+	Channels' member lists hold these, so that they need not be rebuilt every
+	time a member acts or is identified. Only the nickname is captured, since
+	a member list replaces a member's entry when the nickname changes.
+	capture() returns a UserData view, which is what events must carry, and
+	copy() returns a detached dict.
+	"""
+	__slots__ = (
+	 'username', #: The user's nickname when this view was created.
+	 '_user', #: The User being described.
+	 '_channel' #: The channel for which 'symbol' and 'lastactionchannel' are read, or None.
+	)
+	_keys = UserData._keys
+	_key_set = UserData._key_set
+	
+	def __init__(self, user, nickname, channel=None):
+		"""
+		This function is invoked when creating a new LiveUserData object.
+		
+		LiveUserData objects should be obtained with User.getLiveData(), rather
+		than directly.
+		
+		@type user: User
+		@param user: The User to be described.
+		@type nickname: unicode
+		@param nickname: The user's current nickname.
+		@type channel: pyrc_irc_abstract.irc_channel.Channel|basestring|None
+		@param channel: The channel for which symbol and last_action_channel data
+		    should be retrieved; None if only generic information is required.
+		
+		@return: Nothing.
+		"""
+		self.username = nickname
+		self._user = user
+		self._channel = channel
+		
+	def _getIdent(self):
+		return self._user.getIdent()
+	ident = property(_getIdent) #: The user's ident, if known.
+	
+	def _getHostmask(self):
+		return self._user.getHostmask()
+	hostmask = property(_getHostmask) #: The user's hostmask, if known.
+	
+	def _getCountry(self):
+		return self._user.getCountry(self._user.getHostmask())
+	country = property(_getCountry) #: The user's country, as identified by a TLD lookup on the hostmask.
+	
+	def _getRealName(self):
+		return self._user.getRealName()
+	realname = property(_getRealName) #: The user's real name, if known.
+	
+	def _getIRCServer(self):
+		return self._user.getIRCServer()
+	ircserver = property(_getIRCServer) #: The URL of the user's IRC server, if known.
+	
+	def _getLastActionGlobal(self):
+		return self._user.getLastAction()
+	lastactionglobal = property(_getLastActionGlobal) #: The time of the user's last action anywhere, if known.
+	
+	def _getLastActionChannel(self):
+		if self._channel:
+			return self._user.getChannelStatus(self._channel)[1]
+	lastactionchannel = property(_getLastActionChannel) #: The time of the user's last action in the view's channel, if known.
+	
+	def _getSymbol(self):
+		if self._channel:
+			return self._user.getChannelStatus(self._channel)[0]
+	symbol = property(_getSymbol) #: The user's dominant rank symbol in the view's channel, if any.
+	
+	def capture(self):
+		"""
+		This function returns a view that describes the user as the user is
+		now, suitable for inclusion in an event.
+		
+		@rtype: UserData
+		@return: A read-only dictionary of the format returned by
+		    common.dictionaries.information.User_Data().
+		"""
+		return self._user.getData(self._channel)
+		
+	def copy(self):
+		"""
+		This function returns a detached snapshot of the information this view
+		describes.
+		
+		@rtype: dict
+		@return: A dictionary of the format returned by
+		    common.dictionaries.information.User_Data().
+		"""
+		return self.capture().copy()
+		
+	def __reduce__(self):
+		"""
+		This function allows LiveUserData views to be copied and pickled; the
+		result is a detached snapshot.
+		
+		@rtype: tuple
+		@return: The information needed to build the snapshot.
+		"""
+		return (dict, (self.copy(),))
+		
 		
 class UserManagerServer(object):
 	"""
@@ -327,14 +1017,17 @@ class UserManagerServer(object):
 	It provides a centralized means of accessing and updating user data.
 	"""
 	_user_lock = None #: A lock used to prevent multiple simultaneous accesses to the user pool.
+	_membership_table = None #: The MembershipTable that records the channels, ranks, and shared details of every user on this server.
 	_users = None
 	"""
 	A dictionary containing a list of all users managed by this object.
 	
 	Its elements take the following form::
 	 {
-	  <nickname:unicode>: <:User>
+	  <nickname_key:unicode>: <:User>
 	 }
+	
+	Each user is keyed by its nickname, as folded by User.getKey().
 	"""
 	
 	def __init__(self):
@@ -344,23 +1037,34 @@ class UserManagerServer(object):
 		@return: Nothing.
 		"""
 		self._user_lock = threading.Lock()
+		self._membership_table = MembershipTable()
 		self._users = {}
-	
+		
 	def addUser(self, user):
 		"""
 		This function adds a new user to the pool of managed users.
 		
 		@type user: User
 		@param user: The User object to be added to the pool.
-				
+		
 		@return: Nothing.
 		"""
 		self._user_lock.acquire()
 		
-		self._users[user.getNickname().lower()] = user
+		self._users[user.getKey()] = user
 		
 		self._user_lock.release()
 		
+	def getMembershipTable(self):
+		"""
+		This function returns the MembershipTable that records the channels,
+		ranks, and shared details of every user on this server.
+		
+		@rtype: MembershipTable
+		@return: This server's MembershipTable.
+		"""
+		return self._membership_table
+		
 	def getUser(self, nickname):
 		"""
 		This function retrieves a user from the pool that this object manages.
@@ -373,13 +1077,33 @@ class UserManagerServer(object):
 		    could not be found.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
+		nickname = self._membership_table.getISupport().fold(nickname)
 		try:
 			self._user_lock.acquire()
 			return self._users.get(nickname)
 		finally:
 			self._user_lock.release()
 			
+	def getUsers(self, nicknames):
+		"""
+		This function retrieves many users from the pool that this object
+		manages, holding the lock only once.
+		
+		@type nicknames: sequence
+		@param nicknames: The nicknames of the users to be retrieved, as
+		    unicodes.
+		
+		@rtype: list
+		@return: The User associated with each nickname, in order, or None for
+		    each user that could not be found.
+		"""
+		fold = self._membership_table.getISupport().fold
+		try:
+			self._user_lock.acquire()
+			return [self._users.get(fold(i)) for i in nicknames]
+		finally:
+			self._user_lock.release()
+			
 	def getUserData(self, nickname):
 		"""
 		This function retrieves the channel-non-specific "User Data" dictionary
@@ -394,7 +1118,7 @@ class UserManagerServer(object):
 		    User.getData(), or None if the user could not be found.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
+		nickname = self._membership_table.getISupport().fold(nickname)
 		self._user_lock.acquire()
 		
 		user = self._users.get(nickname)
@@ -415,8 +1139,9 @@ class UserManagerServer(object):
 		     {
 		      <nickname:unicode>: <User_Data:dictionary>
 		     }
-		    
-		    The nicknames used as keys are all lower-case.
+		
+		    The nicknames used as keys are folded according to the server's
+		    casemapping.
 		"""
 		self._user_lock.acquire()
 		
@@ -427,6 +1152,36 @@ class UserManagerServer(object):
 		self._user_lock.release()
 		return user_data
 		
+	def resolveUsers(self, nicknames):
+		"""
+		This function retrieves many users from the pool that this object
+		manages, creating and adding any that are not yet known, while holding
+		the lock only once.
+		
+		New users are not associated with any channel.
+		
+		@type nicknames: sequence
+		@param nicknames: The nicknames of the users to be retrieved, as
+		    unicodes.
+		
+		@rtype: list
+		@return: The User associated with each nickname, in order.
+		"""
+		fold = self._membership_table.getISupport().fold
+		users = []
+		try:
+			self._user_lock.acquire()
+			for i in nicknames:
+				nickname = fold(i)
+				user = self._users.get(nickname)
+				if not user:
+					user = User(i, self._membership_table)
+					self._users[nickname] = user
+				users.append(user)
+			return users
+		finally:
+			self._user_lock.release()
+			
 	def removeUser(self, nickname):
 		"""
 		This function removes a user from the pool.
@@ -437,7 +1192,7 @@ class UserManagerServer(object):
 		@return: Nothing.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname.lower())
+		nickname = self._membership_table.getISupport().fold(nickname)
 		self._user_lock.acquire()
 		
 		user = self._users.get(nickname)
@@ -446,6 +1201,23 @@ class UserManagerServer(object):
 			
 		self._user_lock.release()
 		
+	def refoldNicknames(self):
+		"""
+		This function recomputes the folded nickname of every user in the pool
+		after the server's casemapping has changed.
+		
+		@return: Nothing.
+		"""
+		self._user_lock.acquire()
+		
+		users = {}
+		for i in self._users.itervalues():
+			i.refoldNickname()
+			users[i.getKey()] = i
+		self._users = users
+		
+		self._user_lock.release()
+		
 	def updateUserNickname(self, nickname, new_nickname):
 		"""
 		This function updates the nickname of a user in the pool, and it updates
@@ -457,11 +1229,11 @@ class UserManagerServer(object):
 		@type new_nickname: basestring
 		@param new_nickname: The nickname by which the user will now be
 		    referenced.
-		    
+		
 		@return: Nothing.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
+		nickname = self._membership_table.getISupport().fold(nickname)
 		new_nickname = unicode(new_nickname)
 		self._user_lock.acquire()
 		
@@ -469,7 +1241,7 @@ class UserManagerServer(object):
 		if user:
 			user.updateNickname(new_nickname)
 			del self._users[nickname]
-			self._users[new_nickname.lower()] = user
+			self._users[user.getKey()] = user
 			
 		self._user_lock.release()
 		
@@ -479,8 +1251,23 @@ class UserManagerChannel(object):
 	IRC server.
 	
 	It provides a convenient means of accessing and updating user data.
+	
+	Readers are served from a read-only snapshot of the channel's users, which
+	is replaced, rather than modified, whenever a user joins, leaves, or changes
+	nickname. The replacement is built only when it is first read, so a burst
+	of joins, as follows a netsplit, costs one copy of the member list, rather
+	than one per join, and readers wait for the lock only then. The snapshot
+	holds LiveUserData views, which read identities, actions, and ranks when
+	asked, so rank changes and other activity need no new snapshot. Events
+	that describe the member list carry the views returned by
+	captureUsersData() instead.
+	
+	Every change to the channel's membership also increments the snapshot's
+	version and, if anything handles them, is described by a "Channel
+	Membership Delta" dictionary, so that consumers can keep their own copies
+	of the member list current without rebuilding them.
 	"""
-	_user_lock = None #: A lock used to prevent multiple simultaneous accesses to the user pool.
+	_user_lock = None #: A lock used to prevent multiple simultaneous modifications of the user pool.
 	_channel = None #: The pyrc_irc_abstract.irc_channel.Channel to which this object belongs. 
 	_users = None
 	"""
@@ -488,9 +1275,34 @@ class UserManagerChannel(object):
 	
 	Its elements take the following form::
 	 {
-	  <nickname:unicode>: <:User>
+	  <nickname_key:unicode>: <:User>
+	 }
+	
+	Each user is keyed by its nickname, folded according to the server's
+	casemapping.
+	"""
+	_users_data = None
+	"""
+	A dictionary containing the channel-specific "User Data" dictionaries of
+	all managed users, from which snapshots are built.
+	
+	Its elements take the following form::
+	 {
+	  <nickname_key:unicode>: <:LiveUserData>
 	 }
 	"""
+	_version = 0 #: The version of the channel's membership, incremented with every change.
+	_snapshot = None
+	"""
+	A tuple containing the version of the channel's membership and a read-only
+	copy of _users_data, or None if the membership has changed since the last
+	snapshot was built. It is never modified once published.
+	
+	It takes the following form::
+	 (<version:int>, {
+	  <nickname_key:unicode>: <:LiveUserData>
+	 })
+	"""
 	
 	def __init__(self, channel):
 		"""
@@ -503,6 +1315,8 @@ class UserManagerChannel(object):
 		"""
 		self._user_lock = threading.Lock()
 		self._users = {}
+		self._users_data = {}
+		self._snapshot = (0, outboundDictionaries.freezeDictionary({}))
 		
 		self._channel = channel
 		
@@ -524,35 +1338,65 @@ class UserManagerChannel(object):
 		
 		@return: Nothing.
 		"""
-		#Sanitize input
-		nickname = unicode(nickname)
+		server = self._channel.getServer()
+		isupport = server.getISupport()
+		table = server.getUserManager().getMembershipTable()
+		(nickname, ranks) = isupport.parseNamesToken(nickname) #Pop every rank symbol from the user's token.
+		key = isupport.fold(nickname)
 		self._user_lock.acquire()
 		
-		#Pop every relevant mode from the user's token.
-		modes = []
-		for i, token in enumerate(nickname):
-			mode = GLOBAL.IRC_RANK_MAP_REVERSE.get(token)
-			if mode:
-				modes.append(mode)
-			else:
-				nickname = nickname[i:]
-				break
-				
-		user = self._users.get(nickname.lower())
-		if not user:
-			server = self._channel.getServer()
+		user = self._users.get(key)
+		if user:
+			table.addMemberships(self._channel, ((user, ranks),))
+			if ranks:
+				self._publishChanges(ranks=(key,))
+		else:
 			user = server.getUser(nickname)
-			if user:
-				user.addChannel(self._channel)
-			else:
-				user = User(nickname, self._channel)
+			if not user:
+				user = User(nickname, table)
 				if ident and hostmask:
 					user.setIdentity(ident, hostmask)
 				server.addUser(user)
-			self._users[nickname.lower()] = user
+			table.addMemberships(self._channel, ((user, ranks),))
+			self._users[key] = user
+			self._publishChanges(added=(key,))
 			
-		for i in modes:
-			user.updateChannelStatus(self._channel, i, True)
+		self._user_lock.release()
+		
+	def addUsers(self, nicknames):
+		"""
+		This function adds a list of users, such as those named by a NAMES
+		reply, to the pool of managed users.
+		
+		Each lock involved is acquired only once, no matter how many users are
+		listed, and the snapshot returned by getUsersData() is replaced only
+		once.
+		
+		@type nicknames: sequence
+		@param nicknames: The nicknames of the users to be added. These may be
+		    symbol-prefixed.
+		
+		@return: Nothing.
+		"""
+		server = self._channel.getServer()
+		isupport = server.getISupport()
+		members = []
+		for i in nicknames:
+			if i:
+				(nickname, ranks) = isupport.parseNamesToken(i)
+				members.append((nickname, isupport.fold(nickname), ranks))
+		user_manager = server.getUserManager()
+		self._user_lock.acquire()
+		
+		new_members = [(nickname, key) for (nickname, key, ranks) in members if not key in self._users]
+		ranked_keys = [key for (nickname, key, ranks) in members if ranks and key in self._users]
+		if new_members:
+			for ((nickname, key), user) in zip(new_members, user_manager.resolveUsers([nickname for (nickname, key) in new_members])):
+				self._users[key] = user
+				
+		user_manager.getMembershipTable().addMemberships(self._channel, [(self._users[key], ranks) for (nickname, key, ranks) in members])
+		if new_members or ranked_keys:
+			self._publishChanges(added=[key for (nickname, key) in new_members], ranks=ranked_keys)
 			
 		self._user_lock.release()
 		
@@ -569,6 +1413,9 @@ class UserManagerChannel(object):
 			if not user.removeChannel(self._channel):
 				self._channel.getServer().removeUser(name)
 		self._users = {}
+		self._users_data = {}
+		self._version += 1
+		self._snapshot = None
 		
 		self._user_lock.release()
 		
@@ -584,7 +1431,7 @@ class UserManagerChannel(object):
 		    could not be found.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
+		nickname = self._channel.getServer().getISupport().fold(nickname)
 		try:
 			self._user_lock.acquire()
 			return self._users.get(nickname)
@@ -600,20 +1447,47 @@ class UserManagerChannel(object):
 		@param nickname: The nickname of the user for which data is to be
 		    retrieved.
 		
-		@rtype: dict|None
+		@rtype: UserData|None
 		@return: A channel-specific dictionary of the form returned by
-		    User.getData(), or None if the user could not be found.
+		    User.getData(), describing the user as the user is now, or None if
+		    the user could not be found.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
-		self._user_lock.acquire()
+		nickname = self._channel.getServer().getISupport().fold(nickname)
+		try:
+			self._user_lock.acquire()
+			user = self._users.get(nickname)
+			if user:
+				return user.getData(self._channel)
+			return None
+		finally:
+			self._user_lock.release()
+			
+	def getMembershipSnapshot(self):
+		"""
+		This function retrieves the channel-specific "User Data" dictionaries
+		associated with all managed users, along with the version of the
+		channel's membership that they describe.
 		
-		user = self._users.get(nickname)
+		Every "Channel Membership Delta" dictionary with a greater version
+		describes a change made after the snapshot was taken; those with the
+		same or a lesser version are already reflected in it.
 		
-		self._user_lock.release()
-		if user:
-			return user.getData(self._channel)
-		return None
+		@rtype: tuple
+		@return: A tuple of the form (<version:int>, <users:dict>), where users
+		    is the dictionary returned by getUsersData().
+		"""
+		#Reading a single attribute is atomic, so the lock is needed only if the snapshot must be built.
+		snapshot = self._snapshot
+		if snapshot is None:
+			self._user_lock.acquire()
+			
+			snapshot = self._snapshot
+			if snapshot is None:
+				snapshot = self._snapshot = (self._version, outboundDictionaries.freezeDictionary(self._users_data))
+				
+			self._user_lock.release()
+		return snapshot
 		
 	def getUsersData(self):
 		"""
@@ -626,17 +1500,124 @@ class UserManagerChannel(object):
 		     {
 		      <nickname:unicode>: <User_Data:dictionary>
 		     }
-		     
-		    The nicknames used as keys are all lower-case.
+		
+		    The nicknames used as keys are folded according to the server's
+		    casemapping.
+		
+		    The dictionary is a read-only snapshot, which may be kept and read
+		    without locking; it does not change as users come and go. Each user's
+		    dictionary is a LiveUserData view, which describes the user as the
+		    user is whenever it is read.
 		"""
-		self._user_lock.acquire()
+		return self.getMembershipSnapshot()[1]
 		
-		user_data = {}
-		for i in self._users:
-			user_data[i] = self._users[i].getData(self._channel)
+	def captureUsersData(self):
+		"""
+		This function retrieves the channel-specific "User Data" dictionaries
+		associated with all managed users, each describing the user as the user
+		is now.
+		
+		Events that list the channel's users should carry this, rather than
+		getUsersData(), since they are read after the users may have changed.
+		
+		@rtype: dict
+		@return: A read-only dictionary of the form returned by
+		    getUsersData(), holding UserData views.
+		"""
+		try:
+			self._user_lock.acquire()
+			return outboundDictionaries.freezeDictionary(dict([(key, user_data.capture()) for (key, user_data) in self._users_data.iteritems()]))
+		finally:
+			self._user_lock.release()
+		
+	def _publishChanges(self, added=(), removed=(), renamed=(), ranks=()):
+		"""
+		This function records a change to the channel's membership.
+		
+		The snapshot returned by getUsersData() is discarded, to be rebuilt when
+		next read, if users joined, left, or changed nicknames, its version is
+		incremented, and a "Channel Membership Delta" dictionary is generated
+		if anything handles them.
+		
+		The caller must hold this object's lock, which ensures that deltas are
+		queued in the order of their versions.
+		
+		@type added: sequence
+		@param added: The folded nicknames of users in the pool who joined the
+		    channel.
+		@type removed: sequence
+		@param removed: The folded nicknames of users who left the channel.
+		@type renamed: sequence
+		@param renamed: (<old_nickname:unicode>, <new_nickname:unicode>) tuples
+		    that describe users who changed nicknames, folded.
+		@type ranks: sequence
+		@param ranks: The folded nicknames of users in the pool whose ranks in
+		    the channel changed.
+		
+		@return: Nothing.
+		"""
+		users_data = self._users_data
+		removed_nicknames = []
+		renamed_nicknames = []
+		added_data = []
+		if added or removed or renamed:
+			self._snapshot = None
+			for i in removed:
+				user_data = users_data.pop(i, None)
+				if user_data:
+					removed_nicknames.append(user_data['username'])
+			for (old_nickname, new_nickname) in renamed:
+				user_data = users_data.pop(old_nickname, None)
+				new_user_data = self._users[new_nickname].getLiveData(self._channel)
+				users_data[new_nickname] = new_user_data
+				if user_data:
+					renamed_nicknames.append((user_data['username'], new_user_data['username']))
+			for i in added:
+				user = self._users[i]
+				users_data[i] = user.getLiveData(self._channel)
+				added_data.append(user.getData(self._channel))
+				
+		self._version += 1
+		version = self._version
+		if self._snapshot: #Only ranks changed, and the snapshot's views read them when asked.
+			self._snapshot = (version, self._snapshot[1])
+		
+		if GLOBAL.plugin.handlesMembershipDelta():
+			rank_data = []
+			for i in ranks:
+				user_data = users_data.get(i)
+				if user_data:
+					rank_data.append((user_data['username'], user_data['symbol']))
+					
+			server = self._channel.getServer()
+			#This object's lock is held, so waiting for a worker thread, which may need it, could deadlock.
+			server.addEvent(outboundDictionaries.IRC_Channel_Membership_Delta(server.getContextID(), server.getName(), self._channel.getName(), version, tuple(added_data), tuple(removed_nicknames), tuple(renamed_nicknames), tuple(rank_data)), False)
 			
+	def refoldNicknames(self):
+		"""
+		This function recomputes the folded nickname of every user in the pool
+		after the server's casemapping has changed.
+		
+		The snapshot returned by getUsersData() is rekeyed, but its version is
+		unchanged, since the channel's membership is not.
+		
+		@return: Nothing.
+		"""
+		fold = self._channel.getServer().getISupport().fold
+		self._user_lock.acquire()
+		
+		users = {}
+		users_data = {}
+		for (key, user) in self._users.iteritems():
+			new_key = fold(user.getNickname())
+			users[new_key] = user
+			if key in self._users_data:
+				users_data[new_key] = self._users_data[key]
+		self._users = users
+		self._users_data = users_data
+		self._snapshot = None
+		
 		self._user_lock.release()
-		return user_data
 		
 	def removeUser(self, nickname):
 		"""
@@ -651,7 +1632,7 @@ class UserManagerChannel(object):
 		@return: Nothing.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
+		nickname = self._channel.getServer().getISupport().fold(nickname)
 		self._user_lock.acquire()
 		
 		user = self._users.get(nickname)
@@ -660,6 +1641,7 @@ class UserManagerChannel(object):
 				#It's possible that the user's nickname is changing, so go with the locked string.
 				self._channel.getServer().removeUser(user.getNickname()) 
 			del self._users[nickname]
+			self._publishChanges(removed=(nickname,))
 			
 		self._user_lock.release()
 		
@@ -671,18 +1653,48 @@ class UserManagerChannel(object):
 		@param nickname: The nickname of the user whose status is being modified.
 		@type status: basestring
 		@param status: The status being modified.
-		    
+		
 		    This string must be exactly one character long.
 		@type grant: bool
 		@param grant: True if the user is gaining the specified status; False if
 		    The user is being stripped.
-		    
+		
 		@return: Nothing.
 		"""
-		user = self.getUser(nickname) #Self-sanitizing/locking
-		if user:
-			user.updateChannelStatus(self._channel, status, grant)
+		self.updateChannelStatuses(((nickname, status, grant),))
+		
+	def updateChannelStatuses(self, changes):
+		"""
+		This function forwards a series of status updates, such as those made by
+		a single MODE line, to users in the pool.
+		
+		The lock is acquired, and the change published, only once, no matter
+		how many users are affected.
+		
+		@type changes: sequence
+		@param changes: The updates to be made, in order, each a tuple of the
+		    following form::
+		     (<nickname:basestring>, <status:basestring>, <grant:bool>)
+		
+		@return: Nothing.
+		"""
+		#Sanitize input
+		fold = self._channel.getServer().getISupport().fold
+		changes = [(fold(nickname), status, grant) for (nickname, status, grant) in changes]
+		self._user_lock.acquire()
+		
+		ranks = []
+		for (nickname, status, grant) in changes:
+			user = self._users.get(nickname)
+			if user:
+				user.updateChannelStatus(self._channel, status, grant)
+				if not nickname in ranks:
+					ranks.append(nickname)
+		if ranks:
+			self._publishChanges(ranks=ranks)
 			
+		self._user_lock.release()
+		
 	def updateUserNickname(self, nickname, new_nickname):
 		"""
 		This function updates the nickname reference of a user in the pool.
@@ -696,18 +1708,199 @@ class UserManagerChannel(object):
 		@type new_nickname: basestring
 		@param new_nickname: The nickname by which the user will now be
 		    referenced.
-		    
+		
 		@return: Nothing.
 		"""
 		#Sanitize input
-		nickname = unicode(nickname).lower()
-		new_nickname = unicode(new_nickname)
+		fold = self._channel.getServer().getISupport().fold
+		nickname = fold(nickname)
+		new_nickname = fold(new_nickname)
 		self._user_lock.acquire()
 		
 		user = self._users.get(nickname)
 		if user:
 			del self._users[nickname]
-			self._users[new_nickname.lower()] = user
+			self._users[new_nickname] = user
+			self._publishChanges(renamed=((nickname, new_nickname),))
 			
 		self._user_lock.release()
 		
+		
+class Error(Exception):
+	"""
+	This class serves as the base from which all exceptions native to this
+	module are derived.
+	"""
+	description = None #: A description of the error.
+	
+	def __str__(self):
+		"""
+		This function returns an ASCII version of the description of this Error.
+		
+		When possible, the Unicode version should be used instead.
+		
+		@rtype: str
+		@return: The description of this error.
+		"""
+		return str(self.description)
+		
+	def __unicode__(self):
+		"""
+		This function returns the description of this Error.
+		
+		@rtype: unicode
+		@return: The description of this error.
+		"""
+		return self.description
+		
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new Error object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		self.description = unicode(description)
+		
+class MembershipError(Error):
+	"""
+	This class represents problems that might occur when recording the
+	channels that users are in.
+	"""
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new MembershipError object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		Error.__init__(self, description)
+		
+		
+#Benchmarking interface
+if __name__ == "__main__":
+	import gc
+	import random
+	import resource
+	import subprocess
+	import sys
+	
+	_USER_COUNT = 100000 #: The number of synthetic users to track.
+	_CHANNEL_COUNT = 500 #: The number of synthetic channels to spread them across.
+	
+	class _BenchmarkChannel(object):
+		"""
+		This class stands in for pyrc_irc_abstract.irc_channel.Channel, which
+		needs a live server.
+		"""
+		def __init__(self, name, table):
+			self._name = name
+			self._key = table.getISupport().fold(name)
+			self._membership_id = table.registerChannel(self)
+			
+		def getKey(self):
+			return self._key
+			
+		def getMembershipID(self):
+			return self._membership_id
+			
+		def getName(self):
+			return self._name
+			
+	class _LegacyUser(object):
+		"""
+		This class reproduces the storage of the User that preceded the
+		MembershipTable, for comparison.
+		"""
+		def __init__(self, nickname, channel):
+			self._detail_lock = threading.RLock()
+			self._channels = {channel: [[], None, None]}
+			self._nickname = unicode(nickname)
+			self._ident = None
+			self._hostmask = None
+			self._irc_server = None
+			
+		def addChannel(self, channel):
+			self._channels[channel] = [[], None, None]
+			
+		def setIdentity(self, ident, hostmask):
+			self._ident = unicode(ident)
+			self._hostmask = unicode(hostmask)
+			
+		def setIRCServer(self, irc_server):
+			self._irc_server = unicode(irc_server)
+			
+		def updateChannelStatus(self, channel, status, grant):
+			channel_data = self._channels[channel]
+			channel_data[0].append(status)
+			channel_data[1] = GLOBAL.IRC_RANK_PREFIX[GLOBAL.IRC_RANK_ORDER.index(status)]
+			
+	def _populate(mode, user_count, channel_count):
+		"""
+		This function builds a synthetic network with either the legacy or the
+		current representation.
+		
+		Every user is given freshly decoded copies of one of a small pool of
+		idents, hostmasks, and servers, as they would be when parsed from
+		separate messages.
+		
+		@rtype: tuple
+		@return: The users and channels built.
+		"""
+		rng = random.Random(2007)
+		table = MembershipTable()
+		channels = [_BenchmarkChannel(u"#channel%i" % i, table) for i in xrange(channel_count)]
+		idents = ["~ident%i" % i for i in xrange(200)]
+		hostmasks = ["users.isp%i.example.net" % i for i in xrange(2000)]
+		irc_servers = ["irc%i.example.net" % i for i in xrange(20)]
+		
+		users = []
+		for i in xrange(user_count):
+			user_channels = rng.sample(channels, rng.randint(1, 5))
+			if mode == "legacy":
+				user = _LegacyUser(u"user%i" % i, user_channels[0])
+			else:
+				user = User(u"user%i" % i, table)
+				user.addChannel(user_channels[0])
+			for j in user_channels[1:]:
+				user.addChannel(j)
+			user.setIdentity(unicode(rng.choice(idents)), unicode(rng.choice(hostmasks)))
+			user.setIRCServer(unicode(rng.choice(irc_servers)))
+			for j in user_channels:
+				roll = rng.random()
+				if roll < 0.02:
+					user.updateChannelStatus(j, 'o', True)
+				elif roll < 0.1:
+					user.updateChannelStatus(j, 'v', True)
+			users.append(user)
+		return (users, channels, table)
+		
+	user_count = _USER_COUNT
+	channel_count = _CHANNEL_COUNT
+	if len(sys.argv) > 2:
+		user_count = int(sys.argv[2])
+	if len(sys.argv) > 3:
+		channel_count = int(sys.argv[3])
+		
+	if len(sys.argv) > 1 and sys.argv[1] in ("legacy", "slotted"):
+		#Measure a single representation, in a fresh process.
+		gc.collect()
+		baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		start_time = time.time()
+		network = _populate(sys.argv[1], user_count, channel_count)
+		elapsed = time.time() - start_time
+		gc.collect()
+		used = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+		print "%s: %i users in %i channels in %.3f seconds; %.1f MiB (%i bytes per user)" % (sys.argv[1], user_count, channel_count, elapsed, used / 1024.0, used * 1024 / user_count)
+	else:
+		for i in ("legacy", "slotted"):
+			subprocess.call([sys.executable, sys.argv[0], i, str(user_count), str(channel_count)])
+			
+			
+			
\ No newline at end of file
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_irc_abstract.resources.casemapping
+
+Purpose
+=======
+ Provide the functions used to fold nicknames and channel names into the keys
+ by which an IRC server considers them equal.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2007
+"""
+_CACHE_SIZE = 65536 #: The number of folded strings each fold function remembers before it starts over.
+
+_ASCII_TABLE = dict([(i, i + 32) for i in range(ord('A'), ord('Z') + 1)]) #: A unicode.translate() table that folds A-Z to a-z.
+_STRICT_RFC1459_TABLE = _ASCII_TABLE.copy() #: A unicode.translate() table that also folds []\ to {}|, as described in RFC 1459.
+_STRICT_RFC1459_TABLE.update({ord('['): ord('{'), ord(']'): ord('}'), ord('\\'): ord('|')})
+_RFC1459_TABLE = _STRICT_RFC1459_TABLE.copy() #: A unicode.translate() table that also folds ~ to ^, as most servers do.
+_RFC1459_TABLE[ord('~')] = ord('^')
+
+_fold_functions = {} #: A dictionary of the fold functions built so far, keyed by casemapping name, so that servers with the same casemapping share one cache.
+
+def getFoldFunction(case_mapping):
+	"""
+	This function returns the fold function for a casemapping.
+	
+	A fold function takes a nickname or channel name and returns, as a unicode,
+	the key under which the IRC server files it: two names are the same if
+	their keys are equal. Keys are cached, so folding the same name repeatedly
+	costs one dictionary lookup.
+	
+	Casemappings PyRC does not recognise are folded with unicode.lower().
+	
+	@type case_mapping: basestring
+	@param case_mapping: The name of the casemapping, as advertised by
+	    the CASEMAPPING ISUPPORT parameter, like 'rfc1459' or 'ascii'.
+	
+	@rtype: function
+	@return: The casemapping's fold function.
+	"""
+	case_mapping = unicode(case_mapping).lower()
+	fold = _fold_functions.get(case_mapping)
+	if not fold:
+		if case_mapping == u'ascii':
+			fold = _buildFoldFunction(_ASCII_TABLE)
+		elif case_mapping == u'strict-rfc1459':
+			fold = _buildFoldFunction(_STRICT_RFC1459_TABLE)
+		elif case_mapping == u'rfc1459':
+			fold = _buildFoldFunction(_RFC1459_TABLE)
+		else:
+			fold = _buildFoldFunction(None)
+		fold = _fold_functions.setdefault(case_mapping, fold)
+	return fold
+	
+def _buildFoldFunction(table):
+	"""
+	This function builds a caching fold function around a translation table.
+	
+	@type table: dict|None
+	@param table: The unicode.translate() table that describes the casemapping,
+	    or None to fold with unicode.lower().
+	
+	@rtype: function
+	@return: The fold function.
+	"""
+	cache = {}
+	def fold(name):
+		"""
+		This function folds a name into the key by which the IRC server
+		considers it equal to others.
+		
+		@type name: basestring
+		@param name: The nickname or channel name to be folded.
+		
+		@rtype: unicode
+		@return: The folded name.
+		"""
+		key = cache.get(name)
+		if key is None:
+			if table is None:
+				key = unicode(name).lower()
+			else:
+				key = unicode(name).translate(table)
+			if len(cache) >= _CACHE_SIZE: #Discarding everything is cheaper than tracking use.
+				cache.clear()
+			cache[name] = key
+		return key
+	return fold
+	
+	
+#Benchmarking interface
+if __name__ == "__main__":
+	import timeit
+	
+	_NAMES = [u"Nick[%i]\\Away~" % i for i in xrange(1000)] + [u"SomeBody%i" % i for i in xrange(1000)] #: A population of names, half of which contain characters RFC 1459 folds specially.
+	_ROUNDS = 200 #: The number of times each fold is applied to the population.
+	
+	fold = getFoldFunction(u'rfc1459')
+	def _lower():
+		for i in _NAMES:
+			unicode(i).lower()
+	def _translate():
+		for i in _NAMES:
+			unicode(i).translate(_RFC1459_TABLE)
+	def _fold():
+		for i in _NAMES:
+			fold(i)
+			
+	for (description, function) in (("unicode(x).lower()", _lower), ("unicode(x).translate()", _translate), ("rfc1459 fold", _fold)):
+		elapsed = min(timeit.repeat(function, number=_ROUNDS, repeat=3))
+		print "%s: %i folds in %.3f seconds (%.0f per second)" % (description, len(_NAMES) * _ROUNDS, elapsed, len(_NAMES) * _ROUNDS / elapsed)
+	
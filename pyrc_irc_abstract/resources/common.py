@@ -1,71 +1,153 @@
-# -*- coding: utf-8 -*-
-"""
-PyRC module: pyrc_irc_abstract.resources.common
-
-Purpose
-=======
- Provide general functions required by multiple modules to process data from IRC
- networks.
- 
-Legal
-=====
- All code, unless otherwise indicated, is original, and subject to the terms of
- the GPLv2, which is provided in COPYING.
- 
- (C) Neil Tallim, 2007
-"""
-def splitModes(modestring_raw):
-	"""
-	This function takes a raw modestring and splits its constituents.
-	
-	The output is a tuple or tuples that spell out the details of each mode
-	encountered.
-	
-	Sample I/O::
-	 -vv+hhh flan PyRC flan basket PyRC
-	    (('v', 'flan', False), ('v', 'PyRC', False), ('h', 'flan', True),
-	     ('h', 'basket', True), ('h', 'PyRC', True))
-	 +sntrCT
-	    (('s', None, True), ('n', None, True), ('t', None, True),
-	     ('r', None, True), ('C', None, True), ('T', None, True))
-	 +sntrcVCf [5j#R,30m#M,5n#N10,6t#b]:10
-	    (('s', None, True), ('n', None, True), ('t', None, True),
-	     ('r', None, True), ('c', None, True), ('V', None, True),
-	     ('C', None, True), ('f', '[5j#R,30m#M,5n#N10,6t#b]:10', True))
-	
-	@type modestring_raw: basestring
-	@param modestring_raw: The raw modestring received from the IRC server.
-	
-	@rtype: tuple
-	@return: A tuple of tuples of the following form::
-	     (<mode:unicode>, <parameter:unicode|None>, <granted:bool>)
-	    
-	    - 'mode' is a single-character flag representing the mode.
-	    - 'parameter' is the parameter associated with the mode, like a channel
-	      key or nickname
-	    - 'granted' is True if the mode is set or being set, and False if the
-	      mode is being removed.
-	
-	@raise ProcessingError: If there are more parameters than modes.
-	"""
-	tokens = modestring_raw.split()
-	changes = []
-	grant = True
-	for i in tokens[0]: #Build a list of changed/set modes.
-		if i == '+':
-			grant = True
-		elif i == '-':
-			grant = False
-		else:
-			changes.append((unicode(i), None, grant))
-			
-	tokens = tokens[1:]
-	if len(tokens) > len(changes):
-		raise ProcessingError(u"More modes than expected. The IRC spec has been violated.")
-	pairs = []
-	while tokens: #Pair parameters with modes.
-		change = changes.pop()
-		pairs.insert(0, (change[0], unicode(tokens.pop()), change[2]))
-		
-	return tuple(changes + pairs) #Combine standalone changes and paired changes
-	
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_irc_abstract.resources.common
+
+Purpose
+=======
+ Provide general functions required by multiple modules to process data from IRC
+ networks.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2007
+"""
+def splitModes(modestring_raw, isupport=None):
+	"""
+	This function takes a raw modestring and splits its constituents.
+	
+	The output is a tuple or tuples that spell out the details of each mode
+	encountered.
+	
+	If the IRC server's ISUPPORT tables are provided, parameters are assigned
+	to the modes that consume them. Otherwise, or if the parameters do not
+	match the tables, parameters are paired with the modes at the end of the
+	modestring, which is correct only when no parameterless mode follows a
+	mode that takes a parameter.
+	
+	Sample I/O::
+	 -vv+hhh flan PyRC flan basket PyRC
+	    (('v', 'flan', False), ('v', 'PyRC', False), ('h', 'flan', True),
+	     ('h', 'basket', True), ('h', 'PyRC', True))
+	 +sntrCT
+	    (('s', None, True), ('n', None, True), ('t', None, True),
+	     ('r', None, True), ('C', None, True), ('T', None, True))
+	 +sntrcVCf [5j#R,30m#M,5n#N10,6t#b]:10
+	    (('s', None, True), ('n', None, True), ('t', None, True),
+	     ('r', None, True), ('c', None, True), ('V', None, True),
+	     ('C', None, True), ('f', '[5j#R,30m#M,5n#N10,6t#b]:10', True))
+	 +kn secret (with ISUPPORT tables)
+	    (('k', 'secret', True), ('n', None, True))
+	
+	@type modestring_raw: basestring
+	@param modestring_raw: The raw modestring received from the IRC server.
+	@type isupport: resources.isupport.ISupport|None
+	@param isupport: The IRC server's ISUPPORT tables, if available.
+	
+	@rtype: tuple
+	@return: A tuple of tuples of the following form::
+	     (<mode:unicode>, <parameter:unicode|None>, <granted:bool>)
+	    
+	    - 'mode' is a single-character flag representing the mode.
+	    - 'parameter' is the parameter associated with the mode, like a channel
+	      key or nickname
+	    - 'granted' is True if the mode is set or being set, and False if the
+	      mode is being removed.
+	
+	@raise ProcessingError: If there are more parameters than modes.
+	"""
+	tokens = modestring_raw.split()
+	changes = []
+	grant = True
+	for i in tokens[0]: #Build a list of changed/set modes.
+		if i == '+':
+			grant = True
+		elif i == '-':
+			grant = False
+		else:
+			changes.append((unicode(i), None, grant))
+			
+	parameters = tokens[1:]
+	if isupport:
+		paired = []
+		position = 0
+		for (mode, parameter, grant) in changes:
+			if isupport.takesParameter(mode, grant):
+				if position == len(parameters):
+					break
+				parameter = unicode(parameters[position])
+				position += 1
+			paired.append((mode, parameter, grant))
+		if len(paired) == len(changes) and position == len(parameters):
+			return tuple(paired)
+			
+	split = len(changes) - len(parameters)
+	if split < 0:
+		raise ProcessingError(u"More modes than expected. The IRC spec has been violated.")
+		
+	#Pair parameters with the modes at the end of the list.
+	for (i, parameter) in enumerate(parameters):
+		change = changes[split + i]
+		changes[split + i] = (change[0], unicode(parameter), change[2])
+	return tuple(changes)
+	
+	
+class Error(Exception):
+	"""
+	This class serves as the base from which all exceptions native to this
+	module are derived.
+	"""
+	description = None #: A description of the error.
+	
+	def __str__(self):
+		"""
+		This function returns an ASCII version of the description of this Error.
+		
+		When possible, the Unicode version should be used instead.
+		
+		@rtype: str
+		@return: The description of this error.
+		"""
+		return str(self.description)
+		
+	def __unicode__(self):
+		"""
+		This function returns the description of this Error.
+		
+		@rtype: unicode
+		@return: The description of this error.
+		"""
+		return self.description
+		
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new Error object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		self.description = unicode(description)
+		
+class ProcessingError(Error):
+	"""
+	This class represents problems that might occur while splitting a
+	modestring.
+	"""
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new ProcessingError object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		Error.__init__(self, description)
+		
+		
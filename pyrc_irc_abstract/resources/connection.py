@@ -96,6 +96,28 @@ class _Socket(object):
 		"""
 		pass
 		
+	def fileno(self):
+		"""
+		This function returns the file descriptor of the underlying socket, so
+		that it may be watched for activity.
+		
+		@rtype: int|None
+		@return: The socket's file descriptor, or None if the socket can't be
+		    watched.
+		"""
+		return self._fileno()
+		
+	def _fileno(self):
+		"""
+		This function provides a logical implementation for fileno(). It must be
+		overridden to properly subclass _Socket.
+		
+		@rtype: int|None
+		@return: The socket's file descriptor, or None if the socket can't be
+		    watched.
+		"""
+		return None
+		
 	def getAddress(self):
 		"""
 		This function returns the URL and port of the server to which this
@@ -142,6 +164,45 @@ class _Socket(object):
 		else:
 			raise InvalidStateError(u"This _Socket is not connected to a server; it cannot read data.")
 			
+	def readPendingData(self, packet_size):
+		"""
+		This function reads data that is known to be waiting on the socket,
+		without first polling it.
+		
+		It should only be used by something that watches fileno().
+		
+		@type packet_size: int
+		@param packet_size: The number of bytes to read.
+		
+		@rtype: basestring
+		@return: The data received from the IRC server. An empty string
+		    indicates that the server closed the connection.
+		
+		@raise InvalidStateError: If the socket is dead.
+		@raise IncomingTransmissionError: If a problem occurred when reading data
+		    from the connection.
+		"""
+		if self.isAlive():
+			return self._readData_(packet_size)
+		else:
+			raise InvalidStateError(u"This _Socket is not connected to a server; it cannot read data.")
+			
+	def _readData_(self, packet_size):
+		"""
+		This function provides a logical implementation for readPendingData(). It
+		must be overridden to properly subclass _Socket.
+		
+		@type packet_size: int
+		@param packet_size: The number of bytes to read.
+		
+		@rtype: basestring
+		@return: The data received from the IRC server.
+		
+		@raise IncomingTransmissionError: If a problem occurred when reading data
+		    from the connection.
+		"""
+		return ''
+		
 	def _readData(self, packet_size):
 		"""
 		This function provides a logical implementation for readData(). It must
@@ -255,6 +316,15 @@ class BasicSocket(_Socket):
 		except socket.error, error_data:
 			raise ConnectionError(u"Failed to connect to socket: %s" % error_data)
 			
+	def _fileno(self):
+		"""
+		This function provides the functionality of _Socket.fileno().
+		
+		@rtype: int
+		@return: The socket's file descriptor.
+		"""
+		return self._socket.fileno()
+		
 	def _readData(self, packet_size):
 		"""
 		This function provides the functionality of _Socket.readData().
@@ -281,7 +351,8 @@ class BasicSocket(_Socket):
 			
 	def _readData_(self, packet_size):
 		"""
-		This function provides the functionality of _readData().
+		This function provides the functionality of _readData() and
+		_Socket.readPendingData().
 		
 		@type packet_size: int
 		@param packet_size: The number of bytes to read.
@@ -0,0 +1,506 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_irc_abstract.resources.io_engine
+
+Purpose
+=======
+ Multiplex every IRC connection's socket through a single thread, using the
+ most efficient readiness-notification facility the platform offers.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2004-2007
+"""
+import os
+import select
+import threading
+import time
+
+_WAKE_INTERVAL = 0.1 #: The longest the engine may sleep if it cannot be woken by a pipe.
+
+_engine = None #: The IOEngine shared by every connection, created on first use.
+_engine_lock = threading.Lock() #: A lock used to prevent multiple simultaneous creations of the shared IOEngine.
+
+class _Poller(object):
+	"""
+	This abstract class defines the operations that a readiness-notification
+	facility must support to be used by an IOEngine.
+	
+	Only read-readiness is tracked: IRC traffic is sent in small, paced lines,
+	so sockets are effectively always writable.
+	"""
+	def __init__(self):
+		"""
+		This function would be invoked if it were possible to instantiate a
+		_Poller object, but it is abstract, so it can't be done.
+		
+		Instantiate one of its inheriting classes instead.
+		
+		@return: Nothing.
+		
+		@raise Error: If instantiation is attempted.
+		"""
+		raise Error(u"_Poller is an abstract class, so it cannot be instantiated.")
+		
+	def register(self, fileno):
+		"""
+		This function starts watching a file descriptor for incoming data.
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be watched.
+		
+		@return: Nothing.
+		"""
+		pass
+		
+	def unregister(self, fileno):
+		"""
+		This function stops watching a file descriptor.
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be forgotten.
+		
+		@return: Nothing.
+		"""
+		pass
+		
+	def poll(self, timeout):
+		"""
+		This function waits until at least one watched file descriptor has data
+		to be read, or until the timeout expires.
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait, or None to wait
+		    indefinitely.
+		
+		@rtype: list
+		@return: A list of all file descriptors that are ready to be read.
+		"""
+		return []
+		
+class _EPollPoller(_Poller):
+	"""
+	This class provides an implementation of _Poller backed by Linux's epoll.
+	"""
+	_epoll = None #: The select.epoll object used to watch file descriptors.
+	
+	def __init__(self):
+		"""
+		This function is invoked when creating a new _EPollPoller object.
+		
+		@return: Nothing.
+		"""
+		self._epoll = select.epoll()
+		
+	def register(self, fileno):
+		"""
+		This function provides the functionality of _Poller.register().
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be watched.
+		
+		@return: Nothing.
+		"""
+		self._epoll.register(fileno, select.EPOLLIN | select.EPOLLERR | select.EPOLLHUP)
+		
+	def unregister(self, fileno):
+		"""
+		This function provides the functionality of _Poller.unregister().
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be forgotten.
+		
+		@return: Nothing.
+		"""
+		try:
+			self._epoll.unregister(fileno)
+		except (IOError, OSError, ValueError):
+			pass
+			
+	def poll(self, timeout):
+		"""
+		This function provides the functionality of _Poller.poll().
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait, or None to wait
+		    indefinitely.
+		
+		@rtype: list
+		@return: A list of all file descriptors that are ready to be read.
+		"""
+		if timeout is None:
+			timeout = -1
+		return [fileno for (fileno, event) in self._epoll.poll(timeout)]
+		
+class _PollPoller(_Poller):
+	"""
+	This class provides an implementation of _Poller backed by poll().
+	"""
+	_poll = None #: The select.poll object used to watch file descriptors.
+	
+	def __init__(self):
+		"""
+		This function is invoked when creating a new _PollPoller object.
+		
+		@return: Nothing.
+		"""
+		self._poll = select.poll()
+		
+	def register(self, fileno):
+		"""
+		This function provides the functionality of _Poller.register().
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be watched.
+		
+		@return: Nothing.
+		"""
+		self._poll.register(fileno, select.POLLIN | select.POLLPRI | select.POLLERR | select.POLLHUP)
+		
+	def unregister(self, fileno):
+		"""
+		This function provides the functionality of _Poller.unregister().
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be forgotten.
+		
+		@return: Nothing.
+		"""
+		try:
+			self._poll.unregister(fileno)
+		except KeyError:
+			pass
+			
+	def poll(self, timeout):
+		"""
+		This function provides the functionality of _Poller.poll().
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait, or None to wait
+		    indefinitely.
+		
+		@rtype: list
+		@return: A list of all file descriptors that are ready to be read.
+		"""
+		if timeout is not None:
+			timeout = int(timeout * 1000)
+		return [fileno for (fileno, event) in self._poll.poll(timeout)]
+		
+class _SelectPoller(_Poller):
+	"""
+	This class provides an implementation of _Poller backed by select(), for
+	platforms that offer nothing better.
+	"""
+	_filenos = None #: A list of all file descriptors being watched.
+	
+	def __init__(self):
+		"""
+		This function is invoked when creating a new _SelectPoller object.
+		
+		@return: Nothing.
+		"""
+		self._filenos = []
+		
+	def register(self, fileno):
+		"""
+		This function provides the functionality of _Poller.register().
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be watched.
+		
+		@return: Nothing.
+		"""
+		if not fileno in self._filenos:
+			self._filenos.append(fileno)
+			
+	def unregister(self, fileno):
+		"""
+		This function provides the functionality of _Poller.unregister().
+		
+		@type fileno: int
+		@param fileno: The file descriptor to be forgotten.
+		
+		@return: Nothing.
+		"""
+		if fileno in self._filenos:
+			self._filenos.remove(fileno)
+			
+	def poll(self, timeout):
+		"""
+		This function provides the functionality of _Poller.poll().
+		
+		@type timeout: float|None
+		@param timeout: The number of seconds to wait, or None to wait
+		    indefinitely.
+		
+		@rtype: list
+		@return: A list of all file descriptors that are ready to be read.
+		"""
+		if not self._filenos: #select() can't wait on an empty list everywhere.
+			if timeout is None:
+				timeout = _WAKE_INTERVAL
+			time.sleep(timeout)
+			return []
+		return select.select(self._filenos[:], [], [], timeout)[0]
+		
+class IOEngine(threading.Thread):
+	"""
+	This class services every registered connection from a single thread.
+	
+	Registered handlers must provide the following functions::
+	 fileno() -> int
+	 handleError() -> Nothing
+	 handleRead() -> Nothing
+	 handleTimers(current_time:float) -> float|None
+	
+	handleRead() is called whenever the handler's socket has data waiting.
+	handleTimers() is called on every pass through the loop, and must return
+	the UNIX timestamp at which it next needs to be called, or None if it has
+	nothing scheduled. The engine sleeps until the earliest such time, or
+	until data arrives, so it consumes no CPU time while everything is idle.
+	handleError() is called, while the exception is being handled, if either
+	of the others raises one, so that the handler can report it; a single
+	misbehaving connection must not stall every other one.
+	"""
+	_alive = True #: True until the thread is no longer useful.
+	_poller = None #: The _Poller used to wait for incoming data.
+	_handler_lock = None #: A lock used to prevent multiple simultaneous accesses to the handler list.
+	_wake_pipe = None #: A tuple containing the read and write ends of a pipe used to interrupt polling, or None if the platform can't poll pipes.
+	_handlers = None
+	"""
+	A dictionary of all handlers serviced by this engine.
+	
+	Its elements take the following form::
+	 {
+	  <fileno:int>: <:object>
+	 }
+	"""
+	
+	def __init__(self):
+		"""
+		This function is invoked when creating a new IOEngine object.
+		
+		@return: Nothing.
+		"""
+		threading.Thread.__init__(self)
+		self._handlers = {}
+		self._handler_lock = threading.Lock()
+		
+		if hasattr(select, 'epoll'):
+			self._poller = _EPollPoller()
+		elif hasattr(select, 'poll'):
+			self._poller = _PollPoller()
+		else:
+			self._poller = _SelectPoller()
+			
+		try:
+			import fcntl
+			self._wake_pipe = os.pipe()
+			for i in self._wake_pipe:
+				fcntl.fcntl(i, fcntl.F_SETFL, fcntl.fcntl(i, fcntl.F_GETFL) | os.O_NONBLOCK)
+			self._poller.register(self._wake_pipe[0])
+		except (ImportError, OSError): #Microsoft platforms can only select() sockets.
+			self._wake_pipe = None
+			
+		self.setDaemon(True)
+		self.setName("I/O Engine")
+		
+	def kill(self):
+		"""
+		This function terminates the IOEngine's execution after its current
+		iteration.
+		
+		@return: Nothing.
+		"""
+		self._alive = False
+		self.wake()
+		
+	def register(self, handler):
+		"""
+		This function adds a handler to the set of those serviced by the engine.
+		
+		@type handler: object
+		@param handler: The handler to be serviced.
+		
+		@return: Nothing.
+		"""
+		self._handler_lock.acquire()
+		
+		fileno = handler.fileno()
+		self._handlers[fileno] = handler
+		self._poller.register(fileno)
+		
+		self._handler_lock.release()
+		self.wake()
+		
+	def unregister(self, handler):
+		"""
+		This function removes a handler from the set of those serviced by the
+		engine.
+		
+		It must be called before the handler's socket is closed.
+		
+		@type handler: object
+		@param handler: The handler to be removed.
+		
+		@return: Nothing.
+		"""
+		self._handler_lock.acquire()
+		
+		for (fileno, registered_handler) in self._handlers.items():
+			if registered_handler is handler:
+				self._poller.unregister(fileno)
+				del self._handlers[fileno]
+				break
+				
+		self._handler_lock.release()
+		self.wake()
+		
+	def wake(self):
+		"""
+		This function interrupts the engine's current wait, forcing it to
+		re-evaluate its handlers' timers.
+		
+		It should be called whenever a handler has new work scheduled.
+		
+		@return: Nothing.
+		"""
+		if self._wake_pipe:
+			try:
+				os.write(self._wake_pipe[1], 'x')
+			except OSError: #The pipe is full, so the engine is already due to wake.
+				pass
+				
+	def run(self):
+		"""
+		This function is executed over the course of the IOEngine's lifetime.
+		
+		It gives every handler a chance to run its timers, then sleeps until
+		either data arrives or the earliest timer falls due.
+		
+		@return: Nothing.
+		"""
+		while self._alive:
+			self._handler_lock.acquire()
+			handlers = self._handlers.values()
+			self._handler_lock.release()
+			
+			deadline = None
+			current_time = time.time()
+			for i in handlers:
+				try:
+					next_time = i.handleTimers(current_time)
+				except Exception:
+					next_time = None
+					self._reportError(i)
+				if not next_time is None and (deadline is None or next_time < deadline):
+					deadline = next_time
+					
+			timeout = None
+			if not deadline is None:
+				timeout = max(0.0, deadline - time.time())
+			if not self._wake_pipe and (timeout is None or timeout > _WAKE_INTERVAL):
+				timeout = _WAKE_INTERVAL
+				
+			try:
+				ready = self._poller.poll(timeout)
+			except (select.error, IOError, OSError): #Interrupted by a signal.
+				continue
+				
+			for fileno in ready:
+				if self._wake_pipe and fileno == self._wake_pipe[0]:
+					try:
+						while os.read(fileno, 4096):
+							pass
+					except OSError: #The pipe has been drained.
+						pass
+					continue
+					
+				self._handler_lock.acquire()
+				handler = self._handlers.get(fileno)
+				self._handler_lock.release()
+				if handler:
+					try:
+						handler.handleRead()
+					except Exception:
+						self._reportError(handler)
+						
+	def _reportError(self, handler):
+		"""
+		This function asks a handler to report the exception raised by one of
+		its functions.
+		
+		It must be called while the exception is being handled.
+		
+		@type handler: object
+		@param handler: The handler that raised the exception.
+		
+		@return: Nothing.
+		"""
+		try:
+			handler.handleError()
+		except Exception: #Reporting is best-effort; the engine must keep running.
+			pass
+			
+def getEngine():
+	"""
+	This function returns the IOEngine shared by every connection, creating and
+	starting it if necessary.
+	
+	@rtype: IOEngine
+	@return: The shared IOEngine.
+	"""
+	global _engine
+	try:
+		_engine_lock.acquire()
+		if not _engine:
+			_engine = IOEngine()
+			_engine.start()
+		return _engine
+	finally:
+		_engine_lock.release()
+		
+		
+class Error(Exception):
+	"""
+	This class serves as the base from which all exceptions native to this
+	module are derived.
+	"""
+	description = None #: A description of the error.
+	
+	def __str__(self):
+		"""
+		This function returns an ASCII version of the description of this Error.
+		
+		When possible, the Unicode version should be used instead.
+		
+		@rtype: str
+		@return: The description of this error.
+		"""
+		return str(self.description)
+		
+	def __unicode__(self):
+		"""
+		This function returns the description of this Error.
+		
+		@rtype: unicode
+		@return: The description of this error.
+		"""
+		return self.description
+		
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new Error object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		self.description = unicode(description)
+		
+		
\ No newline at end of file
@@ -67,8 +67,8 @@ def _generateNonColon():
 	 server:
 	  pyrc_irc_abstract.irc_server.Server : A reference to the Server object
 	                                        received the event.
-	 data:
-	  unicode : The payload of the event.
+	 message:
+	  pyrc_irc_abstract.resources.message.Message : The parsed event.
 	  
 	 Return:
 	 	None : Nothing is returned, unless PyRC needs to disconnect.
@@ -80,13 +80,14 @@ def _generateNonColon():
 	"""
 	nc = {}
 	
-	def _ERROR(server, data):
-		return (data, True) #Just disconnect with the server's reason.
+	def _ERROR(server, message):
+		return (message.getText(0), True) #Just disconnect with the server's reason.
 	nc['ERROR'] = _ERROR
 	
-	def _PING(server, data):
+	def _PING(server, message):
 		#Pings are handled automatically; an event is raised strictly for
 		#informational purposes.
+		data = message.getText(0)
 		server.send("PONG :%s" % data, GLOBAL.ENUM_SERVER_SEND_PRIORITY.CRITICAL)
 		server.addEvent(outboundDictionaries.IRC_Ping(server.getContextID(), server.getName(), data, None))
 	nc['PING'] = _PING
@@ -104,8 +105,8 @@ def _generateServerCodes():
 	 server:
 	  pyrc_irc_abstract.irc_server.Server : A reference to the Server object
 	                                        that received the event.
-	 data:
-	  unicode : The payload of the event.
+	 message:
+	  pyrc_irc_abstract.resources.message.Message : The parsed event.
 	 target:
 	  basestring : The name of the event's target, typically a user or a
 	               channel.
@@ -122,9 +123,10 @@ def _generateServerCodes():
 	"""
 	sc = {}
 	
-	def _MODE(server, data, target, nickname):
-		modes = common.splitModes(data)
-		if target[0] in GLOBAL.IRC_CHANNEL_PREFIX:
+	def _MODE(server, message, target, nickname):
+		data = message.getText(1)
+		modes = common.splitModes(data, server.getISupport())
+		if server.getISupport().isChannel(target):
 			channel = server.getChannel(target)
 			if not channel:
 				return
@@ -139,11 +141,11 @@ def _generateServerCodes():
 			server.addEvent(outboundDictionaries.IRC_User_Modes(server.getContextID(), server.getName(), nickname, modes, data, server.getUserModes(), server.getUserModeString()))
 	sc['MODE'] = _MODE
 	
-	def _NOTICE(server, data, target, nickname):
-		_serverMessage(server, data)
+	def _NOTICE(server, message, target, nickname):
+		_serverMessage(server, message.getText(1))
 	sc['NOTICE'] = _NOTICE
 	
-	def _PONG(server, data, target, nickname):
+	def _PONG(server, message, target, nickname):
 		server.addEvent(outboundDictionaries.IRC_Pong(server.getContextID(), server.getName(), server.processPong(), None))
 	sc['PONG'] = _PONG
 	
@@ -160,11 +162,11 @@ def _generateResponseCodes():
 	 server:
 	  pyrc_irc_abstract.irc_server.Server : A reference to the Server object
 	                                        that received the event.
-	 data:
-	  unicode : The payload of the event.
+	 message:
+	  pyrc_irc_abstract.resources.message.Message : The parsed event.
 	 target:
 	  basestring : The name of the event's target, typically a user or a
-	               channel.
+	               channel; None if the event had no parameters.
 	 user_data:
 	  basestring : A User Data Information Dictionary, channel-specific if
 	  possible.
@@ -179,12 +181,12 @@ def _generateResponseCodes():
 	"""
 	rc = {}
 	
-	def _INVITE(server, data, target, user_data): #:flonne!~flonne@Free.Phone.Chatline INVITE YUO :#pyrc
-		server.addEvent(outboundDictionaries.IRC_Channel_Invite(server.getContextID(), server.getName(), data.lower(), user_data))
+	def _INVITE(server, message, target, user_data): #:flonne!~flonne@Free.Phone.Chatline INVITE YUO :#pyrc
+		server.addEvent(outboundDictionaries.IRC_Channel_Invite(server.getContextID(), server.getName(), message.params[1].lower(), user_data))
 	rc['INVITE'] = _INVITE
 	
-	def _JOIN(server, data, target, user_data): #:PyRCX!~PyRC@ZiRC-CAB5A9EC.cg.shawcable.net JOIN :#animesuki.os
-		channel_name = unicode(target.replace(':', '').lower())
+	def _JOIN(server, message, target, user_data): #:PyRCX!~PyRC@ZiRC-CAB5A9EC.cg.shawcable.net JOIN :#animesuki.os
+		channel_name = target.lower()
 		channel = server.getChannel(channel_name)
 		if not channel: #We're joining the channel, since it isn't in our list.
 			server.getStash().createChannel(channel_name)
@@ -194,35 +196,34 @@ def _generateResponseCodes():
 			server.addEvent(outboundDictionaries.IRC_Channel_User_Join(server.getContextID(), server.getName(), channel_name, channel.getUserData(user_data['username'])))
 	rc['JOIN'] = _JOIN
 	
-	def _KICK(server, data, target, user_data): #:basket!~basket@prepare.for.descent.into.usercom.zirc.org KICK #animesuki.os PyRC :rejoin
-		channel_name = unicode(target.lower())
-		data = data.split(None, 1)
-		
-		channel = server.getChannel(channel_name)
+	def _KICK(server, message, target, user_data): #:basket!~basket@prepare.for.descent.into.usercom.zirc.org KICK #animesuki.os PyRC :rejoin
+		channel = server.getChannel(target.lower())
 		if not channel:
 			return
 			
-		if data[0].lower() == server.getNickname().lower():
-			server.addEvent(outboundDictionaries.IRC_Channel_Close(server.getContextID(), server.getName(), channel.getName(), data[1][1:], True, user_data))
+		victim = message.params[1]
+		reason = message.getText(2)
+		if victim.lower() == server.getNickname().lower():
+			server.addEvent(outboundDictionaries.IRC_Channel_Close(server.getContextID(), server.getName(), channel.getName(), reason, True, user_data))
 			server.removeChannel(channel.getName())
 		else:
-			target_data = channel.getUserData(data[0])
-			server.addEvent(outboundDictionaries.IRC_Channel_User_Part(server.getContextID(), server.getName(), channel.getName(), data[1][1:], target_data, True, user_data))
-			channel.removeUser(user_data['username'])
+			target_data = channel.getUserData(victim)
+			server.addEvent(outboundDictionaries.IRC_Channel_User_Part(server.getContextID(), server.getName(), channel.getName(), reason, target_data, True, user_data))
+			channel.removeUser(victim)
 	rc['KICK'] = _KICK
 	
-	def _KILL(server, data, target, user_data): #:OperServ!services@zirc.org KILL Dead_HamsterX :equilibrium!eclipse!services!OperServ (Session limit exceeded)
-		server.addEvent(Server_Kill(server.getContextID(), server.getName(), unicode(target), data, user_data))
+	def _KILL(server, message, target, user_data): #:OperServ!services@zirc.org KILL Dead_HamsterX :equilibrium!eclipse!services!OperServ (Session limit exceeded)
+		server.addEvent(outboundDictionaries.Server_Kill(server.getContextID(), server.getName(), target, message.getText(1), user_data))
 		if target.lower() == server.getNickname().lower():
 			return (None, False)
 	rc['KILL'] = _KILL
 	
-	def _MODE(server, data, target, user_data):
+	def _MODE(server, message, target, user_data):
 		channel = server.getChannel(target)
 		if not channel:
 			return
 			
-		modes = common.splitModes(data)
+		modes = common.splitModes(message.getText(1), server.getISupport())
 		(added_channel_modes, removed_channel_modes, added_user_modes, removed_user_modes) = channel.updateModes(modes)
 		
 		changestring = ''
@@ -267,11 +268,11 @@ def _generateResponseCodes():
 		server.addEvent(outboundDictionaries.IRC_Channel_Modes_Update(server.getContextID(), server.getName(), channel.getName(), modes, changestring, user_mode_changes, channel.getModes(), channel.getModeStringFull(), channel.getModeStringSafe(), user_data))
 	rc['MODE'] = _MODE
 	
-	def _NICK(server, data, target, user_data):
+	def _NICK(server, message, target, user_data):
 		if not user_data:
 			return
 			
-		new_nickname = unicode(target.replace(':', ''))
+		new_nickname = target
 		server.updateUserNickname(user_data['username'], new_nickname)
 		user = server.getUser(new_nickname)
 		
@@ -283,15 +284,16 @@ def _generateResponseCodes():
 		server.addEvent(outboundDictionaries.IRC_User_Nickname_Change(server.getContextID(), server.getName(), new_nickname, user.getChannels(), user_data, local_change))
 	rc['NICK'] = _NICK
 	
-	def _NOTICE(server, data, target, user_data):
-		if data[0] == "\001": #CTCP response.
+	def _NOTICE(server, message, target, user_data):
+		data = message.getText(1)
+		if data.startswith("\001"): #CTCP response.
 			data = data.replace("\001", '').split(None, 1)
 			ctcp_core.ctcpResponseHandler(data[0], data[1], user_data, server)
 		else:
-			server.addEvent(outboundDictionaries.IRC_User_Notice(server.getContextID(), server.getName(), data, unicode(target), user_data))
+			server.addEvent(outboundDictionaries.IRC_User_Notice(server.getContextID(), server.getName(), data, target, user_data))
 	rc['NOTICE'] = _NOTICE
 	
-	def _PART(server, data, target, user_data):
+	def _PART(server, message, target, user_data):
 		channel = server.getChannel(target)
 		if not channel:
 			return
@@ -299,17 +301,19 @@ def _generateResponseCodes():
 		if not user_data:
 			return
 			
+		reason = message.getParam(1)
 		if user_data['username'].lower() == server.getNickname().lower():
-			server.addEvent(outboundDictionaries.IRC_Channel_Close(server.getContextID(), server.getName(), channel.getName(), data, False, None))
+			server.addEvent(outboundDictionaries.IRC_Channel_Close(server.getContextID(), server.getName(), channel.getName(), reason, False, None))
 			server.removeChannel(channel.getName())
 		else:
-			server.addEvent(outboundDictionaries.IRC_Channel_User_Part(server.getContextID(), server.getName(), channel.getName(), data, user_data, False, None))
+			server.addEvent(outboundDictionaries.IRC_Channel_User_Part(server.getContextID(), server.getName(), channel.getName(), reason, user_data, False, None))
 			channel.removeUser(user_data['username'])
 	rc['PART'] = _PART
 	
-	def _PRIVMSG(server, data, target, user_data):
+	def _PRIVMSG(server, message, target, user_data):
+		data = message.getText(1)
 		is_action = False
-		if data[0] == "\001": #Either an action or a CTCP.
+		if data.startswith("\001"): #Either an action or a CTCP.
 			data = data.replace("\001", '').split(None, 1)
 			data[0] = data[0].upper()
 			if data[0] == "ACTION":
@@ -319,10 +323,10 @@ def _generateResponseCodes():
 				payload = None
 				if len(data) > 1:
 					payload = data[1]
-				ctcp_core.ctcpHandler(data[0], payload, user_data, unicode(target), server)
+				ctcp_core.ctcpHandler(data[0], payload, user_data, target, server)
 				return
 				
-		if target[0] in GLOBAL.IRC_CHANNEL_PREFIX:
+		if server.getISupport().isChannel(target):
 			channel = server.getChannel(target)
 			if not channel:
 				return
@@ -333,24 +337,21 @@ def _generateResponseCodes():
 			server.addEvent(outboundDictionaries.IRC_User_Private_Message(server.getContextID(), server.getName(), data, is_action, user_data))
 	rc['PRIVMSG'] = _PRIVMSG
 	
-	def _QUIT(server, data, target, user_data):
+	def _QUIT(server, message, target, user_data):
 		user = server.getUser(user_data['username'])
 		if not user:
 			return
 			
-		message = target
-		if data:
-			message = "%s %s" % (message, data)
-		server.addEvent(outboundDictionaries.IRC_User_Quit(server.getContextID(), server.getName(), unicode(message), user.getChannels(), user_data))
+		server.addEvent(outboundDictionaries.IRC_User_Quit(server.getContextID(), server.getName(), message.getText(0), user.getChannels(), user_data))
 		user.removeUser()
 	rc['QUIT'] = _QUIT
 	
-	def _TOPIC(server, data, target, user_data):
+	def _TOPIC(server, message, target, user_data):
 		channel = server.getChannel(target)
 		if not channel:
 			return
 			
-		channel.setTopic(data)
+		channel.setTopic(message.getText(1))
 		server.addEvent(outboundDictionaries.IRC_Channel_Topic_New(server.getContextID(), server.getName(), channel.getName(), channel.getTopic(), user_data))
 	rc['TOPIC'] = _TOPIC
 	
@@ -358,15 +359,17 @@ def _generateResponseCodes():
 _response_code_events = _generateResponseCodes() #: A dictionary of functions, keyed by event name.
 del _generateResponseCodes
 
-def handleNonColon(server, raw_string):
+def handleNonColon(server, message):
 	"""
-	This function parses and processes a non-colon-prefixed event sent by the
-	server.
+	This function processes a non-colon-prefixed event sent by the server.
+	
+	It handles strings that look like::
+		PING :irc.synirc.net
 	
 	@type server: pyrc_irc_abstract.irc_server.Server
 	@param server: A reference to the Server object that received this event.
-	@type raw_string: basestring
-	@param raw_string: The raw event string.
+	@type message: pyrc_irc_abstract.resources.message.Message
+	@param message: The parsed event.
 	
 	@rtype: None|Tuple
 	@return: Nothing if everything went well; a tuple containing an optional
@@ -378,36 +381,27 @@ def handleNonColon(server, raw_string):
 	@raise ProtocolError: If the string received from the IRC server did not
 	    match the spec expected by PyRC.
 	"""
-	(identifier, data) = raw_string.split(" :", 1)
-	
-	handler = _non_colon_events.get(identifier)
+	handler = _non_colon_events.get(message.command)
 	if handler:
 		try:
-			if data:
-				data = unicode(data, 'utf-8', 'replace')
-			return handler(server, data)
+			return handler(server, message)
 		except Exception, e:
-			raise ProtocolError("Error while processing '%s': %s" % (raw_string, e))
+			raise ProtocolError(u"Error while processing '%s': %s" % (message.raw, e))
 	else:
-		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), raw_string)
-		server.addEvent(outboundDictionaries.PyRC_Implement_Me(identifier, raw))
+		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), message.raw)
+		server.addEvent(outboundDictionaries.PyRC_Implement_Me(message.command, raw))
 		
-def handleServerCode(server, nickname, text, raw_string):
+def handleServerCode(server, message):
 	"""
-	This function parses and processes a colon-prefixed event sent by the
-	server.
+	This function processes a colon-prefixed event sent by the server.
 	
 	It handles strings that look like::
 		:YUO MODE YUO :+ixz
 	
 	@type server: pyrc_irc_abstract.irc_server.Server
 	@param server: A reference to the Server object that received this event.
-	@type nickname: basestring
-	@param nickname: The name of the user described by this event.
-	@type text: basestring
-	@param text: The token used to identify the type of event.
-	@type raw_string: basestring
-	@param raw_string: The raw event string.
+	@type message: pyrc_irc_abstract.resources.message.Message
+	@param message: The parsed event.
 	
 	@rtype: None|Tuple
 	@return: Nothing if everything went well; a tuple containing an optional
@@ -419,46 +413,28 @@ def handleServerCode(server, nickname, text, raw_string):
 	@raise ProtocolError: If the string received from the IRC server did not
 	    match the spec expected by PyRC.
 	"""
-	identifier = text[0]
-	text = text[1].split(None, 1)
-	
-	target = text[0]
-	data = None
-	if len(text) > 1:
-		data = text[1]
-		if data:
-			if data.startswith(':'):
-				data = data[1:]
-				
-	handler = _server_code_events.get(identifier)
+	handler = _server_code_events.get(message.command)
 	if handler:
 		try:
-			if data:
-				data = unicode(data, 'utf-8', 'replace')
-			return handler(server, data, target, nickname)
+			return handler(server, message, message.getParam(0), message.prefix)
 		except Exception, e:
-			raise ProtocolError("Error while processing '%s': %s" % (raw_string, e))
+			raise ProtocolError(u"Error while processing '%s': %s" % (message.raw, e))
 	else:
-		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), raw_string)
-		server.addEvent(outboundDictionaries.PyRC_Implement_Me(identifier, raw))
+		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), message.raw)
+		server.addEvent(outboundDictionaries.PyRC_Implement_Me(message.command, raw))
 		
-def handleResponseCode(server, userstring, text, raw_string):
+def handleResponseCode(server, message):
 	"""
-	This function parses and processes a colon-prefixed event sent by a user.
+	This function processes a colon-prefixed event sent by a user.
 	
 	It handles strings that look like::
 		:Etna!~rhx@ZiRC-CAB5A9EC.cg.shawcable.net NOTICE rhx :PING rice
 	
 	@type server: pyrc_irc_abstract.irc_server.Server
 	@param server: A reference to the Server object that received this event.
-	@type userstring: basestring
-	@param userstring: The URI of the user that sent this event (a raw user
-	    string).
-	@type text: list
-	@param text: The token used to identify the type of event and the event's
-	    data.
-	@type raw_string: basestring
-	@param raw_string: The raw event string.
+	@type message: pyrc_irc_abstract.resources.message.Message
+	@param message: The parsed event; its prefix is the URI of the user that
+	    sent it (a raw user string).
 	
 	@rtype: None|Tuple
 	@return: Nothing if everything went well; a tuple containing an optional
@@ -470,43 +446,30 @@ def handleResponseCode(server, userstring, text, raw_string):
 	@raise ProtocolError: If the string received from the IRC server did not
 	    match the spec expected by PyRC.
 	"""
-	identifier = text[0]
+	target = message.getParam(0)
 	
-	text = text[1].split(None, 1)
-	target = text[0]
-	
-	data = None
-	if len(text) > 1:
-		data = text[1]
-		if data:
-			if data.startswith(':'):
-				data = data[1:]
-				
-	user_data = None
-	user_data = user_functions.splitUserData(userstring)
+	user_data = user_functions.splitUserData(message.prefix)
 	user = server.getUser(user_data[0])
 	if not user:
 		user_data = user_functions.generateUserData(user_data)
 	else:
 		user.setIdentity(user_data[1], user_data[2])
-		if target[0] in GLOBAL.IRC_CHANNEL_PREFIX:
+		if server.getISupport().isChannel(target):
 			user_data = user.getData(target)
 		else:
 			user_data = user.getData()
 			
-	handler = _response_code_events.get(identifier)
+	handler = _response_code_events.get(message.command)
 	if handler:
 		try:
-			if data:
-				data = unicode(data, 'utf-8', 'replace')
-			return handler(server, data, target, user_data)
+			return handler(server, message, target, user_data)
 		except Exception, e:
 			import pyrc_common.errlog
 			print pyrc_common.errlog.grabTrace()
-			raise ProtocolError("Error while processing '%s': %s" % (raw_string, e))
+			raise ProtocolError(u"Error while processing '%s': %s" % (message.raw, e))
 	else:
-		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), raw_string)
-		server.addEvent(outboundDictionaries.PyRC_Implement_Me(identifier, raw))
+		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), message.raw)
+		server.addEvent(outboundDictionaries.PyRC_Implement_Me(message.command, raw))
 		
 		
 class Error(Exception):
@@ -546,7 +509,7 @@ class Error(Exception):
 		
 		@return: Nothing.
 		"""
-		self.description = unicode(description, 'utf-8', 'replace')
+		self.description = unicode(description)
 		
 class ProcessingError(Error):
 	"""
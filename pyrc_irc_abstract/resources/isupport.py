@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_irc_abstract.resources.isupport
+
+Purpose
+=======
+ Digest the RPL_ISUPPORT (005) parameters advertised by an IRC server into
+ lookup tables that describe its ranks, channel modes, and limits.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2007
+"""
+import re
+
+import casemapping
+
+import pyrc_common.GLOBAL as GLOBAL
+
+MAX_RANKS = len(GLOBAL.IRC_RANK_ORDER) #: The number of ranks PyRC can track within a channel; ranks advertised beyond this are ignored.
+
+_PREFIX_REGEXP = re.compile(r"^\((\S*)\)(\S*)$") #: The regular expression used to split a PREFIX value into its modes and symbols.
+_ESCAPE_REGEXP = re.compile(r"\\x([0-9A-Fa-f]{2})") #: The regular expression used to identify escaped characters in ISUPPORT values.
+_DEFAULT_TOKENS = {
+ u'PREFIX': u"(%s)%s" % (''.join(GLOBAL.IRC_RANK_ORDER), ''.join(GLOBAL.IRC_RANK_PREFIX)),
+ u'CHANMODES': u"%s,k,l,imnpst" % ''.join(GLOBAL.IRC_IGNORED_MODES),
+ u'CHANTYPES': u''.join(GLOBAL.IRC_CHANNEL_PREFIX),
+ u'CASEMAPPING': u"rfc1459",
+ u'MODES': u"3"
+} #: The parameters assumed for servers that do not advertise their own.
+
+class ISupport(object):
+	"""
+	This class holds the lookup tables derived from an IRC server's ISUPPORT
+	parameters.
+	
+	ISupport objects are never modified once built: update() returns a new
+	object, so a Server can replace its tables with a single assignment while
+	other threads are reading them.
+	"""
+	_tokens = None #: A dictionary of every parameter in effect, keyed by name, with unicode values, or None for parameters that have no value.
+	_rank_modes = None #: A tuple of the rank modes the server supports, in order of precedence.
+	_rank_symbols = None #: A tuple of the rank symbols the server supports, in order of precedence.
+	_rank_mode_flags = None #: A lookup for deriving rank bits from rank modes; the most dominant rank occupies the lowest bit.
+	_rank_symbol_flags = None #: A lookup for deriving rank bits from rank symbols.
+	_rank_symbol_table = None #: A lookup for deriving the dominant rank symbol, or None, from a rank bitmask.
+	_list_modes = None #: A frozenset of the channel modes that maintain lists of addresses (CHANMODES type A), which PyRC leaves to the server.
+	_parameter_modes = None #: A frozenset of the channel modes that always take a parameter: list modes, rank modes, and CHANMODES type B.
+	_set_parameter_modes = None #: A frozenset of the channel modes that take a parameter only when set (CHANMODES type C).
+	_channel_types = None #: A frozenset of the characters that introduce channel names.
+	_case_mapping = None #: The name of the casemapping the server uses to compare names.
+	_fold = None #: The casemapping.getFoldFunction() function that implements the casemapping.
+	_nickname_length = None #: The longest nickname the server accepts, or None if it is unknown.
+	_modes_per_line = None #: The number of parameterised modes the server accepts in one MODE command, or None if it is unlimited.
+	_target_max = None #: A dictionary of the number of targets the server accepts per command, keyed by upper-case command, with None indicating no limit.
+	
+	def __init__(self, tokens=None):
+		"""
+		This function is invoked when a new ISupport object is created.
+		
+		@type tokens: dict|None
+		@param tokens: The parameters in effect, keyed by name, or None to use
+		    the defaults PyRC assumes for servers that advertise nothing.
+		
+		@return: Nothing.
+		"""
+		if tokens is None:
+			tokens = _DEFAULT_TOKENS
+		self._tokens = dict(tokens)
+		
+		(rank_modes, rank_symbols) = _parsePrefix(self._getValue(u'PREFIX'))
+		self._rank_modes = rank_modes
+		self._rank_symbols = rank_symbols
+		self._rank_mode_flags = {}
+		self._rank_symbol_flags = {}
+		for i in range(len(rank_modes)):
+			self._rank_mode_flags[rank_modes[i]] = 1 << i
+			self._rank_symbol_flags[rank_symbols[i]] = 1 << i
+		symbol_table = []
+		for i in range(1 << MAX_RANKS):
+			symbol = None
+			for j in range(len(rank_symbols)):
+				if i & (1 << j):
+					symbol = rank_symbols[j]
+					break
+			symbol_table.append(symbol)
+		self._rank_symbol_table = tuple(symbol_table)
+		
+		chanmodes = (self._getValue(u'CHANMODES').split(',') + [u'', u'', u''])[:4]
+		self._list_modes = frozenset(chanmodes[0])
+		self._parameter_modes = frozenset(chanmodes[0] + chanmodes[1] + u''.join(rank_modes))
+		self._set_parameter_modes = frozenset(chanmodes[2])
+		
+		self._channel_types = frozenset(self._getValue(u'CHANTYPES'))
+		self._case_mapping = self._getValue(u'CASEMAPPING').lower()
+		self._fold = casemapping.getFoldFunction(self._case_mapping)
+		self._nickname_length = _parseInteger(self._tokens.get(u'NICKLEN'))
+		self._modes_per_line = _parseInteger(self._tokens.get(u'MODES'))
+		
+		self._target_max = {}
+		for i in (self._tokens.get(u'TARGMAX') or u'').split(','):
+			(command, limit) = (i.split(':', 1) + [u''])[:2]
+			if command:
+				self._target_max[command.upper()] = _parseInteger(limit)
+				
+	def getCaseMapping(self):
+		"""
+		This function returns the name of the casemapping the server uses to
+		compare nicknames and channel names.
+		
+		@rtype: unicode
+		@return: The lower-case name of the casemapping, like u'rfc1459' or
+		    u'ascii'.
+		"""
+		return self._case_mapping
+		
+	def fold(self, name):
+		"""
+		This function folds a nickname or channel name into the key under which
+		the server considers it equal to others, according to its casemapping.
+		
+		Objects that are looked up by name should store their keys, rather than
+		folding their names for every comparison.
+		
+		@type name: basestring
+		@param name: The name to be folded.
+		
+		@rtype: unicode
+		@return: The folded name.
+		"""
+		return self._fold(name)
+		
+	def getFoldFunction(self):
+		"""
+		This function returns the function that implements the server's
+		casemapping.
+		
+		Servers with the same casemapping share the same function, so it may be
+		used as a key by callers that cache folded names.
+		
+		@rtype: function
+		@return: The casemapping.getFoldFunction() function for the casemapping.
+		"""
+		return self._fold
+		
+	def getChannelTypes(self):
+		"""
+		This function returns the characters that introduce channel names.
+		
+		@rtype: frozenset
+		@return: The server's channel prefixes.
+		"""
+		return self._channel_types
+		
+	def getModesPerLine(self):
+		"""
+		This function returns the number of parameterised modes the server
+		accepts in a single MODE command.
+		
+		@rtype: int|None
+		@return: The limit, or None if the server imposes none.
+		"""
+		return self._modes_per_line
+		
+	def getNicknameLength(self):
+		"""
+		This function returns the length of the longest nickname the server
+		accepts.
+		
+		@rtype: int|None
+		@return: The limit, or None if the server has not advertised one.
+		"""
+		return self._nickname_length
+		
+	def getRankFlag(self, mode):
+		"""
+		This function returns the bit that represents a rank in a rank bitmask.
+		
+		@type mode: basestring
+		@param mode: The rank's mode (o, h, v...).
+		
+		@rtype: int
+		@return: The rank's bit, or 0 if the mode is not a rank.
+		"""
+		return self._rank_mode_flags.get(mode, 0)
+		
+	def getRankModes(self):
+		"""
+		This function returns the rank modes the server supports.
+		
+		@rtype: tuple
+		@return: The server's rank modes, in order of precedence.
+		"""
+		return self._rank_modes
+		
+	def getRankSymbol(self, ranks):
+		"""
+		This function returns the symbol of the most dominant rank in a rank
+		bitmask.
+		
+		@type ranks: int
+		@param ranks: A rank bitmask, as returned by parseNamesToken().
+		
+		@rtype: unicode|None
+		@return: The rank's symbol, or None if the bitmask is empty.
+		"""
+		return self._rank_symbol_table[ranks & ((1 << MAX_RANKS) - 1)]
+		
+	def getRankSymbols(self):
+		"""
+		This function returns the rank symbols the server supports.
+		
+		@rtype: tuple
+		@return: The server's rank symbols, in order of precedence.
+		"""
+		return self._rank_symbols
+		
+	def getTargetMax(self, command):
+		"""
+		This function returns the number of targets the server accepts for a
+		command.
+		
+		@type command: basestring
+		@param command: The command to be checked, like 'PRIVMSG'.
+		
+		@rtype: int|None
+		@return: The limit, or None if the server imposes none or has not
+		    advertised one.
+		"""
+		return self._target_max.get(command.upper())
+		
+	def getToken(self, name, default=None):
+		"""
+		This function returns the raw value of a single ISUPPORT parameter.
+		
+		@type name: basestring
+		@param name: The name of the parameter, like 'NETWORK'.
+		@type default: variable
+		@param default: The value to return if the parameter is not in effect.
+		
+		@rtype: unicode|None|variable
+		@return: The parameter's value, None if it is in effect but has no
+		    value, or the default value.
+		"""
+		return self._tokens.get(name.upper(), default)
+		
+	def getTokens(self):
+		"""
+		This function returns every ISUPPORT parameter in effect.
+		
+		@rtype: dict
+		@return: A dictionary of unicode values, or None for parameters that
+		    have no value, keyed by parameter name.
+		"""
+		return self._tokens.copy()
+		
+	def isChannel(self, name):
+		"""
+		This function indicates whether a target names a channel.
+		
+		@type name: basestring
+		@param name: The target to be checked.
+		
+		@rtype: bool
+		@return: True if the target starts with one of the server's channel
+		    prefixes.
+		"""
+		return bool(name) and name[0] in self._channel_types
+		
+	def isListMode(self, mode):
+		"""
+		This function indicates whether a channel mode maintains a list of
+		addresses, like bans, which PyRC leaves to the server.
+		
+		@type mode: basestring
+		@param mode: The mode to be checked.
+		
+		@rtype: bool
+		@return: True if the mode is a list mode.
+		"""
+		return mode in self._list_modes
+		
+	def isRankMode(self, mode):
+		"""
+		This function indicates whether a channel mode grants a rank to a user.
+		
+		@type mode: basestring
+		@param mode: The mode to be checked.
+		
+		@rtype: bool
+		@return: True if the mode is a rank mode.
+		"""
+		return mode in self._rank_mode_flags
+		
+	def parseNamesToken(self, token):
+		"""
+		This function splits a nickname, as listed in a NAMES reply, from the rank
+		symbols that precede it.
+		
+		@type token: basestring
+		@param token: The symbol-prefixed nickname.
+		
+		@rtype: tuple
+		@return: A tuple of the form (<nickname:unicode>, <ranks:int>), where
+		    ranks is a bitmask of the ranks whose symbols were found.
+		"""
+		token = unicode(token)
+		symbol_flags = self._rank_symbol_flags
+		ranks = 0
+		for (i, symbol) in enumerate(token):
+			flag = symbol_flags.get(symbol)
+			if not flag:
+				return (token[i:], ranks)
+			ranks |= flag
+		return (token, ranks)
+		
+	def takesParameter(self, mode, grant):
+		"""
+		This function indicates whether a channel mode consumes a parameter.
+		
+		Modes the server has not classified are assumed to take no parameter.
+		
+		@type mode: basestring
+		@param mode: The mode to be checked.
+		@type grant: bool
+		@param grant: True if the mode is being set; False if it is being
+		    removed.
+		
+		@rtype: bool
+		@return: True if the mode consumes a parameter.
+		"""
+		return mode in self._parameter_modes or (grant and mode in self._set_parameter_modes)
+		
+	def update(self, tokens):
+		"""
+		This function applies the parameters listed in an RPL_ISUPPORT reply.
+		
+		Parameters of the form '-NAME' withdraw an earlier parameter, restoring
+		PyRC's default for it, if it has one.
+		
+		@type tokens: sequence
+		@param tokens: The parameters to apply, like 'CHANTYPES=#&' or 'WHOX'.
+		
+		@rtype: ISupport
+		@return: A new ISupport object that reflects the parameters; this object
+		    is not modified.
+		"""
+		parameters = self._tokens.copy()
+		for i in tokens:
+			i = unicode(i)
+			if i.startswith('-'):
+				name = i[1:].upper()
+				if name in _DEFAULT_TOKENS:
+					parameters[name] = _DEFAULT_TOKENS[name]
+				elif name in parameters:
+					del parameters[name]
+			elif i:
+				(name, value) = (i.split('=', 1) + [None])[:2]
+				if not value is None:
+					value = _ESCAPE_REGEXP.sub(lambda match: unichr(int(match.group(1), 16)), value)
+				parameters[name.upper()] = value
+		return ISupport(parameters)
+		
+	def _getValue(self, name):
+		"""
+		This function returns the value of a parameter that PyRC needs in order
+		to build its tables.
+		
+		@type name: unicode
+		@param name: The name of the parameter.
+		
+		@rtype: unicode
+		@return: The parameter's value, or an empty string if it has none.
+		"""
+		return self._tokens.get(name) or u''
+		
+		
+def _parseInteger(value):
+	"""
+	This function reads a numeric ISUPPORT value.
+	
+	@type value: basestring|None
+	@param value: The value to be read.
+	
+	@rtype: int|None
+	@return: The value, or None if it was empty or malformed.
+	"""
+	if value and value.isdigit():
+		return int(value)
+	return None
+	
+def _parsePrefix(value):
+	"""
+	This function splits a PREFIX value into its rank modes and symbols.
+	
+	Only the MAX_RANKS most dominant ranks are kept.
+	
+	@type value: unicode
+	@param value: The value to be split, like u'(ov)@+'.
+	
+	@rtype: tuple
+	@return: A tuple of the form (<modes:tuple>, <symbols:tuple>). Both tuples
+	    are empty if the value is malformed.
+	"""
+	match = _PREFIX_REGEXP.match(value)
+	if not match or not len(match.group(1)) == len(match.group(2)):
+		return ((), ())
+	return (tuple(match.group(1)[:MAX_RANKS]), tuple(match.group(2)[:MAX_RANKS]))
+	
+	
\ No newline at end of file
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+PyRC module: pyrc_irc_abstract.resources.message
+
+Purpose
+=======
+ Break lines received from an IRC server into their constituent parts, once,
+ so that event handlers never need to re-split the raw string.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the terms of
+ the GPLv2, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2004-2007
+"""
+_TAG_ESCAPES = {
+ ':': ';',
+ 's': ' ',
+ '\\': '\\',
+ 'r': '\r',
+ 'n': '\n'
+} #: A mapping of IRCv3 tag-value escape characters to the characters they represent.
+
+class Message(object):
+	"""
+	This class represents a single line received from an IRC server.
+	
+	Its parameters include the trailing parameter, if one was present, so
+	handlers can index them directly; the trailing parameter is also exposed on
+	its own, since many handlers only need the free-text portion of a line.
+	"""
+	__slots__ = (
+	 'tags', #: A dictionary of IRCv3 message tags, or None if the line had none.
+	 'prefix', #: The source of the line, without its leading colon, or None if the line had none.
+	 'command', #: The line's command, like 'PRIVMSG' or '353'.
+	 'code', #: The line's command as an int if it was numeric; None otherwise.
+	 'params', #: A list of all of the line's parameters, including the trailing parameter.
+	 'trailing', #: The line's trailing parameter, or None if it had none.
+	 'raw' #: The line exactly as it was received.
+	)
+	
+	def __init__(self, tags, prefix, command, params, trailing, raw):
+		"""
+		This function is invoked when creating a new Message object.
+		
+		Messages should be built with parseMessage(), rather than directly.
+		
+		@type tags: dict|None
+		@param tags: A dictionary of IRCv3 message tags, or None.
+		@type prefix: basestring|None
+		@param prefix: The source of the line, or None.
+		@type command: basestring
+		@param command: The line's command.
+		@type params: list
+		@param params: All of the line's parameters.
+		@type trailing: basestring|None
+		@param trailing: The line's trailing parameter, or None.
+		@type raw: basestring
+		@param raw: The line exactly as it was received.
+		
+		@return: Nothing.
+		"""
+		self.tags = tags
+		self.prefix = prefix
+		self.command = command
+		self.code = None
+		if command.isdigit():
+			self.code = int(command)
+		self.params = params
+		self.trailing = trailing
+		self.raw = raw
+		
+	def getParam(self, index, default=None):
+		"""
+		This function returns one of the line's parameters, tolerating lines
+		that were shorter than expected.
+		
+		@type index: int
+		@param index: The position of the parameter to retrieve.
+		@type default: variable
+		@param default: The value to return if there is no such parameter.
+		
+		@rtype: basestring|variable
+		@return: The requested parameter, or the default value.
+		"""
+		if index < len(self.params):
+			return self.params[index]
+		return default
+		
+	def getText(self, index):
+		"""
+		This function returns every parameter from the given position onwards,
+		joined by spaces, which is how the text of informational replies is
+		usually presented.
+		
+		@type index: int
+		@param index: The position of the first parameter to include.
+		
+		@rtype: basestring
+		@return: The joined parameters, or an empty string if there are none.
+		"""
+		return ' '.join(self.params[index:])
+		
+def parseMessage(line):
+	"""
+	This function tokenises a line received from an IRC server in a single
+	pass.
+	
+	The line may have the following form::
+	 [@tags ][:prefix ]command[ param...][ :trailing]
+	
+	@type line: basestring
+	@param line: The line to be parsed, without its line terminator.
+	
+	@rtype: Message
+	@return: The parsed line.
+	
+	@raise ProtocolError: If the line has no command.
+	"""
+	body = line
+	tags = None
+	if body.startswith('@'):
+		(tag_string, space, body) = body.partition(' ')
+		tags = _parseTags(tag_string[1:])
+		body = body.lstrip(' ')
+		
+	prefix = None
+	if body.startswith(':'):
+		(prefix, space, body) = body.partition(' ')
+		prefix = prefix[1:]
+		
+	(body, separator, trailing) = body.partition(' :')
+	params = body.split()
+	if not params:
+		raise ProtocolError(u"Line has no command: %s" % line)
+		
+	if separator:
+		params.append(trailing)
+	else:
+		trailing = None
+	return Message(tags, prefix, params.pop(0), params, trailing, line)
+	
+def _parseTags(tag_string):
+	"""
+	This function builds a dictionary from the tag section of an IRCv3 line.
+	
+	@type tag_string: basestring
+	@param tag_string: The tag section, without its leading '@'.
+	
+	@rtype: dict
+	@return: A dictionary of tag names mapped to their unescaped values. Tags
+	    without values are mapped to None.
+	"""
+	tags = {}
+	for i in tag_string.split(';'):
+		if not i:
+			continue
+			
+		equals = i.find('=')
+		if equals == -1:
+			tags[i] = None
+			continue
+			
+		value = i[equals + 1:]
+		if '\\' in value:
+			characters = []
+			escaped = False
+			for j in value:
+				if escaped:
+					characters.append(_TAG_ESCAPES.get(j, j))
+					escaped = False
+				elif j == '\\':
+					escaped = True
+				else:
+					characters.append(j)
+			value = ''.join(characters)
+		tags[i[:equals]] = value or None
+	return tags
+	
+	
+class Error(Exception):
+	"""
+	This class serves as the base from which all exceptions native to this
+	module are derived.
+	"""
+	description = None #: A description of the error.
+	
+	def __str__(self):
+		"""
+		This function returns an ASCII version of the description of this Error.
+		
+		When possible, the Unicode version should be used instead.
+		
+		@rtype: str
+		@return: The description of this error.
+		"""
+		return str(self.description)
+		
+	def __unicode__(self):
+		"""
+		This function returns the description of this Error.
+		
+		@rtype: unicode
+		@return: The description of this error.
+		"""
+		return self.description
+		
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new Error object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		self.description = unicode(description)
+		
+class ProtocolError(Error):
+	"""
+	This class represents problems that might occur when processing strings
+	received from the IRC server.
+	"""
+	def __init__(self, description):
+		"""
+		This function is invoked when creating a new ProtocolError object.
+		
+		@type description: basestring
+		@param description: A description of the problem that this object
+		    represents.
+		
+		@return: Nothing.
+		"""
+		Error.__init__(self, description)
+		
+		
+#Benchmarking interface
+if __name__ == "__main__":
+	import re
+	import sys
+	import time
+	
+	_CORPUS = (
+	 "PING :irc.synirc.net",
+	 ":irc.synirc.net NOTICE AUTH :*** Looking up your hostname...",
+	 ":mistral.il.us.zirc.org 001 PyRC :Welcome to the ZiRC IRC Network PyRC!~PyRC@ZiRC-CAB5A9EC.cg.shawcable.net",
+	 ":mistral.il.us.zirc.org 005 PyRC PREFIX=(qaohv)~&@%+ CHANMODES=beI,k,l,imnpstrcCNOQRSTV CHANTYPES=# :are supported by this server",
+	 ":mistral.il.us.zirc.org 353 PyRC = #animesuki.os :PyRC @flan +basket ~Etna &flonne %Laharl Gordon Jennifer Thursday",
+	 ":mistral.il.us.zirc.org 352 PyRC #irpg ~ur_faec ZiRC-4E6BE5E5.cg.shawcable.net snowball.mo.us.zirc.org flan H :0 Red HamsterX",
+	 ":mistral.il.us.zirc.org 311 PyRC flan ~ur_faec ZiRC-4E6BE5E5.cg.shawcable.net * :Red HamsterX",
+	 ":PyRCX!~PyRC@ZiRC-CAB5A9EC.cg.shawcable.net JOIN :#animesuki.os",
+	 ":Etna!~rhx@ZiRC-CAB5A9EC.cg.shawcable.net PRIVMSG #animesuki.os :Has anyone seen the Prinny squad today?",
+	 ":Etna!~rhx@ZiRC-CAB5A9EC.cg.shawcable.net PRIVMSG #animesuki.os :\001ACTION throws a Prinny\001",
+	 ":Etna!~rhx@ZiRC-CAB5A9EC.cg.shawcable.net NOTICE rhx :PING rice",
+	 ":basket!~basket@prepare.for.descent.into.usercom.zirc.org KICK #animesuki.os PyRC :rejoin",
+	 ":flan!~ur_faec@ZiRC-4E6BE5E5.cg.shawcable.net MODE #animesuki.os +ov-h flan basket Etna",
+	 ":flonne!~flonne@Free.Phone.Chatline INVITE YUO :#pyrc",
+	 ":Laharl!~laharl@netherworld.example QUIT :Quit: Overlord business",
+	 "@time=2007-05-10T12:00:00.000Z;account=etna :Etna!~rhx@ZiRC-CAB5A9EC.cg.shawcable.net PRIVMSG #animesuki.os :tagged\\shello",
+	) #: A sample of lines recorded from IRC sessions, used if no corpus file is given.
+	
+	_COLON_PARSER = re.compile('(?:(^| ):.+?)') #: The regexp previously used by numeric_events to strip the token-endpoint-marking colon.
+	
+	def _tokeniseLegacy(line):
+		"""
+		This function reproduces the tokenisation PyRC performed before Message
+		objects were introduced, for comparison.
+		
+		@type line: basestring
+		@param line: The line to be tokenised.
+		
+		@return: Nothing.
+		"""
+		if not line.startswith(':'):
+			(identifier, data) = line.split(" :", 1)
+			return
+		data = line[1:].split(None, 2)
+		if data[1].isdigit():
+			(target, text) = data[2].split(None, 1)
+			m = _COLON_PARSER.search(text)
+			if m:
+				offset = len(m.group(1)) + m.start()
+				text = text[:offset] + text[offset + 1:]
+			text.split()
+		else:
+			text = data[2].split(None, 1)
+			target = text[0]
+			if len(text) > 1 and text[1].startswith(':'):
+				text = text[1][1:]
+			if data[0].find("!") != -1:
+				re.match("(.*?)!(.*?)@(.*)", data[0])
+				
+	corpus = _CORPUS
+	if len(sys.argv) > 1: #Use a recorded session, one raw line per line.
+		corpus_file = open(sys.argv[1])
+		corpus = tuple([i.rstrip("\r\n") for i in corpus_file if i.strip()])
+		corpus_file.close()
+		
+	repetitions = max(1, 200000 / len(corpus))
+	legacy_corpus = [i for i in corpus if not i.startswith('@')] #The old code couldn't handle tags.
+	for (name, function, lines) in (("Legacy splitting", _tokeniseLegacy, legacy_corpus), ("parseMessage()", parseMessage, corpus)):
+		start_time = time.time()
+		for i in xrange(repetitions):
+			for j in lines:
+				function(j)
+		elapsed = time.time() - start_time
+		print "%s: %i lines in %.3f seconds; %i lines/second" % (name, repetitions * len(lines), elapsed, repetitions * len(lines) / elapsed)
+		
\ No newline at end of file
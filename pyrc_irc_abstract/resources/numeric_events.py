@@ -20,6 +20,7 @@ import re
 import tld_table
 import user_functions
 import common
+import isupport
 
 import pyrc_common.GLOBAL as GLOBAL
 
@@ -52,9 +53,7 @@ import pyrc_common.dictionaries.outbound as outboundDictionaries
 ##Server MOTD
 ##Server Welcome
 
-_COLON_PARSER = re.compile('(?:(^| ):.+?)') #: A regexp used to strip the token-endpoint-marking colon.
-
-def _serverMessage(server, raw_string, code, server_url, target, data):
+def _serverMessage(server, message, text=None):
 	"""
 	This function emits a 'Server Message' dictionary for the given text.
 	
@@ -63,22 +62,17 @@ def _serverMessage(server, raw_string, code, server_url, target, data):
 	
 	@type server: pyrc_irc_abstract.irc_server.Server
 	@param server: A reference to the Server object that received this event.
-	@type raw_string: basestring
-	@param raw_string: The string that contains this event.
-	@type code: int
-	@param code: The numeric code used to identify this event within the IRC
-	    protocol.
-	@type server_url: basestring
-	@param server_url: The URI from which this event originated.
-	@type target: basestring
-	@param target: The name of the event's target, typically a user or a
-	    channel.
-	@type data: basestring
-	@param data: The payload of the event.
+	@type message: pyrc_irc_abstract.resources.message.Message
+	@param message: The parsed event.
+	@type text: unicode|None
+	@param text: The text to present, or None if every parameter after the
+	    event's target should be used.
 	
 	@return: Nothing
 	"""
-	server.addEvent(outboundDictionaries.Server_Message(server.getContextID(), server.getName(), data))
+	if text is None:
+		text = message.getText(1)
+	server.addEvent(outboundDictionaries.Server_Message(server.getContextID(), server.getName(), text))
 	
 def _generateEvents():
 	"""
@@ -89,18 +83,11 @@ def _generateEvents():
 	 server:
 	  pyrc_irc_abstract.irc_server.Server : A reference to the Server object
 	                                        that received the event.
-	 raw_string:
-	  basestring : The string that contains the event.
-	 code:
-	  int : The numeric code used to identify this event within the IRC
-	        protocol.
-	 server_url:
-	  basestring : The URI from which this event originated.
-	 target:
-	  basestring : The name of the event's target, typically a user or a
-	               channel.
-	 data:
-	  basestring : The payload of the event.
+	 message:
+	  pyrc_irc_abstract.resources.message.Message : The parsed event. Its
+	                                                first parameter is the
+	                                                event's target, typically
+	                                                the local user.
 	
 	 Return:
 	 	None : Nothing is returned unless PyRC needs to disconnect.
@@ -112,8 +99,10 @@ def _generateEvents():
 	"""
 	events = {}
 	
-	def _001(server, raw_string, code, server_url, target, data): #welcome
+	def _001(server, message): #welcome
 		server.setNickname(server.getConnectionData().setAuthenticated())
+		server.setISupport(isupport.ISupport()) #Forget anything advertised before a reconnection.
+		data = message.getText(1)
 		name = data.split()[3]
 		if name not in ["the", "Internet", "IRC"]:
 			server.setName(name)
@@ -136,11 +125,19 @@ def _generateEvents():
 	events[2] = _serverMessage #yourhost
 	events[3] = _serverMessage #created
 	
-	def _004(server, raw_string, code, server_url, target, data): #myinfo
-		data = data.split()
-		server.addEvent(outboundDictionaries.Server_Information(server.getContextID(), server.getName(), data[0], data[1], data[2], data[3]))
+	def _004(server, message): #myinfo
+		params = message.params
+		server.addEvent(outboundDictionaries.Server_Information(server.getContextID(), server.getName(), params[1], params[2], params[3], params[4]))
 	events[4] = _004
 	
+	def _005(server, message): #isupport
+		tokens = message.params[1:]
+		if not message.trailing is None: #Drop the "are supported by this server" text.
+			tokens = tokens[:-1]
+		server.setISupport(server.getISupport().update(tokens))
+		_serverMessage(server, message)
+	events[5] = _005
+	
 	events[10] = _serverMessage #statmem
 	
 	events[251] = _serverMessage #luserclient
@@ -156,14 +153,15 @@ def _generateEvents():
 	
 	events[292] = _serverMessage #helptlr
 	
-	def _301(server, raw_string, code, server_url, target, data): #away
-		data = data.split(None, 1)
-		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), data[0], "%s is away: %s" % (data[0], data[1])))
+	def _301(server, message): #away
+		nickname = message.params[1]
+		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), nickname, "%s is away: %s" % (nickname, message.getText(2))))
 	events[301] = _301
 	
-	def _303(server, raw_string, code, server_url, target, data): #ison
+	def _303(server, message): #ison
 		nickname = None
 		is_on = False
+		data = message.getText(1)
 		if data:
 			nickname = data.rstrip()
 			is_on = True
@@ -171,332 +169,319 @@ def _generateEvents():
 		server.addEvent(outboundDictionaries.IRC_IsOn_Response(server.getContextID(), server.getName(), is_on, nickname))
 	events[303] = _303
 	
-	def _307(server, raw_string, code, server_url, target, data): #userip
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _307(server, message): #userip
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['registered'].append(data[1])
+		whois['registered'].append(message.getText(2))
 	events[307] = _307
 	
-	def _310(server, raw_string, code, server_url, target, data): #whoishelp
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _310(server, message): #whoishelp
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['help'] = data[1]
+		whois['help'] = message.getText(2)
 	events[310] = _310
 	
-	def _311(server, raw_string, code, server_url, target, data): #whoisuser
-		data = data.split(None, 4)
-		whois = server.getStash().getWhoIs(data[0])
+	def _311(server, message): #whoisuser
+		#:mistral.il.us.zirc.org 311 PyRC flan ~ur_faec ZiRC-4E6BE5E5.cg.shawcable.net * :Red HamsterX
+		params = message.params
+		whois = server.getStash().getWhoIs(params[1])
 		if not whois:
-			whois = server.getStash().createWhoIs(data[0])
+			whois = server.getStash().createWhoIs(params[1])
 			
-		user = server.getUser(data[0])
+		real_name = message.getText(5)
+		user = server.getUser(params[1])
 		if user:
-			user.setIdentity(data[1], data[2])
-			user.setRealname(data[4])
+			user.setIdentity(params[2], params[3])
+			user.setRealname(real_name)
 			whois['userdata'] = user.getData()
 		else:
-			whois['userdata'] = informationDictionaries.User_Data(data[0], data[1], data[2], tld_table.tldLookup(data[2]), data[4], None, None, None, None)
+			whois['userdata'] = informationDictionaries.User_Data(params[1], params[2], params[3], tld_table.tldLookup(params[3]), real_name, None, None, None, None)
 	events[311] = _311
 	
-	def _312(server, raw_string, code, server_url, target, data): #whoisserver
-		data = data.split(None, 2)
-		if data[-1].isdigit():
-			whowas = server.getStash().getWhoWas(data[0])
+	def _312(server, message): #whoisserver
+		params = message.params
+		details = message.getText(3)
+		if details.isdigit():
+			whowas = server.getStash().getWhoWas(params[1])
 			if not whowas:
 				return
 				
-			whowas['lastseen'] = data[2][1:]
-			whowas['lastserver'] = data[1]
+			whowas['lastseen'] = details
+			whowas['lastserver'] = params[2]
 		else:
-			whois = server.getStash().getWhoIs(data[0])
+			whois = server.getStash().getWhoIs(params[1])
 			if not whois:
 				return
 				
-			whois['ircserver'] = data[1]
-			whois['servername'] = data[2]
+			whois['ircserver'] = params[2]
+			whois['servername'] = details
 	events[312] = _312
 	
-	def _313(server, raw_string, code, server_url, target, data): #whoisoperator
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _313(server, message): #whoisoperator
+		whois = server.getStash().getWhoIs(message.params[1])
 		if whois:
-			whois['operator'] = data[1]
+			whois['operator'] = message.getText(2)
 	events[313] = _313
 	
-	def _314(server, raw_string, code, server_url, target, data): #whowasuser
-		data = data.split(None, 4)
-		whowas = server.getStash().createWhoWas(data[0])
-		whowas['userdata'] = informationDictionaries.User_Data(data[0], data[1], data[2], tld_table.tldLookup(data[2]), data[4][1:], None, None, None, None)
+	def _314(server, message): #whowasuser
+		params = message.params
+		whowas = server.getStash().createWhoWas(params[1])
+		whowas['userdata'] = informationDictionaries.User_Data(params[1], params[2], params[3], tld_table.tldLookup(params[3]), message.getText(5), None, None, None, None)
 	events[314] = _314
 	
-	def _315(server, raw_string, code, server_url, target, data): #endofwho
-		data = data.split()
-		who = server.getStash().completeWho(data[0])
+	def _315(server, message): #endofwho
+		who = server.getStash().completeWho(message.params[1])
 		if who:
 			server.addEvent(outboundDictionaries.IRC_User_Who_Response(server.getContextID(), server.getName(), tuple(who['channels']), who['userdata']))
 		else:
-			server.addEvent(outboundDictionaries.IRC_User_Who_Fail(server.getContextID(), server.getName(), data[0]))
+			server.addEvent(outboundDictionaries.IRC_User_Who_Fail(server.getContextID(), server.getName(), message.params[1]))
 	events[315] = _315
 	
-	def _316(server, raw_string, code, server_url, target, data): #whoischanop
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _316(server, message): #whoischanop
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['chanop'] = data[1]
+		whois['chanop'] = message.getText(2)
 	events[316] = _316
 	
-	def _317(server, raw_string, code, server_url, target, data): #whoisidle
-		data = data.split(None, 3)
-		whois = server.getStash().getWhoIs(data[0])
+	def _317(server, message): #whoisidle
+		params = message.params
+		whois = server.getStash().getWhoIs(params[1])
 		if not whois:
 			return
 			
-		whois['idletime'] = (int(data[1]), int(data[2]), data[3])
+		whois['idletime'] = (int(params[2]), int(params[3]), message.getText(4))
 	events[317] = _317
 	
-	def _318(server, raw_string, code, server_url, target, data): #endofwhois
-		data = data.split()
-		whois = server.getStash().completeWhoIs(data[0])
+	def _318(server, message): #endofwhois
+		whois = server.getStash().completeWhoIs(message.params[1])
 		if whois:
 			server.addEvent(outboundDictionaries.IRC_User_WhoIs_Response(server.getContextID(), server.getName(), whois['ircserver'], whois['servername'], whois['idletime'], tuple(whois['channels']), whois['modes'], whois['bot'], whois['chanop'], whois['help'], whois['operator'], tuple(whois['registered']), whois['secure'], tuple(whois['data']), whois['userdata'], whois['address']))
 		else: #Note that this will be accompanied by 401.
-			server.addEvent(outboundDictionaries.IRC_User_Who_Fail(server.getContextID(), server.getName(), data[0]))
+			server.addEvent(outboundDictionaries.IRC_User_Who_Fail(server.getContextID(), server.getName(), message.params[1]))
 	events[318] = _318
 	
-	def _319(server, raw_string, code, server_url, target, data): #whoischannels
-		data = data.split()
-		data[1] = data[1][1:]
-		whois = server.getStash().getWhoIs(data[0])
+	def _319(server, message): #whoischannels
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		for i in data[1:]:
-			if i[0] in GLOBAL.IRC_CHANNEL_PREFIX + GLOBAL.IRC_RANK_PREFIX:
+		server_isupport = server.getISupport()
+		for i in message.getText(2).split():
+			if i[0] in server_isupport.getChannelTypes() or i[0] in server_isupport.getRankSymbols():
 				whois['channels'].append(i)
 	events[319] = _319
 	
-	def _320(server, raw_string, code, server_url, target, data): #whoisvworld
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _320(server, message): #whoisvworld
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['data'].append(data[1])
+		whois['data'].append(message.getText(2))
 	events[320] = _320
 	
-	def _324(server, raw_string, code, server_url, target, data): #channelmodeis
-		data = data.split(None, 1)
-		channel = server.getChannel(data[0])
+	def _324(server, message): #channelmodeis
+		channel = server.getChannel(message.params[1])
 		if not channel:
 			return
 			
-		channel.setModes(common.splitModes(data[1]))
+		channel.setModes(common.splitModes(message.getText(2), server.getISupport()))
 		if not server.getStash().getChannel(channel.getName()): #Forward the channel's modes as a separate event.
 			server.addEvent(outboundDictionaries.IRC_Channel_Modes(server.getContextID(), server.getName(), channel.getName(), channel.getModeStringFull(), channel.getModeStringSafe(), channel.getModes()))
 	events[324] = _324
 	
-	def _329(server, raw_string, code, server_url, target, data): #channelcreate
-		data = data.split(None, 1)
-		if server.getStash().getChannel(data[0]):
-			channel = server.getChannel(data[0])
+	def _329(server, message): #channelcreate
+		params = message.params
+		if server.getStash().getChannel(params[1]):
+			channel = server.getChannel(params[1])
 			if not channel:
 				return
 				
 			channel_data = server.getStash().completeChannel(channel.getName())
-			server.addEvent(outboundDictionaries.IRC_Channel_Join(server.getContextID(), server.getName(), int(data[1]), channel_data['topicwho'], channel_data['topictime'], channel.getData()))
+			server.addEvent(outboundDictionaries.IRC_Channel_Join(server.getContextID(), server.getName(), int(params[2]), channel_data['topicwho'], channel_data['topictime'], channel.getData(True)))
 		else: #Forward the channel's create time as an independent event.
-			server.addEvent(outboundDictionaries.IRC_Channel_Created(server.getContextID(), server.getName(), data[0].lower(), int(data[1])))
+			server.addEvent(outboundDictionaries.IRC_Channel_Created(server.getContextID(), server.getName(), params[1].lower(), int(params[2])))
 	events[329] = _329
 	
-	def _332(server, raw_string, code, server_url, target, data): #topic
-		data = data.split(None, 1)
-		channel = server.getChannel(data[0])
+	def _332(server, message): #topic
+		channel = server.getChannel(message.params[1])
 		if not channel:
 			return
 			
-		data = data[1]
-		channel.setTopic(data)
+		topic = message.getText(2)
+		channel.setTopic(topic)
 		if not server.getStash().getChannel(channel.getName()):
-			server.addEvent(outboundDictionaries.IRC_Channel_Topic(server.getContextID(), server.getName(), channel.getName(), data))
+			server.addEvent(outboundDictionaries.IRC_Channel_Topic(server.getContextID(), server.getName(), channel.getName(), topic))
 	events[332] = _332
 	
-	def _333(server, raw_string, code, server_url, target, data): #topicinfo
-		data = data.split()
-		channel = server.getChannel(data[0])
+	def _333(server, message): #topicinfo
+		params = message.params
+		channel = server.getChannel(params[1])
 		channel_name = None
-		user_data = user_functions.splitUserData(data[1])
+		user_data = user_functions.splitUserData(params[2])
 		if channel:
 			channel_name = channel.getName()
-			user_data_full = channel.getUser(user_data[0])
+			user_data_full = channel.getUserData(user_data[0])
 			if user_data_full:
 				user_data = user_data_full
+			else:
+				user_data = user_functions.generateUserData(user_data)
 		else:
-			channel_name = data[0].lower()
+			channel_name = params[1].lower()
 			user_data = user_functions.generateUserData(user_data)
 			
 		channel_data = server.getStash().getChannel(channel_name)
 		if channel_data:
 			channel_data['topicwho'] = user_data
-			channel_data['topictime'] = int(data[2])
+			channel_data['topictime'] = int(params[3])
 		else:
-			server.addEvent(outboundDictionaries.IRC_Channel_Topic_Information(server.getContextID(), server.getName(), channel_name, user_data, int(data[2])))
+			server.addEvent(outboundDictionaries.IRC_Channel_Topic_Information(server.getContextID(), server.getName(), channel_name, user_data, int(params[3])))
 	events[333] = _333
 	
-	def _335(server, raw_string, code, server_url, target, data): #whoisbot
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _335(server, message): #whoisbot
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['bot'] = data[1]
+		whois['bot'] = message.getText(2)
 	events[335] = _335
 	
-	def _352(server, raw_string, code, server_url, target, data): #whoreply
+	def _352(server, message): #whoreply
 		#:mistral.il.us.zirc.org 352 PyRC #irpg ~ur_faec ZiRC-4E6BE5E5.cg.shawcable.net snowball.mo.us.zirc.org flan H :0 Red HamsterX
-		real_name = data[data.find(':') + 3:]
-		data = data.split()
-		
-		who = server.getStash().createWho(data[4])
-		user = server.getUser(data[4])
-		last_action = None
+		params = message.params
+		real_name = message.getText(7).split(None, 1) #Discard the hop count.
+		if len(real_name) > 1:
+			real_name = real_name[1]
+		else:
+			real_name = u''
+			
+		who = server.getStash().createWho(params[5])
+		user = server.getUser(params[5])
 		if user:
-			user.setIdentity(data[1], data[2])
+			user.setIdentity(params[2], params[3])
 			user.setRealname(real_name)
-			user.setIRCServer(data[3])
+			user.setIRCServer(params[4])
 			who['userdata'] = user.getData()
 		else:
-			who['userdata'] = informationDictionaries.User_Data(data[4], data[1], data[2], tldFunctions.tldLookup(data[2]), real_name, data[3], None, None, None)
+			who['userdata'] = informationDictionaries.User_Data(params[5], params[2], params[3], tld_table.tldLookup(params[3]), real_name, params[4], None, None, None)
 			
-		if not data[0] == "*":
-			who['channels'] = [data[0]]
+		if not params[1] == "*":
+			who['channels'] = [params[1]]
 	events[352] = _352
 	
-	def _353(server, raw_string, code, server_url, target, data): #namreply
-		data = data.replace(":", "")
-		if len(data) > 1:
-			if data[1].startswith('#'): #Some servers might not use the 'target @ channel' format, opting to omit the '@'. In this case, the channel is first.
-				data = data.split()
-			else: #Discard the '@'.
-				data = data.split()[1:]
+	def _353(server, message): #namreply
+		#Some servers omit the channel-type token ('=', '*', '@') that precedes the
+		#channel, so the channel is always taken from the end of the line.
+		params = message.params
+		if len(params) < 3:
+			return
+			
+		channel_name = params[-2].lower()
+		names = params[-1].split()
+		if server.getStash().getChannel(channel_name):
+			channel = server.getChannel(channel_name)
+			if not channel:
+				return
 				
-		if data:
-			channel_name = data[0].lower()
-			data = data[1:]
-			if server.getStash().getChannel(channel_name):
-				channel = server.getChannel(channel_name)
-				if not channel:
-					return
-					
-				channel.addUsers(data)
-			else:
-				channel = server.getStash().getUserList(channel_name)
-				if not channel:
-					channel = server.getStash().createUserList(channel_name)
-				channel.addUsers(data)
+			channel.addUsers(names)
+		else:
+			channel = server.getStash().getUserList(channel_name)
+			if not channel:
+				channel = server.getStash().createUserList(channel_name)
+			channel.addUsers(names)
 	events[353] = _353
 	
-	def _366(server, raw_string, code, server_url, target, data): #endofnames
-		channel_name = data.split()[0].lower()
+	def _366(server, message): #endofnames
+		channel_name = message.params[1].lower()
 		channel = server.getStash().completeUserList(channel_name)
 		if server.getStash().getChannel(channel_name):
 			server.send("MODE :%s" % channel_name, GLOBAL.ENUM_SERVER_SEND_PRIORITY.NOW)
 		else:
 			if channel:
-				server.addEvent(outboundDictionaries.IRC_Channel_Names(server.getContextID(), server.getName(), channel_name, channel.getUsersData()))
+				server.addEvent(outboundDictionaries.IRC_Channel_Names(server.getContextID(), server.getName(), channel_name, channel.getUsersData(True)))
 	events[366] = _366
 	
-	def _367(server, raw_string, code, server_url, target, data): #banlist
-		data = data.split()
-		banlist = server.getStash().getBanlist(data[0])
-		banlist.append(data[1], data[2], int(data[3]))
+	def _367(server, message): #banlist
+		params = message.params
+		banlist = server.getStash().getBanlist(params[1])
+		banlist.append((params[2], params[3], int(params[4])))
 	events[367] = _367
 	
-	def _368(server, raw_string, code, server_url, target, data): #endofbanlist
-		data = data.split(None, 1)
-		channel_name = data[0].lower()
+	def _368(server, message): #endofbanlist
+		channel_name = message.params[1].lower()
 		server.addEvent(outboundDictionaries.IRC_Channel_Banlist(server.getContextID(), server.getName(), channel_name, server.getStash().completeBanlist(channel_name)))
 	events[368] = _368
 	
-	def _369(server, raw_string, code, server_url, target, data): #endofwhowas
-		data = data.split()
-		whowas = server.getStash().completeWhoWas(data[0])
+	def _369(server, message): #endofwhowas
+		whowas = server.getStash().completeWhoWas(message.params[1])
 		if whowas:
 			server.addEvent(outboundDictionaries.IRC_User_WhoWas_Response(server.getContextID(), server.getName(), whowas['lastserver'], whowas['lastseen'], whowas['userdata']))
 	events[369] = _369
 	
-	def _372_375(server, raw_string, code, server_url, target, data): #motd, motdstart
-		server.getStash().getMOTD().append(data)
+	def _372_375(server, message): #motd, motdstart
+		server.getStash().getMOTD().append(message.getText(1))
 	events[372] = _372_375
 	events[375] = _372_375
 	
-	def _376(server, raw_string, code, server_url, target, data): #endofmotd
+	def _376(server, message): #endofmotd
 		motd = server.getStash().completeMOTD()
 		if motd:
 			server.addEvent(outboundDictionaries.Server_MOTD(server.getContextID(), server.getName(), tuple(motd)))
 	events[376] = _376
 	
-	def _378(server, raw_string, code, server_url, target, data): #whoishost
-		data = data.split(None, 1)
-		
-		if data[0].lower() == server.getNickname().lower():
-			ip = re.search(r"(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})", data[1])
+	def _378(server, message): #whoishost
+		nickname = message.params[1]
+		address = message.getText(2)
+		if nickname.lower() == server.getNickname().lower():
+			ip = re.search(r"(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})", address)
 			if ip and int(ip.group(1)) <= 255 and int(ip.group(2)) <= 255 and int(ip.group(3)) <= 255 and int(ip.group(4)) <= 255:
 				server.setLocalIP('.'.join(ip.groups()))
 				
-		whois = server.getStash().getWhoIs(data[0])
+		whois = server.getStash().getWhoIs(nickname)
 		if not whois:
 			return
 			
-		whois['address'] = data[1]
+		whois['address'] = address
 	events[378] = _378
 	
-	def _379(server, raw_string, code, server_url, target, data): #whoishost
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _379(server, message): #whoishost
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['modes'] = data[1]
+		whois['modes'] = message.getText(2)
 	events[379] = _379
 	
-	def _401(server, raw_string, code, server_url, target, data): #nosuchnick
-		data = data.split(None, 1)
-		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), data[0], data[1]))
+	def _401(server, message): #nosuchnick
+		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), message.params[1], message.getText(2)))
 	events[401] = _401
 	
-	def _404_442_473_474_475_477_499(server, raw_string, code, server_url, target, data): #cannotsendtochan,notonchannel,inviteonlychan,bannedfromchan,badchannelkey,needreggednick,notchannelowner
-		data = data.split(None, 1)
-		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), data[0], data[1]))
+	def _404_442_473_474_475_477_499(server, message): #cannotsendtochan,notonchannel,inviteonlychan,bannedfromchan,badchannelkey,needreggednick,notchannelowner
+		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), message.params[1], message.getText(2)))
 	events[404] = _404_442_473_474_475_477_499
 	
-	def _406(server, raw_string, code, server_url, target, data): #wasnosuchnick
-		data = data.split()
-		server.addEvent(outboundDictionaries.IRC_User_WhoWas_Fail(server.getContextID(), server.getName(), data[0]))
+	def _406(server, message): #wasnosuchnick
+		server.addEvent(outboundDictionaries.IRC_User_WhoWas_Fail(server.getContextID(), server.getName(), message.params[1]))
 	events[406] = _406
 	
 	events[412] = _serverMessage #notexttosend
 	
-	def _421(server, raw_string, code, server_url, target, data): #unknowncommand
-		_serverMessage(server, raw_string, code, server_url, target, "Unknown command: %s" % data.split(None, 1)[0])
+	def _421(server, message): #unknowncommand
+		_serverMessage(server, message, "Unknown command: %s" % message.params[1])
 	events[421] = _421
 	
 	events[422] = _serverMessage #nomotd
 	
 	events[431] = _serverMessage #nonicknamegiven
 	
-	def _433(server, raw_string, code, server_url, target, data): #nicknameinuse
+	def _433(server, message): #nicknameinuse
 		if server.isConnected():
-			data = data.split(None, 1)
-			data = "%s (%s)" % (data[1], data[0])
-			_serverMessage(server, raw_string, code, server_url, target, data)
+			_serverMessage(server, message, "%s (%s)" % (message.getText(2), message.params[1]))
 		else:
 			nickname = server.getConnectionData().getNickname()
 			if nickname:
@@ -507,14 +492,13 @@ def _generateEvents():
 	
 	events[439] = _serverMessage #targettoofast
 	
-	def _440(server, raw_string, code, server_url, target, data): #servicesdown
-		data = data.split(None, 1)
-		_serverMessage(server, raw_string, code, server_url, target, '%s - % s' % (data[0], data[1]))
+	def _440(server, message): #servicesdown
+		_serverMessage(server, message, '%s - %s' % (message.params[1], message.getText(2)))
 	events[440] = _440
 	
-	def _441(server, raw_string, code, server_url, target, data): #usernotinchannel
-		data = data.split(None, 2)
-		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), data[1], "%s is not in %s" % (data[0], data[1])))
+	def _441(server, message): #usernotinchannel
+		params = message.params
+		server.addEvent(outboundDictionaries.IRC_Object_Information(server.getContextID(), server.getName(), params[2], "%s is not in %s" % (params[1], params[2])))
 	events[441] = _441
 	
 	events[442] = _404_442_473_474_475_477_499
@@ -527,45 +511,43 @@ def _generateEvents():
 	
 	events[480] = _serverMessage #cannotknock
 	
-	def _482(server, raw_string, code, server_url, target, data): #chanoprivsneeded
-		(channel, data) = data.split(None, 1)
-		server.addEvent(outboundDictionaries.IRC_Channel_Information(server.getContextID(), server.getName(), channel, data))
+	def _482(server, message): #chanoprivsneeded
+		server.addEvent(outboundDictionaries.IRC_Channel_Information(server.getContextID(), server.getName(), message.params[1], message.getText(2)))
 	events[482] = _482
 	
 	events[499] = _404_442_473_474_475_477_499
 	
-	def _600_601_604_605(server, raw_string, code, server_url, target, data): #logon, logoff, nowon, nowoff
-		data = data.split()
+	def _600_601_604_605(server, message): #logon, logoff, nowon, nowoff
+		params = message.params
 		type = None
-		if code == 600:
+		if message.code == 600:
 			type = u'logon'
-		elif code == 601:
+		elif message.code == 601:
 			type = u'logoff'
-		elif code == 604:
+		elif message.code == 604:
 			type = u'nowon'
-		elif code == 605:
+		elif message.code == 605:
 			type = u'nowoff'
 			
 		user_data = None
-		user = server.getUser(data[0])
+		user = server.getUser(params[1])
 		if user:
-			user.setIdentity(data[1], data[2])
+			user.setIdentity(params[2], params[3])
 			user_data = user.getData()
 		else:
-			user_data = informationDictionaries.User_Data(data[0], data[1], data[2], tld_table.tldLookup(data[2]), None, None, None, None, None)
-		server.addEvent(outboundDictionaries.IRC_User_Logon(server.getContextID(), server.getName(), type, int(data[3]), data[4][1:], user_data))
+			user_data = informationDictionaries.User_Data(params[1], params[2], params[3], tld_table.tldLookup(params[3]), None, None, None, None, None)
+		server.addEvent(outboundDictionaries.IRC_User_Logon(server.getContextID(), server.getName(), type, int(params[4]), message.getText(5), user_data))
 	events[600] = _600_601_604_605
 	events[601] = _600_601_604_605
 	events[604] = _600_601_604_605
 	events[605] = _600_601_604_605
 	
-	def _671(server, raw_string, code, server_url, target, data): #whoissecure
-		data = data.split(None, 1)
-		whois = server.getStash().getWhoIs(data[0])
+	def _671(server, message): #whoissecure
+		whois = server.getStash().getWhoIs(message.params[1])
 		if not whois:
 			return
 			
-		whois['secure'] = data[1]
+		whois['secure'] = message.getText(2)
 	events[671] = _671
 	
 	events[974] = _serverMessage #notallssl
@@ -574,18 +556,14 @@ def _generateEvents():
 _events = _generateEvents() #: A dictionary of functions, keyed by event code.
 del _generateEvents
 
-def handleIRCEvent(server, server_url, data, raw_string):
+def handleIRCEvent(server, message):
 	"""
-	This function parses and processes a numeric IRC event.
+	This function processes a numeric IRC event.
 	
 	@type server: pyrc_irc_abstract.irc_server.Server
 	@param server: A reference to the Server object that received this event.
-	@type server_url: basestring
-	@param server_url: The URI of the IRC server that sent this event.
-	@type data: tuple
-	@param data: The raw event string, split into three pieces.
-	@type raw_string: basestring
-	@param raw_string: The raw event string.
+	@type message: pyrc_irc_abstract.resources.message.Message
+	@param message: The parsed event.
 	
 	@rtype: None|Tuple
 	@return: Nothing if everything went well; a tuple containing an optional
@@ -597,41 +575,30 @@ def handleIRCEvent(server, server_url, data, raw_string):
 	@raise ProtocolError: If the string received from the IRC server did not
 	    match the spec expected by PyRC.
 	"""
-	code = int(data[0]) #Store the event code.
-	handler = _events.get(code) #Get the function that will handle the event.
+	handler = _events.get(message.code) #Get the function that will handle the event.
 	if not handler: #Fail if the function could not be found, informing the user.
-		details = _irc_codes.get(code)
+		details = _irc_codes.get(message.code)
 		if not details:
 			details = "Unknown"
-		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), raw_string)
+		raw = outboundDictionaries.IRC_Raw_Event(server.getContextID(), server.getName(), message.raw)
 		server.addEvent(outboundDictionaries.PyRC_Implement_Me(details, raw))
 		return
 		
-	(target, data) = data[1].split(None, 1) #The event's target, the event's data.
-	if data: #This will remove the first colon in the event data to avoid code duplication.
-		m = _COLON_PARSER.search(data)
-		if m:
-			offset = len(m.group(1)) + m.start()
-			data = data[:offset] + data[offset + 1:]
-			
 	try:
-		if data:
-			data = unicode(data, 'utf-8', 'replace')
-		return handler(server, raw_string, code, server_url, target, data)
+		return handler(server, message)
 	except Exception, e:
 		import pyrc_common.errlog
 		print pyrc_common.errlog.grabTrace()
-		print "number: %i" % code
-		print "target: %s" % target
-		print "data: %s" % data
-		raise ProtocolError("Error while processing '%s': %s" % (raw_string, e))
+		print "number: %i" % message.code
+		print "params: %s" % message.params
+		raise ProtocolError(u"Error while processing '%s': %s" % (message.raw, e))
 		
 _irc_codes = {
  #1: "welcome",
  #2: "yourhost",
  #3: "created",
  #4: "myinfo",
- 5: "map",
+ #5: "isupport",
  6: "mapmore",
  7: "mapend",
  8: "snomask",
@@ -917,7 +884,7 @@ class Error(Exception):
 		
 		@return: Nothing.
 		"""
-		self.description = unicode(description, 'utf-8', 'replace')
+		self.description = unicode(description)
 		
 class ProtocolError(Error):
 	"""
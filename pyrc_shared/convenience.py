@@ -15,8 +15,11 @@ Legal
 """
 
 import pyrc_common.GLOBAL as GLOBAL
+import pyrc_common.dictionaries.outbound as outboundDictionaries
 _ial = GLOBAL.irc_interface.processDictionary
 
+_EVENT_DICTIONARY_TYPES = (dict, outboundDictionaries.EventDictionary) #: The types that Event Dictionaries received from the IAL may have.
+
 def handleChannelMessage(dictionary, allowed_sources, ignore_action=True):
 	"""
 	This function is used to determine whether a given "Channel Message" or
@@ -230,22 +233,22 @@ def evaluateRank(data, target, channel=None, context_id=None):
 	@raise ArgumentTypeError: If one of the given multi-type arguments is
 	    incorrectly specified.
 	"""
-	if not type(data) in (dict, str, unicode):
-		raise ArgumentTypeError(u"'data' must be a Channel Message( Local) Event Dictionary or a string, not '%s'." % type(user))
+	if not isinstance(data, _EVENT_DICTIONARY_TYPES + (str, unicode)):
+		raise ArgumentTypeError(u"'data' must be a Channel Message( Local) Event Dictionary or a string, not '%s'." % type(data))
 		
 	if not type(target) in (tuple, list, str, unicode):
 		raise ArgumentTypeError(u"'target' must be a sequence or a character, not '%s'." % type(target))
 		
 	symbol = None
 	
-	if type(data) == dict and data['eventname'] == "Channel Message Local":
+	if isinstance(data, _EVENT_DICTIONARY_TYPES) and data['eventname'] == "Channel Message Local":
 		context_id = data['irccontext'],
 		channel = data['channel'],
 		data = data['username']
 		
 	if channel:
 		user_name = data
-		if type(data) == dict:
+		if isinstance(data, _EVENT_DICTIONARY_TYPES):
 			user_name = data['userdata']['username']
 			
 		user = _ial({
@@ -260,7 +263,7 @@ def evaluateRank(data, target, channel=None, context_id=None):
 		else:
 			return
 	else:
-		if type(data) == dict:
+		if isinstance(data, _EVENT_DICTIONARY_TYPES):
 			if data['eventname'] == "Channel Message":
 				symbol = data['userdata']['symbol']
 			else: